@@ -315,13 +315,19 @@ class AssetManager:
     
     
     
-    def __compileFilterExpr(self, classes):
+    def __compileFilterExpr(self, classes, permutation=None, fast=False):
         """Returns the regular expression object to use for filtering"""
         
+        if permutation is None:
+            permutation = getPermutation()
+        
         # Merge asset hints from all classes and remove duplicates
         hints = set()
         for classObj in classes:
-            hints.update(classObj.getMetaData(getPermutation()).assets)
+            if fast:
+                hints.update(classObj.getDependencyData().assets)
+            else:
+                hints.update(classObj.getMetaData(permutation).assets)
         
         # Compile filter expressions
         matcher = "^%s$" % "|".join(["(%s)" % fnmatch.translate(hint) for hint in hints])
@@ -360,15 +366,20 @@ class AssetManager:
 
 
 
-    def export(self, classes=None):
-        """Exports asset data for the source version using assets from their original paths."""
+    def export(self, classes=None, permutation=None, fast=False):
+        """
+        Exports asset data for the source version using assets from their original paths. Assets 
+        are filtered by the hints of the given classes seen through the given permutation 
+        (defaults to the current global permutation). In fast mode hints are collected without
+        parsing the classes (see Class.getDependencyData()).
+        """
         
         # Processing assets
         assets = self.index()
         data = self.__data
         
         result = {}
-        filterExpr = self.__compileFilterExpr(classes) if classes else None
+        filterExpr = self.__compileFilterExpr(classes, permutation, fast) if classes else None
         for fileId in assets:
             if filterExpr and not filterExpr.match(fileId):
                 continue
@@ -3,28 +3,204 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import shelve, time, os, os.path, sys, pickle, dbm, uuid, hashlib, atexit
+import time, os, os.path, sys, pickle, hashlib, atexit, zlib, lzma
 
 from jasy.core.Logging import *
-from jasy import __version__ as version
-from jasy.core.Util import getKey
+from jasy.core.CacheStorage import getStorage
+from jasy.core.CacheBundle import Bundle, writeBundle
+from jasy.core.CacheMemory import MemoryCache
+from jasy.core.CacheRemote import RemoteCache
+
+
+# Schema versions of the values stored per key family (the part of the key in front
+# of the first "[" or, for keys not related to a single item, of the first "-").
+# Increase the version of a family whenever the structure of its values changes.
+# This only invalidates the entries of the affected family instead of the whole
+# cache and keeps caches independent from the Jasy version or host.
+schemaVersions = {
+    "api" : 1,
+    "ast" : 1,
+    "build" : 1,
+    "compressed" : 1,
+    "dependencies" : 1,
+    "deps" : 1,
+    "fields" : 1,
+    "fingerprint" : 1,
+    "highlighted" : 1,
+    "meta" : 1,
+    "scope" : 1,
+    "size" : 1,
+    "translation" : 1,
+    "tree" : 1
+}
+
+defaultSchemaVersion = 1
+
+
+# Compression (method and level) of serialized values per key family. Values smaller
+# than the threshold (in bytes) are stored uncompressed. Serialized trees are
+# already compressed by the serializer. Supported methods are "zlib" and "lzma".
+compressionMethods = {
+    "api" : ("zlib", 6),
+    "ast" : None,
+    "highlighted" : ("zlib", 6)
+}
+
+defaultCompression = ("zlib", 1)
+defaultCompressionThreshold = 1024
+
+# Prefixes of compressed data. Uncompressed pickle data always starts with the protocol marker.
+__compressionPrefixes = {
+    "zlib" : b"Z",
+    "lzma" : b"X"
+}
+
+
+def compressData(data, method, level):
+    """Compresses the given data (bytes) with the given method and level and prefixes it with the method marker"""
+
+    if method == "zlib":
+        return __compressionPrefixes[method] + zlib.compress(data, level)
+    elif method == "lzma":
+        return __compressionPrefixes[method] + lzma.compress(data, preset=level)
+    else:
+        raise ValueError("Unsupported cache compression: %s" % method)
+
+
+def decompressData(data):
+    """Decompresses the given data (bytes) when it was compressed by compressData()"""
+
+    prefix = data[:1]
+    if prefix == b"Z":
+        return zlib.decompress(data[1:])
+    elif prefix == b"X":
+        return lzma.decompress(data[1:])
+    else:
+        return data
+
+
+def getFamily(key):
+    """
+    Returns the family of the given key e.g. "tree" for "tree[foo.Bar]". Keys which
+    are not related to a single item use a dash instead e.g. "dependencies" for
+    "dependencies-fast".
+    """
+
+    pos = key.find("[")
+    if pos == -1:
+        pos = key.find("-")
+        if pos == -1:
+            return key
+
+    return key[:pos]
+
+
+def getSchemaVersion(key):
+    """Returns the schema version of the family of the given key"""
+
+    return schemaVersions.get(getFamily(key), defaultSchemaVersion)
+
+
+def isValidStamp(timestamp, storedTimestamp):
+    """
+    Returns whether an entry stored with the given stamp is still valid for the current
+    stamp. Content fingerprints (strings) need to match exactly, modification times
+    are valid when the entry was stored after the modification.
+    """
+
+    if not timestamp:
+        return True
+    elif type(timestamp) is str or type(storedTimestamp) is str:
+        return timestamp == storedTimestamp
+    else:
+        return timestamp <= storedTimestamp
+
+
+
+# Counters collected per key family
+statisticFields = ("hits", "memory", "misses", "stale", "stores", "loaded", "stored", "raw", "pickle")
+
+def mergeStatistics(*args):
+    """Merges the given statistics (as returned by Cache.getStatistics()) into one"""
+
+    result = {}
+    for statistics in args:
+        for family in statistics:
+            if not family in result:
+                result[family] = dict.fromkeys(statisticFields, 0)
+
+            target = result[family]
+            source = statistics[family]
+            for field in statisticFields:
+                target[field] += source[field]
+
+    return result
+
+
+def formatSize(size):
+    """Formats the given number of bytes for humans"""
+
+    if size >= 1024 * 1024:
+        return "%.1fM" % (size / 1024 / 1024)
+    elif size >= 1024:
+        return "%.1fK" % (size / 1024)
+    else:
+        return "%sB" % size
+
+
+def printStatistics(statistics):
+    """Prints a summary table of the given statistics (as returned by Cache.getStatistics())"""
+
+    header("Cache statistics")
+
+    info("%-16s %8s %8s %8s %8s %8s %9s %9s %6s %8s", "Family", "Hits", "Memory", "Misses", "Stale", "Stores", "Loaded", "Stored", "Ratio", "Pickle")
+
+    def ratio(entry):
+        return "%5.1f%%" % (100 * entry["stored"] / entry["raw"]) if entry["raw"] else "-"
+
+    total = dict.fromkeys(statisticFields, 0)
+    for family in sorted(statistics):
+        entry = statistics[family]
+        for field in statisticFields:
+            total[field] += entry[field]
+
+        info("%-16s %8s %8s %8s %8s %8s %9s %9s %6s %7.2fs", family, entry["hits"], entry["memory"], entry["misses"], entry["stale"], 
+            entry["stores"], formatSize(entry["loaded"]), formatSize(entry["stored"]), ratio(entry), entry["pickle"])
+
+    info("%-16s %8s %8s %8s %8s %8s %9s %9s %6s %7.2fs", "Total", total["hits"], total["memory"], total["misses"], total["stale"], 
+        total["stores"], formatSize(total["loaded"]), formatSize(total["stored"]), ratio(total), total["pickle"])
+
 
-hostId = uuid.getnode()
 
 class Cache:
     """ 
-    A cache class based on shelve feature of Python. Supports transient in-memory 
-    storage, too. Uses memory storage for caching requests to DB as well for 
-    improved performance. Uses keys for identification of entries like a normal
-    hash table / dictionary.
+    A cache class based on a pluggable storage engine (shelve or SQLite). Supports 
+    transient in-memory storage, too. Large values are compressed (configurable 
+    per key family, see compressionMethods) before being written to the storage.
+    Uses memory storage for caching requests to DB as well for improved performance.
+    The memory storage might be limited to a budget (in bytes) where least recently
+    used entries are evicted first. Optionally shares text results with other
+    machines using a remote cache (URL). Uses keys for identification of entries
+    like a normal hash table / dictionary.
     """
     
-    __shelve = None
+    __storage = None
     
-    def __init__(self, path, filename="jasycache", hashkeys=False):
-        self.__transient = {}
+    def __init__(self, path, filename="jasycache", hashkeys=False, storage="sqlite", memory=None, remote=None, compression=None, threshold=None):
+        self.__compression = dict(compressionMethods)
+        if compression:
+            self.__compression.update(compression)
+
+        self.__threshold = defaultCompressionThreshold if threshold is None else threshold
+        self.__transient = MemoryCache(memory)
+        self.__remote = RemoteCache(remote) if remote else None
+        self.__accessed = set()
+        self.__statistics = {}
+        self.__bundles = []
+        self.__mounted = []
         self.__file = os.path.join(path, filename)
         self.__hashkeys = hashkeys
+        self.__storage = getStorage(storage)(self.__file)
 
         self.open()
 
@@ -35,43 +211,8 @@ class Cache:
     def open(self):
         """Opens a cache file in the given path"""
         
-        try:
-            self.__shelve = shelve.open(self.__file, flag="c")
-            
-            storedVersion = getKey(self.__shelve, "jasy-version")
-            storedHost = getKey(self.__shelve, "jasy-host")
-            
-            if storedVersion == version and storedHost == hostId:
-                return
-                    
-            if storedVersion is not None or storedHost is not None:
-                debug("Jasy version or host has been changed. Recreating cache...")
-                    
-            self.__shelve["jasy-version"] = version
-            self.__shelve["jasy-host"] = hostId
-            
-        except dbm.error as dbmerror:
-            errno = None
-            try:
-                errno = dbmerror.errno
-            except:
-                pass
-                
-            if errno is 35:
-                raise IOError("Cache file is locked by another process!")
-                
-            elif "type could not be determined" in str(dbmerror):
-                error("Could not detect cache file format: %s" % self.__file)
-                warn("Recreating cache database...")
-                self.clear()
-                
-            elif "module is not available" in str(dbmerror):
-                error("Unsupported cache file format: %s" % self.__file)
-                warn("Recreating cache database...")
-                self.clear()
-                
-            else:
-                raise dbmerror
+        self.__storage.open()
+        self.__mounted = [Bundle(fileName) for fileName in self.__bundles]
     
     
     def clear(self):
@@ -79,84 +220,365 @@ class Cache:
         Clears the cache file through re-creation of the file
         """
         
-        if self.__shelve != None:
-            debug("Closing cache file %s..." % self.__file)
-            
-            self.__shelve.close()
-            self.__shelve = None
+        self.__transient.clear()
 
         debug("Clearing cache file %s..." % self.__file)
-        self.__shelve = shelve.open(self.__file, flag="n")
-        self.__shelve["jasy-version"] = version
+        self.__storage.clear()
+        
+        
+    def mount(self, fileName):
+        """
+        Mounts the given cache bundle (see export()) read-only. Entries 
+        which are not available locally are looked up in mounted bundles.
+        Bundles might come from other machines and only contain text which 
+        is decoded as UTF-8. No serialized objects of bundles are loaded.
+        """
+        
+        debug("Mounting cache bundle %s..." % fileName)
+        self.__mounted.append(Bundle(fileName))
+        self.__bundles.append(fileName)
+        
+        
+    def export(self, fileName):
+        """
+        Exports all portable entries (text values validated by content fingerprints) 
+        into a bundle file which could be mounted or imported on other machines.
+        Returns the number of exported entries.
+        """
         
+        storage = self.__storage
+        storage.sync()
+
+        def entries():
+            for key in storage.keys():
+                entry = storage.get(key)
+                if entry is None or type(entry[1]) is not str:
+                    continue
+
+                data, timestamp, schema = entry
+                try:
+                    value = pickle.loads(decompressData(data))
+                except Exception as err:
+                    debug("Ignoring invalid cache entry %s: %s" % (key, err))
+                    continue
+
+                if type(value) is str:
+                    yield key, value, timestamp, schema
         
-    def read(self, key, timestamp=None):
+        return writeBundle(entries(), fileName)
+        
+        
+    def load(self, fileName):
+        """
+        Imports all entries of the given bundle file into the cache. Like 
+        with mount() only text is imported. Returns the number of imported entries.
+        """
+        
+        bundle = Bundle(fileName)
+        counter = 0
+        
+        try:
+            for key in bundle.keys():
+                data, timestamp, schema = bundle.get(key)
+                if schema != getSchemaVersion(key):
+                    continue
+
+                try:
+                    value = data.decode("utf-8")
+                except UnicodeDecodeError as err:
+                    debug("Ignoring invalid bundle entry %s: %s" % (key, err))
+                    continue
+
+                self.__storage.put(key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), timestamp, schema)
+                counter += 1
+        finally:
+            bundle.close()
+            
+        self.__storage.sync()
+        return counter
+        
+        
+    def hasRemote(self):
+        """Whether a remote cache is configured and reachable"""
+        
+        return self.__remote is not None and self.__remote.isEnabled()
+        
+        
+    def readRemote(self, key):
+        """
+        Reads the given text value from the remote cache. Values are transferred 
+        as UTF-8 text so that no serialized objects of other machines are loaded.
+        Returns None when the value (or the remote cache) is not available.
+        """
+        
+        if not self.hasRemote():
+            return None
+        
+        data = self.__remote.get(key)
+        if data is None:
+            self.__count("remote", "misses")
+            return None
+        
+        self.__count("remote", "hits")
+        self.__count("remote", "loaded", len(data))
+        
+        return data.decode("utf-8")
+        
+        
+    def storeRemote(self, key, value):
+        """Stores the given text value in the remote cache (when configured)"""
+        
+        if not self.hasRemote():
+            return
+        
+        data = value.encode("utf-8")
+        if self.__remote.put(key, data):
+            self.__count("remote", "stores")
+            self.__count("remote", "raw", len(data))
+            self.__count("remote", "stored", len(data))
+        
+        
+    def getStatistics(self):
+        """
+        Returns the statistics collected by read() and store() as a dict of key families. 
+        Each family holds the number of hits (all/memory), misses (including stale ones), 
+        stale entries (outdated timestamp or schema), stores, the loaded and stored 
+        bytes, the stored bytes before compression (raw) and the time spent for 
+        (de)serialization including compression.
+        """
+        
+        return mergeStatistics(self.__statistics)
+        
+        
+    def __count(self, family, field, value=1):
+        statistics = self.__statistics.get(family)
+        if statistics is None:
+            statistics = self.__statistics[family] = dict.fromkeys(statisticFields, 0)
+            
+        statistics[field] += value
+        
+        
+    def __isValid(self, key, entry, timestamp):
+        data, storedTimestamp, storedSchema = entry
+
+        if storedSchema != getSchemaVersion(key):
+            return False
+        
+        return isValidStamp(timestamp, storedTimestamp)
+        
+        
+    def read(self, key, timestamp=None, memory=True):
         """ 
         Reads the given value from cache.
         Optionally support to check wether the value was stored after the given 
         time to be valid (useful for comparing with file modification times).
+        When a string is given instead of a time (e.g. a content fingerprint) the 
+        value is only valid when it was stored with exactly the same string.
+        Memory controls whether values loaded from disk are copied to the in-memory cache.
         """
         
+        schemaKey = key
+        family = getFamily(key)
         if self.__hashkeys:
             key = hashlib.sha1(key.encode("ascii")).hexdigest()
 
         if key in self.__transient:
+            self.__count(family, "hits")
+            self.__count(family, "memory")
             return self.__transient[key]
         
-        timeKey = key + "-timestamp"
-        if key in self.__shelve and timeKey in self.__shelve:
-            if not timestamp or timestamp <= self.__shelve[timeKey]:
-                value = self.__shelve[key]
+        for source in [self.__storage] + self.__mounted:
+            entry = source.get(key)
+            if entry is None:
+                continue
                 
-                # Useful to debug serialized size. Often a performance
-                # issue when data gets to big.
-                # rePacked = pickle.dumps(value)
-                # print("LEN: %s = %s" % (key, len(rePacked)))
+            if not self.__isValid(schemaKey, entry, timestamp):
+                self.__count(family, "stale")
+                continue
                 
-                # Copy over value to in-memory cache
-                self.__transient[key] = value
-                return value
+            data = entry[0]
+            start = time.time()
+            try:
+                if source is self.__storage:
+                    serialized = decompressData(data)
+                    value = pickle.loads(serialized)
+                else:
+                    # Bundles contain text only, serialized objects of other machines are never loaded
+                    serialized = data
+                    value = data.decode("utf-8")
+            except Exception as err:
+                debug("Ignoring invalid cache entry %s: %s" % (key, err))
+                self.__count(family, "stale")
+                continue
                 
+            self.__count(family, "pickle", time.time() - start)
+            self.__count(family, "loaded", len(data))
+            self.__count(family, "hits")
+            
+            # Remember usage of local entries for least recently used compaction
+            if source is self.__storage:
+                self.__accessed.add(key)
+            
+            # Copy over value to in-memory cache (sized by its serialized length)
+            if memory:
+                self.__transient.set(key, value, size=len(serialized))
+            return value
+                
+        self.__count(family, "misses")
         return None
         
     
-    def store(self, key, value, timestamp=None, transient=False):
+    def store(self, key, value, timestamp=None, transient=False, pin=False, memory=True):
         """
         Stores the given value.
         Default timestamp goes to the current time. Can be modified
-        to the time of an other files modification date etc.
+        to the time of an other files modification date etc. or to a
+        content fingerprint (string).
         Transient enables in-memory cache for the given value
+        Pin protects the in-memory copy from being evicted
+        Memory controls whether a copy of persistent values is kept in memory
         """
         
+        schema = getSchemaVersion(key)
+        family = getFamily(key)
         if self.__hashkeys:
             key = hashlib.sha1(key.encode("ascii")).hexdigest()
         
-        self.__transient[key] = value
         if transient:
+            self.__transient.set(key, value, pin=pin)
             return
+
+        self.__transient.remove(key)
         
         if not timestamp:
             timestamp = time.time()
         
+        start = time.time()
         try:
-            self.__shelve[key+"-timestamp"] = timestamp
-            self.__shelve[key] = value
+            data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
         except pickle.PicklingError as err:
             error("Failed to store enty: %s" % key)
+            return
+            
+        raw = len(data)
+
+        # The serialized length is used as size of the in-memory copy which 
+        # saves walking through large values (e.g. trees) on every store
+        if memory:
+            self.__transient.set(key, value, size=raw, pin=pin)
+
+        if raw >= self.__threshold:
+            method = self.__compression.get(family, defaultCompression)
+            if method is not None:
+                compressed = compressData(data, *method)
+                if len(compressed) < raw:
+                    data = compressed
+            
+        self.__count(family, "pickle", time.time() - start)
+        self.__count(family, "raw", raw)
+        self.__count(family, "stored", len(data))
+        self.__count(family, "stores")
+
+        self.__storage.put(key, data, timestamp, schema)
+
+        
+    def compact(self, validate=None, maxSize=None, maxEntries=None):
+        """
+        Removes outdated entries and rewrites the storage compactly. Entries with an 
+        outdated schema version are always removed. The optional validate callback 
+        is called with the key and timestamp of every entry and returns whether the 
+        entry should be kept. When a maximum number of entries per key family is given
+        (dict of family and number) or a maximum size (in bytes), the least recently 
+        used entries are removed until these limits are met.
+        Returns the number of removed entries.
+        """
+        
+        self.__touch()
+        
+        removed = []
+        kept = []
+        
+        for key, timestamp, schema, size, accessed in self.__storage.entries():
+            # Families could not be figured out from hashed keys
+            if not self.__hashkeys and schema != getSchemaVersion(key):
+                removed.append(key)
+            elif validate is not None and not validate(key, timestamp):
+                removed.append(key)
+            else:
+                kept.append((accessed or 0, size, key))
+                
+        if maxEntries and not self.__hashkeys:
+            kept.sort(reverse=True)
+            
+            counters = {}
+            limited = []
+            for entry in kept:
+                family = getFamily(entry[2])
+                if family in maxEntries:
+                    counters[family] = counters.get(family, 0) + 1
+                    if counters[family] > maxEntries[family]:
+                        removed.append(entry[2])
+                        continue
+                        
+                limited.append(entry)
+                
+            kept = limited
+                
+        if maxSize is not None:
+            kept.sort(reverse=True)
+            
+            total = 0
+            for accessed, size, key in kept:
+                total += size
+                if total > maxSize:
+                    removed.append(key)
+        
+        debug("Removing %s entries from cache file %s..." % (len(removed), self.__file))
+        for key in removed:
+            self.__transient.remove(key)
 
+        self.__storage.delete(removed)
+        self.__storage.compact()
+        
+        return len(removed)
+        
+        
+    def getSize(self):
+        """Returns the size of all values in the storage (in bytes)"""
+        
+        return self.__storage.getSize()
+        
+        
+    def __touch(self):
+        if self.__accessed:
+            self.__storage.touch(self.__accessed, time.time())
+            self.__accessed = set()
+        
         
     def sync(self):
         """ Syncs the internal storage database """
         
-        if self.__shelve is not None:
-            self.__shelve.sync() 
+        self.__touch()
+        self.__storage.sync() 
       
       
     def close(self):
         """ Closes the internal storage database """
         
-        if self.__shelve is not None:
-            self.__shelve.close()  
-            self.__shelve = None
+        if self.__accessed:
+            try:
+                self.__touch()
+            except Exception as err:
+                debug("Could not update access times: %s" % err)
+        
+        self.__storage.close()
+
+        for bundle in self.__mounted:
+            bundle.close()
+
+        if self.__remote is not None:
+            self.__remote.close()
+
+        self.__mounted = []
 
       
@@ -0,0 +1,98 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import os, os.path, sqlite3, hashlib, urllib.request
+
+from jasy.core.Logging import *
+
+__all__ = ["Bundle", "writeBundle"]
+
+# Format of bundle files (stored as user version of the SQLite database)
+bundleVersion = 1
+
+
+def writeBundle(entries, fileName):
+    """
+    Writes the given entries (iterable of key, text, timestamp, schema) into a portable bundle file.
+
+    Bundles are meant to be shared with other machines and therefore only contain text values which
+    are stored as UTF-8 (like the remote cache does) instead of serialized objects. Values are stored
+    content-addressed by the SHA1 checksum of their data, so identical values (e.g. equal compressed
+    output of different permutations) are only stored once. Only entries validated by content
+    fingerprints (string timestamps) are portable between machines, all other entries are skipped.
+    Returns the number of written entries.
+    """
+
+    if os.path.exists(fileName):
+        os.remove(fileName)
+
+    connection = sqlite3.connect(fileName)
+    counter = 0
+
+    with connection:
+        connection.execute("CREATE TABLE blobs (hash TEXT PRIMARY KEY, data BLOB)")
+        connection.execute("CREATE TABLE entries (key TEXT PRIMARY KEY, hash TEXT, timestamp TEXT, schema)")
+
+        connection.execute("PRAGMA user_version = %s" % bundleVersion)
+
+        for key, text, timestamp, schema in entries:
+            if type(timestamp) is not str:
+                continue
+
+            data = text.encode("utf-8")
+            checksum = hashlib.sha1(data).hexdigest()
+            connection.execute("INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)", (checksum, data))
+            connection.execute("INSERT OR REPLACE INTO entries (key, hash, timestamp, schema) VALUES (?, ?, ?, ?)", (key, checksum, timestamp, schema))
+            counter += 1
+
+    connection.execute("VACUUM")
+    connection.close()
+
+    return counter
+
+
+
+class Bundle:
+    """
+    Read-only access to a cache bundle written by writeBundle(). Bundles
+    could be mounted into a cache to be used as a secondary storage. The
+    data of all entries is UTF-8 encoded text.
+    """
+
+    def __init__(self, fileName):
+        if not os.path.isfile(fileName):
+            raise IOError("Cache bundle does not exist: %s" % fileName)
+
+        self.__fileName = fileName
+        self.__connection = sqlite3.connect("file:%s?mode=ro" % urllib.request.pathname2url(os.path.abspath(fileName)), uri=True, check_same_thread=False)
+
+        # Bundles of other formats (e.g. containing serialized objects) are not supported
+        version = self.__connection.execute("PRAGMA user_version").fetchone()[0]
+        if version != bundleVersion:
+            self.close()
+            raise IOError("Unsupported format of cache bundle %s: %s" % (fileName, version))
+
+
+    def getFileName(self):
+        return self.__fileName
+
+
+    def keys(self):
+        """Returns a list of all keys in the bundle"""
+
+        return [row[0] for row in self.__connection.execute("SELECT key FROM entries")]
+
+
+    def get(self, key):
+        """Returns the tuple (data, timestamp, schema) for the given key or None when not available. Data is UTF-8 encoded text."""
+
+        return self.__connection.execute("SELECT blobs.data, entries.timestamp, entries.schema FROM entries JOIN blobs ON entries.hash=blobs.hash WHERE entries.key=?", (key,)).fetchone()
+
+
+    def close(self):
+        if self.__connection is not None:
+            self.__connection.close()
+            self.__connection = None
+
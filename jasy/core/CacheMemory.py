@@ -0,0 +1,164 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import sys
+from collections import OrderedDict
+
+__all__ = ["MemoryCache", "getApproximateSize"]
+
+
+def getApproximateSize(value):
+    """
+    Returns the approximate memory size (in bytes) of the given value. Follows
+    the items of containers (including list based structures like nodes of
+    syntax trees) and the dict of regular objects. Objects which are referenced
+    multiple times (e.g. comments shared by cloned trees) are counted once.
+    Attributes stored in slots are only counted by their reference.
+    """
+
+    size = 0
+    seen = set()
+    stack = [value]
+
+    while stack:
+        current = stack.pop()
+
+        identifier = id(current)
+        if identifier in seen:
+            continue
+
+        seen.add(identifier)
+        size += sys.getsizeof(current)
+
+        if current is None or type(current) in (str, bytes, int, float, bool):
+            continue
+
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+        elif hasattr(current, "__dict__"):
+            stack.append(current.__dict__)
+
+    return size
+
+
+
+class MemoryCache:
+    """
+    In-memory storage with an optional memory budget (in bytes). When the sum of
+    the approximate sizes of all entries exceeds the budget, the least recently
+    used entries are evicted. Pinned entries are never evicted.
+    """
+
+    def __init__(self, budget=None):
+        self.__budget = budget
+        self.__entries = OrderedDict()
+        self.__pinned = {}
+        self.__sizes = {}
+        self.__size = 0
+        self.__evicted = 0
+
+
+    def __contains__(self, key):
+        return key in self.__entries or key in self.__pinned
+
+
+    def __getitem__(self, key):
+        if key in self.__pinned:
+            return self.__pinned[key]
+
+        value = self.__entries[key]
+        self.__entries.move_to_end(key)
+        return value
+
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+
+    def __len__(self):
+        return len(self.__entries) + len(self.__pinned)
+
+
+    def set(self, key, value, size=None, pin=False):
+        """
+        Stores the given value. The size is computed via getApproximateSize() when not
+        given which walks the whole value - callers which already know a size (e.g. the
+        length of the serialized value) should pass it. Pinned values are kept in memory
+        regardless of the budget.
+        """
+
+        self.remove(key)
+
+        if self.__budget is not None and size is None:
+            size = getApproximateSize(value)
+
+        if pin:
+            self.__pinned[key] = value
+        else:
+            self.__entries[key] = value
+
+        if size is not None:
+            self.__sizes[key] = size
+            self.__size += size
+
+        if not pin and self.__budget is not None:
+            self.__evict()
+
+
+    def remove(self, key):
+        """Removes the given key (when stored)"""
+
+        if key in self.__entries:
+            del self.__entries[key]
+        elif key in self.__pinned:
+            del self.__pinned[key]
+        else:
+            return
+
+        if key in self.__sizes:
+            self.__size -= self.__sizes.pop(key)
+
+
+    def clear(self):
+        """Removes all entries"""
+
+        self.__entries.clear()
+        self.__pinned.clear()
+        self.__sizes.clear()
+        self.__size = 0
+
+
+    def getSize(self):
+        """Returns the approximate size of all entries (in bytes)"""
+
+        return self.__size
+
+
+    def getBudget(self):
+        """Returns the memory budget (in bytes) or None when unlimited"""
+
+        return self.__budget
+
+
+    def getEvictions(self):
+        """Returns the number of evicted entries"""
+
+        return self.__evicted
+
+
+    def __evict(self):
+        entries = self.__entries
+        sizes = self.__sizes
+
+        while self.__size > self.__budget and entries:
+            key, value = entries.popitem(last=False)
+            if key in sizes:
+                self.__size -= sizes.pop(key)
+
+            self.__evicted += 1
+
@@ -0,0 +1,95 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import hashlib, logging, requests
+
+from jasy.core.Logging import *
+
+__all__ = ["RemoteCache", "getAddress"]
+
+# Disable logging HTTP request being created
+logging.getLogger("requests").setLevel(logging.WARNING)
+
+
+def getAddress(key):
+    """Returns the address (SHA1 checksum) of the blob stored under the given key"""
+
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+
+class RemoteCache:
+    """
+    Client of a remote build cache shared via HTTP (see jasy.server.Web.Blobs). Blobs are
+    addressed by the checksum of their key and transferred using GET and PUT requests.
+    Keys need to describe the content of their values completely (e.g. by including
+    content fingerprints) as there is no further invalidation. Whenever the server is
+    not reachable the remote cache is disabled for the rest of the session.
+    """
+
+    def __init__(self, url, timeout=5):
+        if not url.endswith("/"):
+            url += "/"
+
+        self.__url = url
+        self.__timeout = timeout
+        self.__session = requests.Session()
+        self.__enabled = True
+
+
+    def getUrl(self):
+        return self.__url
+
+
+    def isEnabled(self):
+        """Whether the remote cache is still used"""
+
+        return self.__enabled
+
+
+    def get(self, key):
+        """Returns the data (bytes) stored under the given key or None when not available"""
+
+        if not self.__enabled:
+            return None
+
+        try:
+            response = self.__session.get(self.__url + getAddress(key), timeout=self.__timeout)
+        except requests.RequestException as err:
+            self.__disable(err)
+            return None
+
+        if response.status_code == 200:
+            return response.content
+        elif response.status_code != 404:
+            debug("Unexpected response of remote cache: %s" % response.status_code)
+
+        return None
+
+
+    def put(self, key, data):
+        """Stores the given data (bytes) under the given key. Returns whether this was successful."""
+
+        if not self.__enabled:
+            return False
+
+        try:
+            response = self.__session.put(self.__url + getAddress(key), data=data, timeout=self.__timeout,
+                headers={"Content-Type" : "application/octet-stream"})
+        except requests.RequestException as err:
+            self.__disable(err)
+            return False
+
+        return response.status_code in (200, 201, 204)
+
+
+    def close(self):
+        self.__session.close()
+
+
+    def __disable(self, err):
+        warn("Disabling remote cache %s: %s" % (self.__url, err))
+        self.__enabled = False
+
@@ -0,0 +1,353 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import shelve, os, os.path, pickle, dbm, sqlite3, threading, time
+
+from jasy.core.Logging import *
+from jasy.core.Util import getKey
+
+__all__ = ["ShelveStorage", "SqliteStorage", "getStorage"]
+
+
+class ShelveStorage:
+    """
+    Storage backend based on the shelve/dbm feature of Python. Writes are
+    executed synchronously. Only one process is able to access the
+    storage file at the same time.
+
+    Storages keep values as serialized data (bytes). Serialization is 
+    handled by the cache itself.
+    """
+
+    __shelve = None
+
+    def __init__(self, path):
+        self.__file = path
+
+
+    def open(self):
+        """Opens the storage file"""
+
+        try:
+            self.__shelve = shelve.open(self.__file, flag="c")
+
+        except dbm.error as dbmerror:
+            errno = None
+            try:
+                errno = dbmerror.errno
+            except:
+                pass
+
+            if errno == 35:
+                raise IOError("Cache file is locked by another process!")
+
+            elif "type could not be determined" in str(dbmerror):
+                error("Could not detect cache file format: %s" % self.__file)
+                warn("Recreating cache database...")
+                self.clear()
+
+            elif "module is not available" in str(dbmerror):
+                error("Unsupported cache file format: %s" % self.__file)
+                warn("Recreating cache database...")
+                self.clear()
+
+            else:
+                raise dbmerror
+
+
+    def clear(self):
+        """Clears the storage through re-creation of the file"""
+
+        self.close()
+        self.__shelve = shelve.open(self.__file, flag="n")
+
+
+    def keys(self):
+        """Returns a list of all stored keys"""
+
+        return [key for key in self.__shelve if key + "-timestamp" in self.__shelve]
+
+
+    def get(self, key):
+        """Returns the tuple (data, timestamp, schema) for the given key or None when not available"""
+
+        timeKey = key + "-timestamp"
+        if key in self.__shelve and timeKey in self.__shelve:
+            return self.__shelve[key], self.__shelve[timeKey], getKey(self.__shelve, key + "-schema")
+
+        return None
+
+
+    def put(self, key, data, timestamp, schema=None, accessed=None):
+        """Stores the given data with its timestamp and schema version"""
+
+        self.__shelve[key+"-timestamp"] = timestamp
+        self.__shelve[key+"-schema"] = schema
+        self.__shelve[key+"-accessed"] = accessed or time.time()
+        self.__shelve[key] = data
+
+
+    def entries(self):
+        """Returns a list of tuples (key, timestamp, schema, size, accessed) for all stored entries"""
+
+        result = []
+        for key in self.keys():
+            result.append((key, self.__shelve[key+"-timestamp"], getKey(self.__shelve, key+"-schema"), 
+                len(self.__shelve[key]), getKey(self.__shelve, key+"-accessed", 0)))
+
+        return result
+
+
+    def touch(self, keys, accessed):
+        """Updates the access time of the given keys"""
+
+        for key in keys:
+            if key + "-timestamp" in self.__shelve:
+                self.__shelve[key+"-accessed"] = accessed
+
+
+    def delete(self, keys):
+        """Removes the given keys"""
+
+        for key in keys:
+            for suffix in ("", "-timestamp", "-schema", "-accessed"):
+                if key + suffix in self.__shelve:
+                    del self.__shelve[key+suffix]
+
+
+    def compact(self):
+        """Rewrites the storage file to free the space of removed entries"""
+
+        entries = [(key, self.get(key), getKey(self.__shelve, key+"-accessed")) for key in self.keys()]
+        self.clear()
+
+        for key, entry, accessed in entries:
+            self.put(key, entry[0], entry[1], entry[2], accessed)
+
+        self.sync()
+
+
+    def getSize(self):
+        """Returns the size of all stored values (in bytes)"""
+
+        return sum(len(self.__shelve[key]) for key in self.keys())
+
+
+    def sync(self):
+        """Writes down all pending changes"""
+
+        if self.__shelve is not None:
+            self.__shelve.sync()
+
+
+    def close(self):
+        """Closes the storage file"""
+
+        if self.__shelve is not None:
+            self.__shelve.close()
+            self.__shelve = None
+
+
+
+class SqliteStorage:
+    """
+    Storage backend based on SQLite. The database runs in WAL mode so that
+    multiple processes are able to read at the same time while one process
+    is writing. Values and timestamps are kept in a single row. Stores are
+    collected in memory and written to disk in batches using one transaction
+    per batch.
+    """
+
+    __connection = None
+
+    # Version of the table layout. Tables with other versions are re-created on open.
+    __format = 3
+
+    def __init__(self, path, batchSize=250, timeout=30):
+        self.__file = path + ".sqlite"
+        self.__batchSize = batchSize
+        self.__timeout = timeout
+        self.__pending = {}
+        self.__lock = threading.RLock()
+
+
+    def open(self):
+        """Opens the database file and creates missing tables"""
+
+        with self.__lock:
+            try:
+                self.__connect()
+
+            except sqlite3.DatabaseError as dberror:
+                if "locked" in str(dberror):
+                    raise IOError("Cache file is locked by another process!")
+
+                error("Could not open cache database %s: %s" % (self.__file, dberror))
+                warn("Recreating cache database...")
+
+                self.close()
+                self.__remove()
+                self.__connect()
+
+
+    def __connect(self):
+        connection = sqlite3.connect(self.__file, timeout=self.__timeout, check_same_thread=False)
+        self.__connection = connection
+
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value BLOB)")
+
+            row = connection.execute("SELECT value FROM info WHERE key='format'").fetchone()
+            if row is None or pickle.loads(row[0]) != self.__format:
+                connection.execute("DROP TABLE IF EXISTS cache")
+                connection.execute("INSERT OR REPLACE INTO info (key, value) VALUES ('format', ?)", (pickle.dumps(self.__format),))
+
+            connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, timestamp, schema, accessed REAL)")
+
+
+    def __remove(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.__file + suffix):
+                os.remove(self.__file + suffix)
+
+
+    def clear(self):
+        """Removes all entries from the database"""
+
+        with self.__lock:
+            if self.__connection is None:
+                self.open()
+
+            self.__pending = {}
+            with self.__connection:
+                self.__connection.execute("DELETE FROM cache")
+
+            self.__connection.execute("VACUUM")
+
+
+    def keys(self):
+        """Returns a list of all stored keys"""
+
+        with self.__lock:
+            self.__flush()
+            return [row[0] for row in self.__connection.execute("SELECT key FROM cache")]
+
+
+    def get(self, key):
+        """Returns the tuple (data, timestamp, schema) for the given key or None when not available"""
+
+        with self.__lock:
+            if key in self.__pending:
+                return self.__pending[key]
+
+            return self.__connection.execute("SELECT value, timestamp, schema FROM cache WHERE key=?", (key,)).fetchone()
+
+
+    def put(self, key, data, timestamp, schema=None):
+        """
+        Stores the given data with its timestamp and schema version. The data is 
+        only written to disk with the next batch.
+        """
+
+        with self.__lock:
+            self.__pending[key] = (data, timestamp, schema)
+            if len(self.__pending) >= self.__batchSize:
+                self.__flush()
+
+
+    def __flush(self):
+        if not self.__pending:
+            return
+
+        pending = self.__pending
+        self.__pending = {}
+        accessed = time.time()
+
+        with self.__connection:
+            self.__connection.executemany("INSERT OR REPLACE INTO cache (key, value, timestamp, schema, accessed) VALUES (?, ?, ?, ?, ?)",
+                ((key,) + pending[key] + (accessed,) for key in pending))
+
+
+    def entries(self):
+        """Returns a list of tuples (key, timestamp, schema, size, accessed) for all stored entries"""
+
+        with self.__lock:
+            self.__flush()
+            return self.__connection.execute("SELECT key, timestamp, schema, length(value), accessed FROM cache").fetchall()
+
+
+    def touch(self, keys, accessed):
+        """Updates the access time of the given keys"""
+
+        with self.__lock:
+            with self.__connection:
+                self.__connection.executemany("UPDATE cache SET accessed=? WHERE key=?", ((accessed, key) for key in keys))
+
+
+    def delete(self, keys):
+        """Removes the given keys"""
+
+        with self.__lock:
+            for key in keys:
+                self.__pending.pop(key, None)
+
+            with self.__connection:
+                self.__connection.executemany("DELETE FROM cache WHERE key=?", ((key,) for key in keys))
+
+
+    def compact(self):
+        """Rewrites the database file to free the space of removed entries"""
+
+        with self.__lock:
+            self.__flush()
+            self.__connection.execute("VACUUM")
+            self.__connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+    def getSize(self):
+        """Returns the size of all stored values (in bytes)"""
+
+        with self.__lock:
+            self.__flush()
+            return int(self.__connection.execute("SELECT total(length(value)) FROM cache").fetchone()[0])
+
+
+    def sync(self):
+        """Writes down all pending changes"""
+
+        with self.__lock:
+            if self.__connection is not None:
+                self.__flush()
+
+
+    def close(self):
+        """Writes down pending changes and closes the database"""
+
+        with self.__lock:
+            if self.__connection is not None:
+                try:
+                    self.__flush()
+                finally:
+                    self.__connection.close()
+                    self.__connection = None
+
+
+
+storages = {
+    "shelve" : ShelveStorage,
+    "sqlite" : SqliteStorage
+}
+
+def getStorage(name):
+    """Returns the storage class registered under the given name"""
+
+    if not name in storages:
+        raise ValueError("Unsupported cache storage: %s" % name)
+
+    return storages[name]
+
@@ -14,7 +14,7 @@ class Doc(Item):
     
     def getApi(self):
         field = "api[%s]" % self.id
-        apidata = self.project.getCache().read(field, self.getModificationTime())
+        apidata = self.project.getCache().read(field, self.getStamp())
         
         if markdown is None:
             raise JasyError("Missing Markdown feature to convert package docs into HTML.")
@@ -24,7 +24,7 @@ class Doc(Item):
             apidata.main["type"] = "Package"
             apidata.main["doc"] = markdown(self.getText())
             
-            self.project.getCache().store(field, apidata, self.getModificationTime())
+            self.project.getCache().store(field, apidata, self.getStamp())
 
         return apidata
         
\ No newline at end of file
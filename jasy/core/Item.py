@@ -3,7 +3,7 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import os
+import os, hashlib
 
 from jasy.core.Error import JasyError
 from jasy.core.Util import sha1File
@@ -16,6 +16,8 @@ class Item:
 
     __path = None
     __cache = None
+    __stat = None
+    __fingerprint = None
     mtime = None
     
     def __init__(self, project, id=None):
@@ -24,19 +26,26 @@ class Item:
 
     def attach(self, path):
         self.__path = path
+        self.__fingerprint = None
         
         try:
             if type(path) is list:
                 mtime = 0
+                stat = []
                 for entry in path:
-                    entryTime = os.stat(entry).st_mtime
-                    if entryTime > mtime:
-                        mtime = entryTime
+                    entryStat = os.stat(entry)
+                    if entryStat.st_mtime > mtime:
+                        mtime = entryStat.st_mtime
+                        
+                    stat.append((entryStat.st_ino, entryStat.st_size, entryStat.st_mtime))
                     
                 self.mtime = mtime
+                self.__stat = tuple(stat)
         
             else:
-                self.mtime = os.stat(path).st_mtime
+                entryStat = os.stat(path)
+                self.mtime = entryStat.st_mtime
+                self.__stat = ((entryStat.st_ino, entryStat.st_size, entryStat.st_mtime),)
             
         except OSError as oserr:
             raise JasyError("Invalid item path: %s" % path)
@@ -63,6 +72,53 @@ class Item:
         """Returns last modification time of the class"""
         return self.mtime
 
+    def getFingerprint(self):
+        """
+        Returns a fingerprint (SHA1) of the content of the item. The fingerprint is computed 
+        lazily and memoized in the project cache by inode, size and modification time of the 
+        underlying files so that unchanged files are not read again.
+        """
+        
+        if self.__fingerprint is None:
+            path = self.__path
+            if type(path) is list:
+                field = "fingerprint[%s]" % "|".join(path)
+            else:
+                field = "fingerprint[%s]" % path
+
+            cache = self.project.getCache()
+            entry = cache.read(field)
+            
+            if entry is not None and entry[0] == self.__stat:
+                self.__fingerprint = entry[1]
+            else:
+                if type(path) is list:
+                    sha1 = hashlib.sha1()
+                    for entry in path:
+                        with open(entry, "rb") as handle:
+                            sha1.update(handle.read())
+                    fingerprint = sha1.hexdigest()
+                else:
+                    with open(path, "rb") as handle:
+                        fingerprint = sha1File(handle)
+                    
+                cache.store(field, (self.__stat, fingerprint))
+                self.__fingerprint = fingerprint
+            
+        return self.__fingerprint
+        
+    def getStamp(self):
+        """
+        Returns the value to validate cache entries of the item with. Depending on the 
+        invalidation mode of the project this is either the modification time or the
+        content fingerprint.
+        """
+        
+        if self.project.getCacheInvalidation() == "checksum":
+            return self.getFingerprint()
+            
+        return self.mtime
+
     def getText(self, encoding="utf-8"):
         """Reads the file (as UTF-8) and returns the text"""
         
@@ -5,7 +5,7 @@
 
 import os, json, re
 
-from jasy.core.Cache import Cache
+from jasy.core.Cache import Cache, getFamily, isValidStamp, formatSize
 from jasy.core.Repository import isRepository, getRepositoryType, getRepositoryFolder, updateRepository
 from jasy.core.Error import JasyError
 from jasy.core.Util import getKey
@@ -118,16 +118,53 @@ class Project():
         self.assets = {}        
         self.docs = {}
         self.translations = {}
+        
+        # Increased on every scan so that users of the item registries are able to detect changes
+        self.__revision = 0
 
         # Load project configuration
         self.__config = Config(config)
         self.__config.loadValues(os.path.join(self.__path, "jasyproject"), optional=True)
 
+        # Invalidation of cache entries based on either modification times or content checksums
+        self.__cacheInvalidation = self.__config.get("cache.invalidation", "mtime")
+        if not self.__cacheInvalidation in ("mtime", "checksum"):
+            raise JasyError("Unsupported cache invalidation mode: %s" % self.__cacheInvalidation)
+
         # Initialize cache
         try:
-            self.__cache = Cache(self.__path)
+            memory = self.__config.get("cache.memory", None)
+            if memory is not None:
+                # Configured in megabytes
+                memory = int(memory * 1024 * 1024)
+
+            # Compression per key family e.g. {"api" : "lzma:6", "tree" : "none"}
+            compression = {}
+            for family, method in self.__config.get("cache.compression", {}).items():
+                if method is None or method == "none":
+                    compression[family] = None
+                else:
+                    name, level = method.split(":") if ":" in method else (method, 6)
+                    if not name in ("zlib", "lzma"):
+                        raise JasyError("Unsupported cache compression for %s: %s" % (family, method))
+
+                    compression[family] = (name, int(level))
+
+            self.__cache = Cache(self.__path, storage=self.__config.get("cache.storage", "sqlite"), memory=memory, 
+                remote=self.__config.get("cache.remote", None), compression=compression, threshold=self.__config.get("cache.threshold", None))
         except IOError as err:
             raise JasyError("Could not initialize project. Cache file in %s could not be initialized! %s" % (self.__path, err))
+
+        # Mount shared cache bundles (read-only). Bundles only provide text values, see Cache.mount().
+        bundles = self.__config.get("cache.mount", [])
+        if type(bundles) is str:
+            bundles = [bundles]
+
+        for bundle in bundles:
+            try:
+                self.__cache.mount(os.path.join(self.__path, os.path.expanduser(bundle)))
+            except IOError as err:
+                warn("Could not mount cache bundle: %s" % err)
         
         # Read name from manifest or use the basename of the project's path
         self.__name = self.__config.get("name", getProjectNameFromPath(self.__path))
@@ -149,6 +186,15 @@ class Project():
 
     def scan(self):
         
+        # Re-scans start with empty registries so that removed files are dropped
+        if self.__revision > 0:
+            self.classes = {}
+            self.assets = {}
+            self.docs = {}
+            self.translations = {}
+        
+        self.__revision += 1
+        
         # Processing custom content section. Only supports classes and assets.
         if self.__config.has("content"):
             self.kind = "manual"
@@ -476,12 +522,63 @@ class Project():
         
         return self.__cache
     
+    def getCacheInvalidation(self):
+        """Returns the invalidation mode of cache entries (either "mtime" or "checksum")"""
+        
+        return self.__cacheInvalidation
+    
     def clean(self):
         """Clears the cache of the project"""
         
         info("Clearing cache of %s..." % self.__name)
         self.__cache.clear()
         
+    def compact(self, maxSize=None):
+        """
+        Removes cache entries of items which no longer exist or were modified since and compacts
+        the cache. The size of the cache is limited to the given size or the configured size 
+        (cache.size) in megabytes. Entries not related to any item are kept, except for dependency 
+        graphs (see Resolver) where only the most recently used ones are kept (cache.graphs) as the
+        permutations and class sets they were stored for are not known here.
+        """
+        
+        if maxSize is None:
+            maxSize = self.__config.get("cache.size", None)
+        if maxSize is not None:
+            maxSize = int(float(maxSize) * 1024 * 1024)
+            
+        maxEntries = {
+            "dependencies" : int(self.__config.get("cache.graphs", 20))
+        }
+        
+        items = {}
+        items.update(self.docs)
+        items.update(self.classes)
+        
+        paths = set()
+        for registry in (self.classes, self.assets, self.docs, self.translations):
+            for item in registry.values():
+                path = item.getPath()
+                paths.add("|".join(path) if type(path) is list else path)
+        
+        def validate(key, timestamp):
+            start = key.find("[")
+            end = key.find("]", start)
+            if start == -1 or end == -1:
+                return True
+                
+            itemId = key[start+1:end]
+            if getFamily(key) == "fingerprint":
+                return itemId in paths
+                
+            item = items.get(itemId)
+            return item is not None and isValidStamp(item.getStamp(), timestamp)
+            
+        before = self.__cache.getSize()
+        removed = self.__cache.compact(validate, maxSize, maxEntries)
+        
+        info("Compacted cache of %s: Removed %s entries (%s => %s)", colorize(self.__name, "bold"), removed, formatSize(before), formatSize(self.__cache.getSize()))
+        
     def close(self):
         """Closes the project which deletes the internal caches"""
         
@@ -513,6 +610,10 @@ class Project():
         """Returns all package docs"""
         return self.docs
 
+    def getRevision(self):
+        """ Returns the number of scans of the project (used to detect changes of the item registries) """
+        return self.__revision
+
     def getClasses(self):
         """ Returns all project JavaScript classes. Requires all files to have a "js" extension. """
         return self.classes
@@ -7,7 +7,7 @@ import shutil, os, tempfile, re, jasy
 
 from jasy.core.Logging import *
 from jasy.env.Task import task, runTask
-from jasy.env.State import session
+from jasy.env.State import session, prependPrefix
 from jasy.core.Error import JasyError
 from jasy.core.Repository import isRepository, updateRepository
 from jasy.core.Project import getProjectFromPath
@@ -55,6 +55,55 @@ def doctor():
     header("Troubleshooting Environment")
 
 
+@task
+def gc(size=None):
+    """Removes outdated entries from the caches of all projects and compacts them"""
+
+    header("Collecting cache garbage")
+
+    for project in session.getProjects():
+        project.compact(size)
+
+
+@task
+def exportCache(destination="."):
+    """Exports the portable cache entries of all projects as bundles"""
+
+    header("Exporting cache")
+
+    destination = prependPrefix(destination)
+    if not os.path.isdir(destination):
+        os.makedirs(destination)
+
+    for project in session.getProjects():
+        fileName = os.path.normpath(os.path.join(destination, "%s.jasybundle" % project.getName()))
+        counter = project.getCache().export(fileName)
+        info("Exported %s entries of %s to %s", counter, colorize(project.getName(), "bold"), fileName)
+
+
+@task
+def importCache(source="."):
+    """Imports cache bundles previously created by exportCache"""
+
+    header("Importing cache")
+
+    source = prependPrefix(source)
+    found = False
+
+    for project in session.getProjects():
+        fileName = os.path.normpath(os.path.join(source, "%s.jasybundle" % project.getName()))
+        if not os.path.isfile(fileName):
+            debug("No bundle for %s in %s", project.getName(), source)
+            continue
+
+        found = True
+        counter = project.getCache().load(fileName)
+        info("Imported %s entries into %s", counter, colorize(project.getName(), "bold"))
+
+    if not found:
+        warn("Found no cache bundle for any project in %s", source)
+
+
 @task
 def create(name="myproject", origin=None, skeleton=None, **argv):
     """Creates a new project"""
@@ -3,12 +3,18 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import os, shutil, json
+import os, shutil, json, zlib, hashlib
 
 from jasy.env.State import prependPrefix
 from jasy.core.Json import toJson
+from jasy.core.Error import JasyError
 from jasy.core.Logging import *
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 
 def removeDir(dirname):
     """Removes the given directory"""
@@ -128,3 +134,170 @@ def writeFile(dst, content):
 def writeJson(dst, content):
     return writeFile(dst, toJson(content))
 
+
+# Maps logical file names to the names of the files written using content hashes (see FileWriter)
+__hashedNames = {}
+
+
+def getHashedName(fileName):
+    """
+    Returns the name of the file written for the given logical file name when content hashes 
+    are used (see FileWriter). Returns the given name when the file was written without.
+    """
+    
+    return __hashedNames.get(fileName, fileName)
+
+
+def getManifest():
+    """Returns a dict of all logical file names and the names of the files written using content hashes"""
+    
+    return dict(__hashedNames)
+    
+
+def writeManifest(dst="manifest.json"):
+    """
+    Writes a JSON manifest which maps logical file names to the names of the files written
+    using content hashes e.g. {"script/app.js" : "script/app-0beec7b5.js"}
+    """
+    
+    info("Writing manifest with %s files...", len(__hashedNames))
+    writeJson(dst, __hashedNames)
+
+
+def hashFileName(fileName, checksum):
+    """Inserts the first eight characters of the given checksum into the given file name e.g. app-0beec7b5.js"""
+    
+    base, extension = os.path.splitext(fileName)
+    return "%s-%s%s" % (base, checksum[:8], extension)
+
+
+def setHashedName(fileName, hashedName):
+    """Records the name of the file written for the given logical file name (see getHashedName())"""
+    
+    __hashedNames[fileName] = hashedName
+
+
+class FileWriter():
+    """
+    Writes text to the given destination file while it is produced instead of collecting it in 
+    memory first. Optionally writes precompressed siblings of the file at the same time which 
+    might be served directly by web servers and CDNs:
+    
+    - "gz": Gzip file using zlib with the maximum compression level (e.g. app.js.gz)
+    - "br": Brotli file (e.g. app.js.br) - skipped when the brotli module is not installed
+    
+    When hashed is enabled the SHA1 checksum of the content is inserted into the file names 
+    (e.g. app-0beec7b5.js and app-0beec7b5.js.gz) so that these files might be cached forever.
+    The written name is available via getFileName() and is recorded for the manifest (see 
+    getHashedName() and writeManifest()).
+    
+    All files are written to temporary files first and are moved to their final location on 
+    close(). This way no incomplete files are left over when a build fails. Use abort() to 
+    throw away all written data. Writers might be used as context managers which closes
+    the writer on success and aborts it on errors.
+    """
+    
+    def __init__(self, dst, compress=None, hashed=False):
+        self.__fileName = dst
+        self.__path = prependPrefix(dst)
+        self.__checksum = hashlib.sha1() if hashed else None
+        self.__written = []
+        
+        # First test for existance of destination directory
+        directory = os.path.dirname(self.__path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        
+        # List of [file name suffix, temporary path, handle, compress method, flush method]
+        self.__files = []
+        self.__add("", None, None)
+        
+        for method in compress or ():
+            if method == "gz":
+                # Window bits of 31 lead to a Gzip header with a fixed time stamp
+                compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+                self.__add(".gz", compressor.compress, compressor.flush)
+                
+            elif method == "br":
+                if brotli is None:
+                    debug("Skipping %s.br: Brotli is not installed", dst)
+                    continue
+                    
+                compressor = brotli.Compressor(quality=11)
+                self.__add(".br", compressor.process, compressor.finish)
+                
+            else:
+                self.abort()
+                raise JasyError("Unsupported compression method: %s" % method)
+        
+        
+    def __add(self, suffix, compress, flush):
+        temp = "%s%s.tmp%s" % (self.__path, suffix, os.getpid())
+        self.__files.append([suffix, temp, open(temp, mode="wb"), compress, flush])
+        
+        
+    def getFileName(self):
+        """Returns the name of the (main) file - includes the content hash after closing hashed writers"""
+        
+        return self.__fileName
+        
+        
+    def getWrittenPaths(self):
+        """Returns the paths of all files (including precompressed siblings) moved to their final location on close()"""
+        
+        return self.__written
+        
+        
+    def write(self, text):
+        """Appends the given text to all files"""
+        
+        data = text.encode("utf-8")
+        if self.__checksum:
+            self.__checksum.update(data)
+        
+        for suffix, temp, handle, compress, flush in self.__files:
+            handle.write(compress(data) if compress else data)
+            
+            
+    def close(self):
+        """Finishes all files and moves them to their final location"""
+        
+        path = self.__path
+        if self.__checksum:
+            checksum = self.__checksum.hexdigest()
+            path = hashFileName(path, checksum)
+            
+            hashedName = hashFileName(self.__fileName, checksum)
+            setHashedName(self.__fileName, hashedName)
+            self.__fileName = hashedName
+        
+        for suffix, temp, handle, compress, flush in self.__files:
+            if flush:
+                handle.write(flush())
+                
+            handle.close()
+            os.replace(temp, path + suffix)
+            self.__written.append(path + suffix)
+            
+        self.__files = []
+        
+        
+    def abort(self):
+        """Throws away all written data"""
+        
+        for suffix, temp, handle, compress, flush in self.__files:
+            handle.close()
+            os.remove(temp)
+            
+        self.__files = []
+        
+        
+    def __enter__(self):
+        return self
+        
+        
+    def __exit__(self, errorType, errorValue, traceback):
+        if errorType is None:
+            self.close()
+        else:
+            self.abort()
@@ -3,22 +3,25 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import os, random
+import os, random, hashlib, concurrent.futures
+
+import jasy
 
 from jasy.core.Error import JasyError
 from jasy.core.Permutation import Permutation
 from jasy.core.Logging import *
 
-from jasy.env.File import writeFile
+from jasy.env.File import writeFile, FileWriter, setHashedName, getManifest
+from jasy.core.Json import toJson
 
-from jasy.js.Class import ClassError
+from jasy.js.Class import ClassError, compressClassPermutations
 from jasy.js.Resolver import Resolver
 from jasy.js.Sorter import Sorter
 
 from jasy.env.State import session, setPermutation, header, getPermutation, jsOptimization, jsFormatting, assetManager
 
 
-__all__ = ["storeKernel", "storeCompressed", "storeLoader"]
+__all__ = ["storeKernel", "storeCompressed", "storeLoader", "compressParallel", "compressJobs", "buildPermutations", "storeBundles"]
 
 from jasy.js.parse.Parser import parse
 from jasy.js.output.Compressor import Compressor
@@ -40,7 +43,48 @@ def packCode(code):
     return packed
 
 
-def storeKernel(fileName, debug=False):
+def packBootCode(code):
+    """
+    Packs the given boot (or loader) code like packCode(). String literals which reference a file 
+    written with a content hash (see getManifest()) are replaced with the name of the written file. 
+    This way the boot code loads the hashed files as long as these were written before. 
+    
+    Files are referenced by their logical name which is relative to the build folder (as used by 
+    pages stored there) or by a URL ending with "/" and that name e.g. an absolute path or a CDN 
+    URL. Only the matched part is replaced:
+    
+    - core.io.Queue.load(["script/app.js"]) => ["script/app-0beec7b5.js"]
+    - core.io.Queue.load(["./script/app.js"]) => ["./script/app-0beec7b5.js"]
+    - core.io.Queue.load(["//cdn.example.com/script/app.js"]) => ["//cdn.example.com/script/app-0beec7b5.js"]
+    
+    URLs relative to other folders (e.g. "app.js" from a page in the script folder), URLs with a 
+    query or hash and names which are computed at runtime are not replaced.
+    """
+    
+    names = dict((name.replace(os.sep, "/"), hashedName.replace(os.sep, "/")) for name, hashedName in getManifest().items())
+    if not names:
+        return packCode(code)
+    
+    tree = parse(code)
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node.type == "string":
+            value = node.value
+            if value in names:
+                node.value = names[value]
+            else:
+                for name in names:
+                    if value.endswith("/" + name):
+                        node.value = value[:-len(name)] + names[name]
+                        break
+            
+        stack.extend([child for child in node if child is not None])
+    
+    return compressor.compress(tree)
+
+
+def storeKernel(fileName, debug=False, bootCode="", hashed=False):
     """
     Writes a so-called kernel script to the given location. This script contains
     data about possible permutations based on current session values. It optionally
@@ -49,6 +93,11 @@ def storeKernel(fileName, debug=False):
     
     Optimization of the script is auto-enabled when no other information is given.
     
+    The optional boot code is executed once the kernel is loaded. References to files which 
+    were written with content hashes before are replaced with the hashed names (see 
+    packBootCode()). With hashed enabled the kernel itself is written using a content hash 
+    in its file name.
+    
     This method returns the classes which are included by the script so you can 
     exclude it from the real other generated output files.
     """
@@ -73,54 +122,329 @@ def storeKernel(fileName, debug=False):
     
     # Sort resulting class list
     classes = resolver.getSortedClasses()
-    storeCompressed(classes, fileName)
+    storeCompressed(classes, fileName, bootCode, hashed=hashed)
     
     setPermutation(None)
     
     return classes
 
 
-def storeCompressed(classes, fileName, bootCode=""):
+def compressJobs(jobs, translation=None, optimization=None, formatting=None, workers=None):
     """
-    Combines the compressed result of the stored class list
+    Compresses the given list of (class, permutation) jobs which are not yet compressed in the 
+    cache using a pool of worker processes and stores the results in the project caches.
+    Jobs which lead to the same result (the same class with a permutation which is equal 
+    after filtering it by the fields used by the class) are only compressed once.
+    
+    Filtering requires the fields of the class. When these are not cached yet (e.g. on a cold
+    build) the class is not parsed here, instead all its permutations are sent to one worker 
+    which parses the class once, filters the permutations and returns the fields as well. 
+    
+    - jobs: List of (class, permutation) tuples
+    - workers: Number of processes to use (defaults to the number of CPUs)
+    """
+    
+    if not workers:
+        workers = os.cpu_count() or 1
+    
+    # Permutations to compress per class. Keys are filtered permutations when the fields of
+    # the class are known and the permutations as given otherwise.
+    pending = {}
+    for classObj, permutation in jobs:
+        if classObj.getFields(compute=False) is not None:
+            key = str(classObj.filterPermutation(permutation))
+            if classObj.getCompressed(permutation, translation, optimization, formatting, compute=False) is not None:
+                continue
+        else:
+            key = "unfiltered:%s" % permutation
+            
+        permutations = pending.setdefault(classObj, {})
+        if not key in permutations:
+            permutations[key] = permutation
+    
+    jobs = [(classObj, list(pending[classObj].values())) for classObj in pending]
+    if len(jobs) < 2 or workers < 2:
+        return
+        
+    info("Compressing %s classes using %s processes...", len(jobs), workers)
+    
+    with concurrent.futures.ProcessPoolExecutor(min(workers, len(jobs))) as executor:
+        futures = []
+        for classObj, permutations in jobs:
+            # Prefer serialized trees as loading them is a lot faster than parsing
+            data = classObj.getSerializedTree()
+            text = None if data is not None else classObj.getText()
+            
+            futures.append(executor.submit(compressClassPermutations, classObj.getId(), text, data, permutations, 
+                translation, optimization, formatting))
+            
+        for (classObj, permutations), future in zip(jobs, futures):
+            try:
+                fields, results = future.result()
+            except Exception as error:
+                raise JasyError("Error during class compression! Error processing class %s: %s" % (classObj.getId(), error))
+            
+            classObj.setFields(fields)
+            
+            stored = set()
+            for permutation, compressed in zip(permutations, results):
+                key = str(classObj.filterPermutation(permutation))
+                if not key in stored:
+                    stored.add(key)
+                    classObj.setCompressed(compressed, permutation, translation, optimization, formatting)
+
+
+def compressParallel(classes, permutation=None, translation=None, optimization=None, formatting=None, workers=None):
+    """
+    Compresses all classes which are not yet compressed in the cache using a pool of
+    worker processes and stores the results in the project caches.
+    
+    - classes: List of classes to compress
+    - workers: Number of processes to use (defaults to the number of CPUs)
+    """
+    
+    compressJobs([(classObj, permutation) for classObj in classes], translation, optimization, formatting, workers)
+
+
+def __getBuildFingerprint(classes, fileName, packedBootCode, permutation, translation, compress, hashed, assetData):
+    """
+    Returns a fingerprint (SHA1) of everything which affects the output of storeCompressed(). Classes
+    are identified by the fingerprints of their content which are memoized by file stat.
+    """
+    
+    sha1 = hashlib.sha1()
+    
+    for classObj in classes:
+        sha1.update(("%s:%s|" % (classObj.getId(), classObj.getFingerprint())).encode("utf-8"))
+    
+    sha1.update(("|".join([
+        fileName,
+        packedBootCode or "",
+        permutation.getKey() if permutation else "",
+        translation.getChecksum() if translation else "",
+        jsOptimization.getKey() if jsOptimization else "",
+        jsFormatting.getKey() if jsFormatting else "",
+        ",".join(compress or []),
+        str(hashed),
+        jasy.__version__
+    ])).encode("utf-8"))
+    
+    sha1.update((assetData or "").encode("utf-8"))
+    
+    return sha1.hexdigest()
+
+
+def storeCompressed(classes, fileName, bootCode="", workers=None, permutation=None, compress=None, hashed=False):
+    """
+    Combines the compressed result of the stored class list. The output is written to the 
+    file while it is produced (see jasy.env.File.FileWriter). Returns the name of the written file.
     
     - classes: List of sorted classes to compress
     - fileName: Filename to write result to
-    - bootCode: Code to execute once all the classes are loaded
+    - bootCode: Code to execute once all the classes are loaded (references to hashed files are replaced, see packBootCode())
+    - workers: Number of processes to compress classes with (0 means all CPUs, default is to not use other processes)
+    - permutation: Permutation to compress classes for (defaults to the current permutation)
+    - compress: List of precompressed siblings to write as well e.g. ["gz", "br"]
+    - hashed: Whether to insert a hash of the content into the file name e.g. app-0beec7b5.js
+    
+    A fingerprint of the classes, permutation, optimization, formatting and asset data of the 
+    output is stored in the cache of the main project. When it matches the fingerprint of the 
+    last build and the output files still exist nothing is written and the files are kept untouched.
     """
     
+    # FIXME
+    translation = None 
+    
+    if permutation is None:
+        permutation = getPermutation()
+    
+    assetData = assetManager.export(classes, permutation)
+    packedBootCode = packBootCode("(function(){%s})();" % bootCode) if bootCode else None
+    
+    main = session.getMain()
+    if main is not None:
+        cache = main.getCache()
+        # Outputs are no items of the project so the key must not use brackets (see Project.compact())
+        field = "build-%s" % hashlib.sha1(fileName.encode("utf-8")).hexdigest()
+        fingerprint = __getBuildFingerprint(classes, fileName, packedBootCode, permutation, translation, compress, hashed, assetData)
+        
+        stored = cache.read(field)
+        if stored is not None and stored[0] == fingerprint and all([os.path.exists(path) for path in stored[2]]):
+            info("Output %s is up-to-date", colorize(stored[1], "bold"))
+            if hashed:
+                setHashedName(fileName, stored[1])
+                
+            return stored[1]
+    
+    if workers is not None:
+        compressParallel(classes, permutation, translation, jsOptimization, jsFormatting, workers)
+    
     info("Merging compressed output of %s classes...", len(classes))
     indent()
-    result = []
     
-    try:
-        # FIXME
-        translation = None 
+    with FileWriter(fileName, compress, hashed) as writer:
+        try:
+            for classObj in classes:
+                #debug("Adding class %s", classObj.id)
+                #indent()
+                writer.write(classObj.getCompressed(permutation, translation, jsOptimization, jsFormatting))
+                #outdent()
+                
+        except ClassError as error:
+            raise JasyError("Error during class compression! %s" % error)
+
+        outdent()
+
+        if assetData:
+            assetCode = 'core.io.Asset.addData(%s);' % assetData
+            writer.write(packCode(assetCode))
+
+        if packedBootCode:
+            writer.write(packedBootCode)
+
+    if main is not None:
+        cache.store(field, (fingerprint, writer.getFileName(), writer.getWrittenPaths()))
+
+    return writer.getFileName()
+
+
+def storeBundles(entries, fileName="script/%s.js", manifestName="script/manifest.json", exclude=None, permutation=None, workers=None, compress=None, hashed=False):
+    """
+    Splits the classes of multiple entry points (e.g. pages) into bundles. Every entry point 
+    requires a list of classes. Classes are grouped into chunks by the set of entry points 
+    which use them: classes of only one entry point are stored in a bundle named like the 
+    entry point, classes shared by multiple entry points are stored in a bundle named "shared-" 
+    followed by the names of these entry points. This way every entry point loads only the 
+    classes it needs and shared classes are loaded (and cached) only once.
+    
+    Additionally writes a JSON manifest with the bundles to load for each entry point. Bundles 
+    are listed in load order. Returns the manifest data.
+    
+    - entries: Dict of entry point names and the list of class names they require
+    - fileName: File name pattern of the bundles (%s is replaced with the name of the bundle)
+    - manifestName: File name of the manifest
+    - exclude: List of classes to exclude from all bundles (e.g. classes of the kernel)
+    - permutation: Permutation to build bundles for (defaults to the current permutation)
+    - workers: Number of processes to compress classes with (see storeCompressed())
+    - compress: List of precompressed siblings to write for each bundle (see storeCompressed())
+    - hashed: Whether to insert a hash of the content into the file names of the bundles
+    """
+    
+    if permutation is None:
+        permutation = getPermutation()
+    
+    header("Storing bundles...")
+    
+    # Detect classes used by each entry point
+    usage = {}
+    combined = Resolver(permutation)
+    for entryName in sorted(entries):
+        classNames = entries[entryName]
+        if isinstance(classNames, str):
+            classNames = [classNames]
         
-        for classObj in classes:
-            #debug("Adding class %s", classObj.id)
-            #indent()
-            result.append(classObj.getCompressed(getPermutation(), translation, jsOptimization, jsFormatting))
-            #outdent()
+        resolver = Resolver(permutation)
+        for className in classNames:
+            resolver.addClassName(className)
+            combined.addClassName(className)
             
-    except ClassError as error:
-        raise JasyError("Error during class compression! %s" % error)
-
-    outdent()
+        if exclude:
+            resolver.excludeClasses(exclude)
+            
+        for classObj in resolver.getIncludedClasses():
+            if classObj in usage:
+                usage[classObj].add(entryName)
+            else:
+                usage[classObj] = set([entryName])
+    
+    if exclude:
+        combined.excludeClasses(exclude)
+    
+    # Group the sorted list of all classes by their usage. Keeping the order of
+    # the combined list guarantees a valid order inside each chunk.
+    chunks = {}
+    for classObj in combined.getSortedClasses():
+        key = tuple(sorted(usage[classObj]))
+        if key in chunks:
+            chunks[key].append(classObj)
+        else:
+            chunks[key] = [classObj]
+    
+    # Classes only depend on classes which are used by the same or more entry points
+    # so loading chunks with more entry points first is always a valid order.
+    order = sorted(chunks, key=lambda key: (-len(key), key))
+    
+    info("Splitting %s classes of %s entries into %s bundles...", len(usage), len(entries), len(order))
+    
+    if workers is not None:
+        compressParallel(list(usage), permutation, None, jsOptimization, jsFormatting, workers)
+    
+    files = {}
+    for key in order:
+        name = key[0] if len(key) == 1 else "shared-%s" % "-".join(key)
+        
+        info("Bundle %s (%s classes)...", colorize(name, "bold"), len(chunks[key]))
+        indent()
+        files[key] = storeCompressed(chunks[key], fileName % name, permutation=permutation, compress=compress, hashed=hashed)
+        outdent()
 
-    assetData = assetManager.export(classes)
-    if assetData:
-        assetCode = 'core.io.Asset.addData(%s);' % assetData
-        result.append(packCode(assetCode))
+    manifest = {}
+    for entryName in entries:
+        manifest[entryName] = [files[key] for key in order if entryName in key]
+        
+    writeFile(manifestName, toJson(manifest))
+    
+    return manifest
 
-    if bootCode:
-        wrappedBootCode = "(function(){%s})();" % bootCode
-        result.append(packCode(wrappedBootCode))
 
-    writeFile(fileName, "".join(result))
+def buildPermutations(build, permutations=None, workers=None, compress=None, hashed=False):
+    """
+    Builds all given permutations (defaults to all permutations of the session) at once.
+    
+    The build callback is called with each permutation and returns a list of outputs to 
+    write as (fileName, classes, bootCode) tuples. It should resolve classes using 
+    Resolver(permutation) instead of relying on the global permutation. Resolving and sorting 
+    still happen in the main process, once per permutation. Only the compression is shared: 
+    all classes of all permutations are compressed in one pool of worker processes and classes 
+    which are identical in multiple permutations (see Class.filterPermutation) are only 
+    compressed once. Finally all outputs are merged from the cached results.
+    
+    - build: Callback returning the outputs of a permutation
+    - permutations: List of permutations to build
+    - workers: Number of processes to use (defaults to the number of CPUs)
+    - compress: List of precompressed siblings to write for each output (see storeCompressed())
+    - hashed: Whether to insert a hash of the content into the file names (see getHashedName())
+    """
+    
+    # FIXME
+    translation = None 
+    
+    if permutations is None:
+        permutations = session.getPermutations()
+    
+    header("Building %s permutations..." % len(permutations))
+    
+    builds = []
+    jobs = []
+    for permutation in permutations:
+        outputs = build(permutation) or []
+        builds.append((permutation, outputs))
+        
+        for fileName, classes, bootCode in outputs:
+            jobs.extend((classObj, permutation) for classObj in classes)
+    
+    compressJobs(jobs, translation, jsOptimization, jsFormatting, workers)
+    
+    length = len(builds)
+    for pos, (permutation, outputs) in enumerate(builds):
+        info(colorize("Permutation %s/%s:" % (pos+1, length), "bold"))
+        indent()
+        for fileName, classes, bootCode in outputs:
+            storeCompressed(classes, fileName, bootCode, permutation=permutation, compress=compress, hashed=hashed)
+        outdent()
 
 
-def storeLoader(classes, fileName, bootCode="", urlPrefix=""):
+def storeLoader(classes, fileName, bootCode="", urlPrefix="", fast=False, hashed=False):
     """
     Generates a source loader which is basically a file which loads the original JavaScript files.
     This is super useful during development of a project as it supports pretty fast workflows
@@ -128,8 +452,12 @@ def storeLoader(classes, fileName, bootCode="", urlPrefix=""):
     
     - classes: List of sorted classes to compress
     - fileName: Filename to write result to
-    - bootCode: Code to execute once all classes have been loaded
+    - bootCode: Code to execute once all classes have been loaded (references to hashed files are replaced, see packBootCode())
     - urlPrefix: Prepends the given URL prefix to all class URLs to load
+    - fast: Collect asset hints without parsing classes (use together with Resolver(fast=True))
+    - hashed: Whether to insert a hash of the content into the file name (see getHashedName())
+    
+    Returns the name of the written file.
     """
     
     info("Generating loader for %s classes...", len(classes))
@@ -153,15 +481,18 @@ def storeLoader(classes, fileName, bootCode="", urlPrefix=""):
     result = []
     outdent()
     
-    assetData = assetManager.export(classes)
+    assetData = assetManager.export(classes, fast=fast)
     if assetData:
         assetCode = 'core.io.Asset.addData(%s);' % assetData
         result.append(packCode(assetCode))
 
     wrappedBootCode = "function(){%s}" % bootCode if bootCode else "null"
     loaderCode = 'core.io.Queue.load([%s], %s, null, true);' % (loader, wrappedBootCode)
-    result.append(packCode(loaderCode))
+    result.append(packBootCode(loaderCode))
 
-    writeFile(fileName, "".join(result))
+    with FileWriter(fileName, hashed=hashed) as writer:
+        writer.write("".join(result))
+        
+    return writer.getFileName()
 
 
@@ -12,6 +12,10 @@ from jasy.core.Json import toJson
 from jasy.core.Project import Project, getProjectFromPath, getProjectDependencies
 from jasy.core.Permutation import Permutation
 from jasy.core.Config import findConfig
+from jasy.core.Cache import mergeStatistics
+from jasy.js.ClassRegistry import ClassRegistry
+
+import jasy.js.parse.SourceStore as SourceStore
 
 from jasy.core.Error import JasyError
 from jasy.env.State import setPermutation, header
@@ -34,6 +38,10 @@ class Session():
         self.__projectByName = {}
         self.__fields = {}
         
+        # Registry of all classes and the project revisions it was created for
+        self.__classRegistry = None
+        self.__classRegistryKey = None
+        
         if findConfig("jasyproject"):
 
             header("Initializing project")
@@ -63,6 +71,9 @@ class Session():
             project.close()
         
         self.__projects = None
+        
+        # Sources of parsed classes are not needed anymore
+        SourceStore.clear()
     
     
     def pause(self):
@@ -79,13 +90,30 @@ class Session():
             project.resume()
             
     
+    def getCacheStatistics(self):
+        """Returns the merged cache statistics (see Cache.getStatistics()) of all known projects"""
+        
+        return mergeStatistics(*[project.getCache().getStatistics() for project in self.__projects])
+    
+    
     def getClassByName(self, className):
         """Queries all currently known projects for the given class and returns the class object"""
 
-        for project in self.__projects:
-            classes = project.getClasses()
-            if className in classes:
-                return classes[className]
+        return self.getClassRegistry().get(className)
+    
+    
+    def getClassRegistry(self):
+        """
+        Returns the registry of all classes of all known projects (see jasy.js.ClassRegistry). 
+        The registry is re-created whenever projects are added or re-scanned.
+        """
+        
+        key = [(project, project.getRevision()) for project in self.__projects]
+        if self.__classRegistry is None or key != self.__classRegistryKey:
+            self.__classRegistry = ClassRegistry(self.__projects)
+            self.__classRegistryKey = key
+            
+        return self.__classRegistry
     
     
     
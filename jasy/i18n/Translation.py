@@ -3,7 +3,7 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import re, copy, json, polib
+import re, copy, json, hashlib, polib
 from jasy.core.Error import JasyError
 from jasy.core.Logging import *
 
@@ -41,6 +41,7 @@ class TranslationError(Exception):
 class Translation:
     def __init__(self, locale, files=None, table=None):
         self.__locale = locale
+        self.__checksum = None
 
         debug("Initialize translation: %s" % locale)
         self.__table = {}
@@ -78,6 +79,15 @@ class Translation:
         pass
         # TODO
         
+    def getChecksum(self):
+        """Returns a checksum (SHA1) of the locale and all translated texts"""
+        
+        if self.__checksum is None:
+            data = json.dumps([self.__locale, self.__table], sort_keys=True)
+            self.__checksum = hashlib.sha1(data.encode("utf-8")).hexdigest()
+            
+        return self.__checksum
+        
         
     def __str__(self):
         return "Translation(%s)" % self.__locale
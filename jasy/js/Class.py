@@ -3,12 +3,14 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import os, copy, zlib
+import os, zlib, jasy
 
 from jasy.core.Error import JasyError
 
 import jasy.js.parse.Parser as Parser
 import jasy.js.parse.ScopeScanner as ScopeScanner
+import jasy.js.parse.Serializer as Serializer
+import jasy.js.tokenize.DependencyScanner as DependencyScanner
 
 import jasy.js.clean.DeadCode
 import jasy.js.clean.Unused
@@ -36,8 +38,6 @@ except:
     highlight = None
 
 
-aliases = {}
-
 defaultOptimization = jasy.js.output.Optimization.Optimization("declarations", "blocks", "variables")
 defaultPermutation = getPermutation({"debug" : False})
 
@@ -64,6 +64,82 @@ def collectFields(node, keys=None):
     return keys
 
 
+def optimizeTree(tree, permutation=None):
+    """Applies the given permutation to the given (scanned) tree and removes dead and unused code"""
+    
+    if permutation:
+        jasy.js.clean.Permutate.patch(tree, permutation)
+
+    jasy.js.clean.DeadCode.cleanup(tree)
+    ScopeScanner.scan(tree)
+    jasy.js.clean.Unused.cleanup(tree)
+    
+    
+def compressTree(tree, translation=None, optimization=None, formatting=None):
+    """Returns the compressed code of the given optimized tree. Translation and optimization modify the tree."""
+    
+    if translation:
+        translation.patch(tree)
+
+    if optimization:
+        optimization.apply(tree)
+        
+    return Compressor(formatting).compress(tree)
+    
+    
+def loadTree(classId, text=None, data=None):
+    """Returns the scanned tree of a class given either as text or as serialized tree (see Class.getSerializedTree())"""
+    
+    if data is not None:
+        return Serializer.load(data)
+
+    tree = Parser.parse(text, classId)
+    ScopeScanner.scan(tree)
+    
+    return tree
+    
+
+def compressClass(classId, text=None, data=None, permutation=None, translation=None, optimization=None, formatting=None):
+    """
+    Returns the compressed code of a class without making use of any project or cache. The class
+    is either given as text or as serialized tree (see Class.getSerializedTree()). This is used
+    for compressing classes in other processes.
+    """
+    
+    tree = loadTree(classId, text, data)
+    optimizeTree(tree, permutation)
+    return compressTree(tree, translation, optimization, formatting)
+
+
+def compressClassPermutations(classId, text=None, data=None, permutations=None, translation=None, optimization=None, formatting=None):
+    """
+    Like compressClass() but compresses the class for each of the given permutations. Permutations
+    are filtered by the fields used by the class here (see Class.filterPermutation()) so that callers
+    do not need to parse the class for it. Permutations which are equal after filtering are compressed
+    only once. Returns the tuple (fields, list of compressed code in the order of the permutations).
+    """
+    
+    permutations = permutations or [None]
+    tree = loadTree(classId, text, data)
+    fields = collectFields(tree)
+    
+    results = {}
+    compressed = []
+    for permutation in permutations:
+        filtered = permutation.filter(fields) if permutation and fields else None
+        key = str(filtered)
+        if not key in results:
+            # The tree is modified by the optimizers
+            copied = tree.clone() if len(permutations) > 1 else tree
+            optimizeTree(copied, filtered)
+            results[key] = compressTree(copied, translation, optimization, formatting)
+            
+        compressed.append(results[key])
+        
+    return fields, compressed
+
+
+
 class ClassError(Exception):
     def __init__(self, inst, msg):
         self.__msg = msg
@@ -80,27 +156,76 @@ class Class(Item):
     def __getTree(self, context=None):
         
         field = "tree[%s]" % self.id
-        tree = self.project.getCache().read(field, self.mtime)
+        cache = self.project.getCache()
+        stamp = self.getStamp()
+
+        tree = cache.read(field, stamp)
         if not tree:
-            info("Processing class %s %s...", colorize(self.id, "bold"), colorize("[%s]" % context, "cyan"))
-            
-            indent()
-            tree = Parser.parse(self.getText(), self.id)
-            ScopeScanner.scan(tree)
-            outdent()
+            # Restore the scanned tree from its serialized form. There is no need
+            # to keep the serialized data in memory as the tree is pinned afterwards.
+            serializedField = "ast[%s]" % self.id
+            data = cache.read(serializedField, stamp, memory=False)
+            if data is not None:
+                try:
+                    tree = Serializer.load(data)
+                except Serializer.SerializerError as ex:
+                    debug("Ignoring serialized tree of %s: %s", self.id, ex)
+
+            if not tree:
+                info("Processing class %s %s...", colorize(self.id, "bold"), colorize("[%s]" % context, "cyan"))
+                
+                indent()
+                tree = Parser.parse(self.getText(), self.id)
+                ScopeScanner.scan(tree)
+                outdent()
+
+                try:
+                    cache.store(serializedField, Serializer.dump(tree), stamp, memory=False)
+                except Serializer.SerializerError as ex:
+                    debug("Could not serialize tree of %s: %s", self.id, ex)
             
-            self.project.getCache().store(field, tree, self.mtime, True)
+            # Plain trees are the base of all permutations so pin them in memory
+            cache.store(field, tree, stamp, True, True)
         
         return tree
     
     
-    def __getOptimizedTree(self, permutation=None, context=None):
-        """Returns an optimized tree with permutations applied"""
+    def __copyTree(self, context=None):
+        """
+        Returns a private copy of the plain tree which might be modified by the caller. The 
+        shared plain tree is never modified. Copies are restored from the serialized tree 
+        which is a lot faster than cloning the shared tree node by node.
+        """
+        
+        # Makes sure that the tree was parsed and serialized before
+        tree = self.__getTree(context)
+        
+        data = self.getSerializedTree()
+        if data is not None:
+            try:
+                return Serializer.load(data)
+            except Serializer.SerializerError as ex:
+                debug("Ignoring serialized tree of %s: %s", self.id, ex)
+        
+        return tree.clone()
+    
+    
+    def getSerializedTree(self):
+        """Returns the serialized tree of the class (see parse/Serializer.py) when available in the cache"""
+        
+        return self.project.getCache().read("ast[%s]" % self.id, self.getStamp(), memory=False)
+    
+    
+    def __getOptimizedTree(self, permutation=None, context=None, private=False):
+        """
+        Returns an optimized tree with permutations applied. Private trees are not 
+        shared through the cache and might be modified by the caller.
+        """
 
         field = "opt-tree[%s]-%s" % (self.id, permutation)
-        tree = self.project.getCache().read(field, self.mtime)
+        tree = None if private else self.project.getCache().read(field, self.getStamp())
         if not tree:
-            tree = copy.deepcopy(self.__getTree("%s:plain" % context))
+            tree = self.__copyTree("%s:plain" % context)
 
             # Logging
             msg = "Processing class %s" % colorize(self.id, "bold")
@@ -112,33 +237,34 @@ class Class(Item):
             info("%s..." % msg)
             indent()
 
-            # Apply permutation
-            if permutation:
-                jasy.js.clean.Permutate.patch(tree, permutation)
-
-            # Cleanups
-            jasy.js.clean.DeadCode.cleanup(tree)
-            ScopeScanner.scan(tree)
-            jasy.js.clean.Unused.cleanup(tree)
+            # Apply permutation and cleanup
+            optimizeTree(tree, permutation)
         
-            self.project.getCache().store(field, tree, self.mtime, True)
+            if not private:
+                self.project.getCache().store(field, tree, self.getStamp(), True)
+                
             outdent()
 
         return tree
 
 
-    def getDependencies(self, permutation=None, classes=None, warnings=True):
+    def getDependencies(self, permutation=None, classes=None, warnings=True, fast=False):
         """ 
-        Returns a set of dependencies seen through the given list of known 
-        classes (ignoring all unknown items in original set). This method
+        Returns a set of dependencies seen through the given registry of known 
+        classes (see ClassRegistry.py) ignoring all unknown items. This method
         makes use of the meta data (see core/MetaData.py) and the variable data 
-        (see parse/ScopeData.py).
+        (see parse/ScopeData.py). In fast mode the data is collected without 
+        parsing the class (see getDependencyData()) and permutations are ignored.
         """
         
-        permutation = self.filterPermutation(permutation)
-        
-        meta = self.getMetaData(permutation)
-        scope = self.getScopeData(permutation)
+        if fast:
+            meta = scope = self.getDependencyData()
+            
+        else:
+            permutation = self.filterPermutation(permutation)
+            
+            meta = self.getMetaData(permutation)
+            scope = self.getScopeData(permutation)
         
         result = set()
         
@@ -156,28 +282,9 @@ class Class(Item):
         
         # Add classes from detected package access
         for package in scope.packages:
-            if package in aliases:
-                className = aliases[package]
-                if className in classes:
-                    result.add(classes[className])
-                    continue
-            
-            orig = package
-            while True:
-                if package == self.id:
-                    break
-            
-                elif package in classes and classes[package].kind == "class":
-                    aliases[orig] = package
-                    result.add(classes[package])
-                    break
-            
-                else:
-                    pos = package.rfind(".")
-                    if pos == -1:
-                        break
-                    
-                    package = package[0:pos]
+            classObj = classes.findClass(package)
+            if classObj is not None and classObj.getId() != self.id:
+                result.add(classObj)
                     
         # Manually excluded names/classes
         for name in meta.optionals:
@@ -189,6 +296,22 @@ class Class(Item):
         return result
         
         
+    def getDependencyData(self):
+        """
+        Returns the dependency relevant data of the class (meta data tags and used names)
+        collected by scanning the source without parsing it (see tokenize/DependencyScanner.py).
+        The data is a super set of the data of the parsed class without any permutation applied.
+        """
+        
+        field = "deps[%s]" % self.id
+        data = self.project.getCache().read(field, self.getStamp())
+        if data is None:
+            data = DependencyScanner.scan(self.getText())
+            self.project.getCache().store(field, data, self.getStamp())
+            
+        return data
+        
+        
     def getScopeData(self, permutation=None):
         """
         Returns the top level scope object which contains information about the
@@ -198,17 +321,17 @@ class Class(Item):
         permutation = self.filterPermutation(permutation)
         
         field = "scope[%s]-%s" % (self.id, permutation)
-        scope = self.project.getCache().read(field, self.mtime)
+        scope = self.project.getCache().read(field, self.getStamp())
         if scope is None:
             scope = self.__getOptimizedTree(permutation, "scope").scope
-            self.project.getCache().store(field, scope, self.mtime)
+            self.project.getCache().store(field, scope, self.getStamp())
         
         return scope
         
         
     def getApi(self, highlight=True):
         field = "api[%s]-%s" % (self.id, highlight)
-        apidata = self.project.getCache().read(field, self.mtime)
+        apidata = self.project.getCache().read(field, self.getStamp())
         if apidata is None:
             apidata = ApiData(self.id, highlight)
             
@@ -227,14 +350,14 @@ class Class(Item):
             apidata.addSize(self.getSize())
             apidata.addFields(self.getFields())
             
-            self.project.getCache().store(field, apidata, self.mtime)
+            self.project.getCache().store(field, apidata, self.getStamp())
 
         return apidata
 
 
     def getHighlightedCode(self):
         field = "highlighted[%s]" % self.id
-        source = self.project.getCache().read(field, self.mtime)
+        source = self.project.getCache().read(field, self.getStamp())
         if source is None:
             if highlight is None:
                 raise JasyError("Could not highlight JavaScript code! Please install Pygments.")
@@ -243,7 +366,7 @@ class Class(Item):
             formatter = HtmlFormatter(full=True, style="autumn", linenos="table", lineanchors="line")
             source = highlight(self.getText(), lexer, formatter)
             
-            self.project.getCache().store(field, source, self.mtime)
+            self.project.getCache().store(field, source, self.getStamp())
 
         return source
 
@@ -252,30 +375,41 @@ class Class(Item):
         permutation = self.filterPermutation(permutation)
         
         field = "meta[%s]-%s" % (self.id, permutation)
-        meta = self.project.getCache().read(field, self.mtime)
+        meta = self.project.getCache().read(field, self.getStamp())
         if meta is None:
             meta = MetaData(self.__getOptimizedTree(permutation, "meta"))
-            self.project.getCache().store(field, meta, self.mtime)
+            self.project.getCache().store(field, meta, self.getStamp())
             
         return meta
         
         
-    def getFields(self):
+    def getFields(self, compute=True):
+        """
+        Returns the names of the permutation fields used by the class. When compute is 
+        disabled only cached results are returned (otherwise None).
+        """
+        
         field = "fields[%s]" % (self.id)
-        fields = self.project.getCache().read(field, self.mtime)
-        if fields is None:
+        fields = self.project.getCache().read(field, self.getStamp())
+        if fields is None and compute:
             fields = collectFields(self.__getTree(context="fields"))
-            self.project.getCache().store(field, fields, self.mtime)
+            self.setFields(fields)
         
         return fields
+        
+        
+    def setFields(self, fields):
+        """Stores the given field names of the class e.g. when they were collected by another process"""
+        
+        self.project.getCache().store("fields[%s]" % (self.id), fields, self.getStamp())
 
 
     def usesTranslation(self):
         field = "translation[%s]" % (self.id)
-        result = self.project.getCache().read(field, self.mtime)
+        result = self.project.getCache().read(field, self.getStamp())
         if result is None:
             result = hasText(self.__getTree(context="i18n"))
-            self.project.getCache().store(field, result, self.mtime)
+            self.project.getCache().store(field, result, self.getStamp())
         
         return result
         
@@ -296,36 +430,67 @@ class Class(Item):
         return None
         
         
-    def getCompressed(self, permutation=None, translation=None, optimization=None, formatting=None, context="compressed"):
+    def getCompressed(self, permutation=None, translation=None, optimization=None, formatting=None, context="compressed", compute=True):
+        """
+        Returns the compressed code of the class. When compute is disabled only 
+        cached results are returned (otherwise None).
+        """
+        
         permutation = self.filterPermutation(permutation)
         translation = self.filterTranslation(translation)
         
+        cache = self.project.getCache()
         field = "compressed[%s]-%s-%s-%s-%s" % (self.id, permutation, translation, optimization, formatting)
-        compressed = self.project.getCache().read(field, self.mtime)
-        if compressed == None:
-            tree = self.__getOptimizedTree(permutation, context)
-            
-            if translation or optimization:
-                tree = copy.deepcopy(tree)
+        compressed = cache.read(field, self.getStamp())
+        if compressed == None and cache.hasRemote():
+            remoteField = self.__getRemoteField(permutation, translation, optimization, formatting)
+            compressed = cache.readRemote(remoteField)
+            if compressed is not None:
+                cache.store(field, compressed, self.getStamp())
+
+        if compressed == None and compute:
+            # Translation and optimization modify the tree so these require a private tree
+            tree = self.__getOptimizedTree(permutation, context, bool(translation or optimization))
             
-                if translation:
-                    translation.patch(tree)
-
-                if optimization:
-                    try:
-                        optimization.apply(tree)
-                    except jasy.js.output.Optimization.Error as error:
-                        raise ClassError(self, "Could not compress class! %s" % error)
+            try:
+                compressed = compressTree(tree, translation, optimization, formatting)
+            except jasy.js.output.Optimization.Error as error:
+                raise ClassError(self, "Could not compress class! %s" % error)
                 
-            compressed = Compressor(formatting).compress(tree)
-            self.project.getCache().store(field, compressed, self.mtime)
+            self.setCompressed(compressed, permutation, translation, optimization, formatting)
             
         return compressed
+        
+        
+    def setCompressed(self, compressed, permutation=None, translation=None, optimization=None, formatting=None):
+        """Stores the given compressed code of the class e.g. when it was compressed by another process"""
+        
+        permutation = self.filterPermutation(permutation)
+        translation = self.filterTranslation(translation)
+        
+        cache = self.project.getCache()
+        field = "compressed[%s]-%s-%s-%s-%s" % (self.id, permutation, translation, optimization, formatting)
+        cache.store(field, compressed, self.getStamp())
+
+        if cache.hasRemote():
+            cache.storeRemote(self.__getRemoteField(permutation, translation, optimization, formatting), compressed)
+
+
+    def __getRemoteField(self, permutation, translation, optimization, formatting):
+        """
+        Returns the key of compressed results in the remote cache. Other than local keys 
+        this one describes the content of the class and translation instead of relying 
+        on timestamps. The Jasy version is part of the key as the compression might differ.
+        """
+
+        return "compressed[%s]-%s-%s-%s-%s-%s-%s" % (self.id, self.getFingerprint(), permutation.getKey() if permutation else None, 
+            translation.getChecksum() if translation else None, optimization.getKey() if optimization else None, 
+            formatting.getKey() if formatting else None, jasy.__version__)
             
             
     def getSize(self):
         field = "size[%s]" % self.id
-        size = self.project.getCache().read(field, self.mtime)
+        size = self.project.getCache().read(field, self.getStamp())
         
         if size is None:
             compressed = self.getCompressed(context="size")
@@ -338,7 +503,7 @@ class Class(Item):
                 "zipped" : len(zipped)
             }
             
-            self.project.getCache().store(field, size, self.mtime)
+            self.project.getCache().store(field, size, self.getStamp())
             
         return size
         
@@ -0,0 +1,108 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import hashlib
+
+__all__ = ["ClassRegistry"]
+
+
+class ClassRegistry():
+    """
+    Registry of all classes of a list of projects. Classes of later projects override
+    classes with the same name of earlier projects. Class names are additionally stored in
+    a prefix tree (trie) of their dot separated parts so that the longest class name which
+    is a prefix of any package name (e.g. "foo.Bar" for "foo.Bar.baz.qux") is found using
+    a single pass over the parts of the name.
+
+    Registries are created by the session (see Session.getClassRegistry()) and re-created
+    whenever projects are added or re-scanned.
+    """
+
+    def __init__(self, projects=None):
+        self.__classes = {}
+        self.__trie = {}
+        self.__checksum = None
+
+        if projects:
+            for project in projects:
+                self.__classes.update(project.getClasses())
+
+        for className in self.__classes:
+            if self.__classes[className].kind == "class":
+                self.__insert(className)
+
+
+    def __insert(self, className):
+        """Adds the given class name to the prefix tree"""
+
+        node = self.__trie
+        for part in className.split("."):
+            entry = node.get(part)
+            if entry is None:
+                entry = node[part] = [None, {}]
+
+            # Entries are [class object or None, children]
+            last = entry
+            node = entry[1]
+
+        last[0] = self.__classes[className]
+
+
+    def __contains__(self, className):
+        return className in self.__classes
+
+
+    def __getitem__(self, className):
+        return self.__classes[className]
+
+
+    def __iter__(self):
+        return iter(self.__classes)
+
+
+    def __len__(self):
+        return len(self.__classes)
+
+
+    def get(self, className, default=None):
+        return self.__classes.get(className, default)
+
+
+    def getClasses(self):
+        """Returns a dict of all classes by their name"""
+
+        return self.__classes
+
+
+    def getChecksum(self):
+        """Returns a checksum of the names of all classes"""
+
+        if self.__checksum is None:
+            self.__checksum = hashlib.sha1("|".join(sorted(self.__classes)).encode("utf-8")).hexdigest()
+
+        return self.__checksum
+
+
+    def findClass(self, name):
+        """
+        Returns the class with the longest name which is equal to the given name or one
+        of its dot separated prefixes (e.g. "foo.Bar" for "foo.Bar.baz"). Returns None
+        when there is no such class.
+        """
+
+        found = None
+        node = self.__trie
+
+        for part in name.split("."):
+            entry = node.get(part)
+            if entry is None:
+                break
+
+            if entry[0] is not None:
+                found = entry[0]
+
+            node = entry[1]
+
+        return found
@@ -10,9 +10,13 @@ from jasy.js.Sorter import Sorter
 __all__ = ["Resolver"]
 
 class Resolver():
-    def __init__(self):
-        # Keep permutation reference
-        self.__permutation = getPermutation()
+    def __init__(self, permutation=None, fast=False):
+        # Keep permutation reference (defaults to the current global permutation)
+        self.__permutation = permutation if permutation is not None else getPermutation()
+        
+        # Fast mode detects dependencies without parsing classes (ignores permutations).
+        # This is useful for source/loader builds during development.
+        self.__fast = fast
 
         # Required classes by the user
         self.__required = []
@@ -23,10 +27,12 @@ class Resolver():
         # Included classes after dependency calculation
         self.__included = []
 
-        # Collecting all available classes
-        self.__classes = {}
-        for project in session.getProjects():
-            self.__classes.update(project.getClasses())
+        # Registry of all available classes
+        self.__classes = session.getClassRegistry()
+            
+        # Persisted dependency graph (see __loadGraph())
+        self.__graph = None
+        self.__graphModified = False
         
         
     def addClassName(self, className):
@@ -67,6 +73,24 @@ class Resolver():
         return self
         
 
+    def getPermutation(self):
+        """ Returns the permutation used for resolving dependencies """
+        
+        return self.__permutation
+
+
+    def isFast(self):
+        """ Whether dependencies are detected without parsing classes (see Class.getDependencyData()) """
+        
+        return self.__fast
+
+
+    def getClassRegistry(self):
+        """ Returns the registry of all available classes (see ClassRegistry.py) """
+        
+        return self.__classes
+
+
     def getRequiredClasses(self):
         """ Returns the user added classes - the so-called required classes. """
         
@@ -82,10 +106,14 @@ class Resolver():
         info("Detecting dependencies...")
         indent()
         
+        self.__loadGraph()
+        
         collection = set()
         for classObj in self.__required:
             self.__resolveDependencies(classObj, collection)
             
+        self.__storeGraph()
+            
         # Filter excluded classes
         for classObj in self.__excluded:
             if classObj in collection:
@@ -103,13 +131,90 @@ class Resolver():
         return Sorter(self).getSortedClasses()
 
 
+    def getDependencies(self, classObj):
+        """ 
+        Returns the tuple (dependencies, breaks) of the given class using the persisted dependency 
+        graph (see __loadGraph()). Dependencies are class objects, breaks are the names of classes
+        marked using #break. Used by the Sorter so that unmodified classes are not queried again.
+        """
+        
+        self.__loadGraph()
+        return self.__getDependencies(classObj)
+
+
+    def __getGraphField(self):
+        """ Returns the cache field of the dependency graph of the current permutation (or fast mode) """
+        
+        if self.__fast:
+            return "dependencies-fast"
+        
+        permutation = self.__permutation
+        return "dependencies-%s" % (permutation.getChecksum() if permutation else "none")
+    
+    
+    def __loadGraph(self):
+        """ 
+        Loads the dependency graph of the current permutation from the cache of the main project. 
+        The graph maps the ID of each class to the stamp (modification time or fingerprint) of the class,
+        the IDs of its dependencies and the names of its breaks. Edges of modified classes are 
+        re-computed, all other edges are re-used (by resolving and sorting) without loading any meta 
+        or scope data. As dependencies are detected by matching names against the available classes
+        the graph is dropped whenever classes are added or removed.
+        """
+        
+        if self.__graph is not None:
+            return
+        
+        self.__graph = {}
+        self.__graphModified = False
+        
+        main = session.getMain()
+        if main is None:
+            return
+            
+        stored = main.getCache().read(self.__getGraphField())
+        if stored is not None and stored[0] == self.__classes.getChecksum():
+            self.__graph = stored[1]
+        
+        
+    def __storeGraph(self):
+        """ Stores the dependency graph in the cache of the main project when it was modified """
+        
+        main = session.getMain()
+        if main is None or not self.__graphModified:
+            return
+        
+        main.getCache().store(self.__getGraphField(), (self.__classes.getChecksum(), self.__graph))
+        self.__graphModified = False
+
+
+    def __getDependencies(self, classObj):
+        """ Returns the dependencies and breaks of the given class using the dependency graph when possible """
+        
+        classId = classObj.getId()
+        stamp = classObj.getStamp()
+        
+        entry = self.__graph.get(classId)
+        if entry is not None and entry[0] == stamp:
+            return [self.__classes[depId] for depId in entry[1]], entry[2]
+            
+        dependencies = classObj.getDependencies(self.__permutation, classes=self.__classes, fast=self.__fast)
+        meta = classObj.getDependencyData() if self.__fast else classObj.getMetaData(self.__permutation)
+        breaks = tuple(sorted(meta.breaks))
+        
+        self.__graph[classId] = (stamp, tuple(sorted(depObj.getId() for depObj in dependencies)), breaks)
+        self.__graphModified = True
+        
+        return dependencies, breaks
+
+
     def __resolveDependencies(self, classObj, collection):
         """ Internal resolver engine which works recursively through all dependencies """
         
         collection.add(classObj)
-        dependencies = classObj.getDependencies(self.__permutation, classes=self.__classes)
+        dependencies = self.__getDependencies(classObj)[0]
         
         for depObj in dependencies:
             if not depObj in collection:
                 self.__resolveDependencies(depObj, collection)
-                    
\ No newline at end of file
+                
@@ -3,32 +3,39 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import time
 from jasy.core.Logging import *
-from jasy.env.State import getPermutation
 
 __all__ = ["Sorter"]
 
 
 class CircularDependency(Exception):
     pass
-    
+
 
 class Sorter:
+    """
+    Sorts the included classes of a resolver so that every class is loaded after all of its
+    load time dependencies. Dependencies which are marked using #break or #load are not required
+    to be loaded first. These are inserted as soon as possible after the class instead.
+
+    The load time dependency graph is split into its strongly connected components (Tarjan)
+    which reports all circular dependencies at once. Sorting is done using an iterative
+    depth-first walk so that the whole process runs in linear time to the size of the graph
+    (besides sorting the dependencies of each class) without hitting any recursion limits.
+    """
+
     def __init__(self, resolver):
-        # Keep classes/permutation reference
-        # Classes is set(classObj, ...)
+        # Keep resolver reference (provides the included classes and their dependencies)
         self.__resolver = resolver
-        self.__permutation = getPermutation()
-        
+
         classes = self.__resolver.getIncludedClasses()
 
         # Build class name dict
         self.__names = dict([(classObj.getId(), classObj) for classObj in classes])
-        
+
         # Initialize fields
         self.__loadDeps = {}
-        self.__circularDeps = {}
+        self.__breakDeps = {}
         self.__sortedClasses = []
 
 
@@ -38,17 +45,24 @@ class Sorter:
         if not self.__sortedClasses:
             debug("Sorting classes...")
             indent()
-            
-            classNames = self.__names
-            for className in classNames:
-                self.__getLoadDeps(classNames[className])
+
+            self.__buildGraph()
+            components = self.__findComponents()
+
+            cycles = [self.__findCycle(component) for component in components if len(component) > 1]
+            if cycles:
+                outdent()
+                raise CircularDependency("Circular Dependency: %s" % "; ".join(cycles))
+
+            self.__sortDependencies(components)
 
             result = []
+            added = set()
             requiredClasses = self.__resolver.getRequiredClasses()
             for classObj in requiredClasses:
-                if not classObj in result:
+                if not classObj in added:
                     debug("Start adding with: %s", classObj)
-                    self.__addSorted(classObj, result)
+                    self.__addSorted(classObj, result, added)
 
             outdent()
             self.__sortedClasses = result
@@ -56,106 +70,166 @@ class Sorter:
         return self.__sortedClasses
 
 
-    def __addSorted(self, classObj, result, postponed=False):
-        """ Adds a single class and its dependencies to the sorted result list """
+    def __buildGraph(self):
+        """ 
+        Collects the load time dependencies and manually defined breaks of all classes. These 
+        are taken from the dependency graph of the resolver which is persisted per permutation
+        so that unmodified classes are not queried again (see Resolver.getDependencies()).
+        """
+
+        names = self.__names
+        resolver = self.__resolver
 
-        loadDeps = self.__getLoadDeps(classObj)
-        
-        for depObj in loadDeps:
-            if not depObj in result:
-                self.__addSorted(depObj, result)
+        for className in sorted(names):
+            classObj = names[className]
+            classDeps, classBreaks = resolver.getDependencies(classObj)
 
-        if classObj in result:
-            return
-            
-        # debug("Adding class: %s", classObj)
-        result.append(classObj)
+            # Respect manually defined breaks
+            # Breaks are dependencies which are down-priorized to break
+            # circular dependencies between classes.
+            self.__breakDeps[classObj] = [names[breakName] for breakName in sorted(classBreaks) if breakName in names]
 
-        # Insert circular dependencies as soon as possible
-        if classObj in self.__circularDeps:
-            circularDeps = self.__circularDeps[classObj]
-            for depObj in circularDeps:
-                if not depObj in result:
-                    self.__addSorted(depObj, result, True)
+            loadDeps = []
+            for depObj in classDeps:
+                # Ignore the class itself and classes which are not included
+                if depObj is classObj or names.get(depObj.getId()) is not depObj:
+                    continue
 
+                if depObj.getId() in classBreaks:
+                    debug("Manual Break: %s => %s" % (classObj, depObj))
+                else:
+                    loadDeps.append(depObj)
 
+            self.__loadDeps[classObj] = loadDeps
 
-    def __getLoadDeps(self, classObj):
-        """ Returns load time dependencies of given class """
 
-        if not classObj in self.__loadDeps:
-            self.__getLoadDepsRecurser(classObj, [])
+    def __findComponents(self):
+        """
+        Returns the strongly connected components of the load time dependency graph
+        (Tarjan's algorithm). Components are returned with dependencies first.
+        """
+
+        loadDeps = self.__loadDeps
 
-        return self.__loadDeps[classObj]
+        index = {}
+        lowlink = {}
+        stack = []
+        onStack = set()
+        components = []
 
+        for root in loadDeps:
+            if root in index:
+                continue
 
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            onStack.add(root)
+            work = [(root, iter(loadDeps[root]))]
 
-    def __getLoadDepsRecurser(self, classObj, stack):
-        """ 
-        This is the main routine which tries to control over a system
-        of unsorted classes. It directly tries to fullfil every dependency
-        a class have, but has some kind of exception based loop protection
-        to prevent circular dependencies from breaking the build.
-        
-        It respects break information given by file specific meta data, but
-        also adds custom hints where it found recursions. This lead to a valid 
-        sort, but might lead to problems between exeactly the two affected classes.
-        Without doing an exact execution it's not possible to whether found out
-        which of two each-other referencing classes needs to be loaded first.
-        This is basically only interesting in cases where one class needs another
-        during the definition phase which is not the case that often.
+            while work:
+                classObj, deps = work[-1]
+
+                for depObj in deps:
+                    if not depObj in index:
+                        index[depObj] = lowlink[depObj] = len(index)
+                        stack.append(depObj)
+                        onStack.add(depObj)
+                        work.append((depObj, iter(loadDeps[depObj])))
+                        break
+
+                    elif depObj in onStack:
+                        lowlink[classObj] = min(lowlink[classObj], index[depObj])
+
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[classObj])
+
+                    if lowlink[classObj] == index[classObj]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            onStack.remove(member)
+                            component.append(member)
+                            if member is classObj:
+                                break
+
+                        components.append(component)
+
+        return components
+
+
+    def __findCycle(self, component):
+        """ Returns a readable chain of dependencies which forms a circle inside the given component """
+
+        members = set(component)
+        start = min(component, key=lambda classObj: classObj.getId())
+
+        # Breadth-first search for the shortest way back to the start
+        previous = {}
+        queue = [start]
+        for classObj in queue:
+            for depObj in self.__loadDeps[classObj]:
+                if depObj is start:
+                    chain = [start]
+                    while classObj is not start:
+                        chain.append(classObj)
+                        classObj = previous[classObj]
+
+                    chain.append(start)
+                    chain.reverse()
+                    return " >> ".join([x.getId() for x in chain])
+
+                elif depObj in members and not depObj in previous:
+                    previous[depObj] = classObj
+                    queue.append(depObj)
+
+
+    def __sortDependencies(self, components):
+        """
+        Sorts the load time dependencies of every class by their depth (the longest
+        chain of dependencies they require) so that simple classes are added first.
         """
-        
-        if classObj in stack:
-            stack.append(classObj)
-            msg = " >> ".join([x.getId() for x in stack[stack.index(classObj):]])
-            raise CircularDependency("Circular Dependency: %s" % msg)
-    
-        stack.append(classObj)
-
-        classDeps = classObj.getDependencies(self.__permutation, classes=self.__names, warnings=False)
-        classMeta = classObj.getMetaData(self.__permutation)
-        
-        result = set()
-        circular = set()
-        
-        # Respect manually defined breaks
-        # Breaks are dependencies which are down-priorized to break
-        # circular dependencies between classes.
-        for breakName in classMeta.breaks:
-            if breakName in self.__names:
-                circular.add(self.__names[breakName])
-
-        # Now process the deps of the given class
+
         loadDeps = self.__loadDeps
-        for depObj in classDeps:
-            if depObj is classObj:
-                continue
-            
-            depName = depObj.getId()
-            
-            if depName in classMeta.breaks:
-                debug("Manual Break: %s => %s" % (classObj, depObj))
-                pass
-            
-            elif depObj in loadDeps:
-                result.update(loadDeps[depObj])
-                result.add(depObj)
-        
+        depth = {}
+
+        # Components are ordered with dependencies first and all of them are single classes here
+        for component in components:
+            classObj = component[0]
+            depth[classObj] = 1 + max([depth[depObj] for depObj in loadDeps[classObj]] or [0])
+
+        for classObj in loadDeps:
+            loadDeps[classObj].sort(key=lambda depObj: (depth[depObj], depObj.getId()))
+
+
+    def __addSorted(self, classObj, result, added):
+        """ Adds a single class and its dependencies to the sorted result list """
+
+        loadDeps = self.__loadDeps
+        breakDeps = self.__breakDeps
+
+        work = [(classObj, iter(loadDeps[classObj]))]
+        while work:
+            current, deps = work[-1]
+
+            for depObj in deps:
+                if not depObj in added:
+                    work.append((depObj, iter(loadDeps[depObj])))
+                    break
+
             else:
-                current = self.__getLoadDepsRecurser(depObj, stack[:])
-        
-                result.update(current)
-                result.add(depObj)
-        
-        # Sort dependencies by number of other dependencies
-        # For performance reasions we access the __loadDeps 
-        # dict directly as this data is already stored
-        result = sorted(result, key=lambda depObj: len(self.__loadDeps[depObj]))
-        
-        loadDeps[classObj] = result
-        
-        if circular:
-            self.__circularDeps[classObj] = circular
-        
-        return result
+                work.pop()
+
+                # Entries without a class are lists of circular dependencies
+                if current is None or current in added:
+                    continue
+
+                # debug("Adding class: %s", current)
+                added.add(current)
+                result.append(current)
+
+                # Insert circular dependencies as soon as possible
+                if breakDeps[current]:
+                    work.append((None, iter(breakDeps[current])))
@@ -55,25 +55,42 @@ class Comment():
     Comment class is attached to parsed nodes and used to store all comment related information.
     
     The class supports a new Markdown and TomDoc inspired dialect to make developers life easier and work less repeative.
+    
+    Comments are processed lazily: the tokenizer only stores the raw text, context and indentation.
+    Outdenting and doc processing (types, returns, params and links) is done the first time the 
+    text, params, returns or type are accessed e.g. during API generation. Tags are extracted 
+    separately from the raw text (see getTags()) which is all the meta data of a class needs.
     """
     
     # Relation to code
     context = None
     
+    # Variant of the comment: single, multi, protected or doc
+    variant = None
+    
+    # Whether the text has been processed
+    __processed = False
+    
+    # Whether the tags have been extracted
+    __tagsExtracted = False
+    
     # Dictionary of tags
-    tags = None
+    __tags = None
     
     # Dictionary of params
-    params = None
+    __params = None
 
     # List of return types
-    returns = None
+    __returns = None
     
     # Static type
-    type = None
+    __type = None
     
     # Collected text of the comment (without the extracted doc relevant data)
-    text = None
+    __text = None
+    
+    # Text before removing markup (only for doc comment)
+    __originalText = None
     
     # Text of the comment converted to HTML (only for doc comment)
     __html = None
@@ -86,33 +103,52 @@ class Comment():
         # Store fileId
         self.fileId = fileId
         
-        # Convert
+        # Detect variant
         if text.startswith("//"):
+            self.variant = "single"
+        elif text.startswith("/**"):
+            self.variant = "doc"
+        elif text.startswith("/*!"):
+            self.variant = "protected"
+        elif text.startswith("/*"):
+            self.variant = "multi"
+        else:
+            raise CommentException("Invalid comment text: %s" % text, lineNo)
+            
+        # Store raw data for later processing
+        self.__source = text
+        self.__indent = indent
+        self.__lineNo = lineNo
+        
+        
+    def __process(self):
+        """Processes the raw comment text (outdenting, doc processing, markup removal)"""
+        
+        self.__processed = True
+        
+        text = self.__source
+        lineNo = self.__lineNo
+        
+        # Convert
+        if self.variant == "single":
             # "// hello" => "   hello"
             text = "  " + text[2:]
-            self.variant = "single"
             
-        elif text.startswith("/**"):
+        elif self.variant == "doc":
             # "/** hello */" => "    hello "
             text = "   " + text[3:-2]
-            self.variant = "doc"
 
-        elif text.startswith("/*!"):
+        elif self.variant == "protected":
             # "/*! hello */" => "    hello "
             text = "   " + text[3:-2]
-            self.variant = "protected"
             
-        elif text.startswith("/*"):
+        else:
             # "/* hello */" => "   hello "
             text = "  " + text[2:-2]
-            self.variant = "multi"
-            
-        else:
-            raise CommentException("Invalid comment text: %s" % text, lineNo)
 
         if "\n" in text:
             # Outdent indentation
-            text = self.__outdent(text, indent, lineNo)
+            text = self.__outdent(text, self.__indent, lineNo)
 
         else:
             # Strip white space from single line comments
@@ -131,7 +167,38 @@ class Comment():
             if "<" in text:
                 text = stripMarkup.sub("", text)
                 
-        self.text = text
+        self.__text = text
+        
+        
+    def __getText(self):
+        if not self.__processed:
+            self.__process()
+            
+        return self.__text
+        
+    def __getParams(self):
+        if not self.__processed:
+            self.__process()
+            
+        return self.__params
+        
+    def __getReturns(self):
+        if not self.__processed:
+            self.__process()
+            
+        return self.__returns
+        
+    def __getType(self):
+        if not self.__processed:
+            self.__process()
+            
+        return self.__type
+        
+    text = property(__getText)
+    params = property(__getParams)
+    returns = property(__getReturns)
+    type = property(__getType)
+    tags = property(lambda self: self.getTags())
 
 
     def getHtml(self, highlight=True):
@@ -141,22 +208,46 @@ class Comment():
             if markdown is None:
                 raise JasyError("Markdown is not supported by the system. Documentation comments could not be processed into HTML.")
             
+            if not self.__processed:
+                self.__process()
+            
             self.__html = markdown(self.__originalText, highlight)
     
         return self.__html
     
     
     def hasHtmlContent(self):
-        return self.variant == "doc" and self.__originalText
+        if self.variant != "doc":
+            return False
+            
+        if not self.__processed:
+            self.__process()
+            
+        return self.__originalText
+    
     
     def getTags(self):
-        return self.tags
+        """
+        Returns the tags of doc comments e.g. {"require" : set(["foo.Bar"])}. Tags are 
+        extracted from the raw text without processing the rest of the comment.
+        """
+        
+        if not self.__tagsExtracted:
+            if self.variant == "doc":
+                self.__extractTags(self.__source[3:-2])
+            else:
+                self.__tagsExtracted = True
+            
+        return self.__tags
+        
         
     def hasTag(self, name):
-        if not self.tags:
+        tags = self.getTags()
+        if not tags:
             return False
 
-        return name in self.tags
+        return name in tags
+
 
     def __outdent(self, text, indent, startLineNo):
         """
@@ -276,7 +367,7 @@ class Comment():
         """
 
         def collectReturn(match):
-            self.returns = self.__splitTypeList(match.group(1))
+            self.__returns = self.__splitTypeList(match.group(1))
             return ""
             
         return returnMatcher.sub(collectReturn, text)
@@ -289,7 +380,7 @@ class Comment():
         """
 
         def collectType(match):
-            self.type = match.group(1).strip()
+            self.__type = match.group(1).strip()
             return ""
 
         return typeMatcher.sub(collectType, text)
@@ -299,26 +390,34 @@ class Comment():
     def __extractTags(self, text):
         """
         Extract all tags inside the give doc comment. These are replaced from 
-        the text and collected inside the "tags" key as a dict.
+        the text and collected inside the "tags" key as a dict. Tags are only
+        collected once (either from the raw or the processed text).
         """
         
+        if self.__tagsExtracted:
+            return tagMatcher.sub("", text)
+            
+        tags = {}
+        
         def collectTags(match):
-             if not self.tags:
-                 self.tags = {}
-
              name = match.group(1)
              param = match.group(3)
 
-             if name in self.tags:
-                 self.tags[name].add(param)
+             if name in tags:
+                 tags[name].add(param)
              elif param:
-                 self.tags[name] = set([param])
+                 tags[name] = set([param])
              else:
-                 self.tags[name] = True
+                 tags[name] = True
 
              return ""
 
-        return tagMatcher.sub(collectTags, text)
+        text = tagMatcher.sub(collectTags, text)
+        
+        self.__tags = tags or None
+        self.__tagsExtracted = True
+        
+        return text
         
         
         
@@ -335,10 +434,10 @@ class Comment():
             if paramTypes:
                 paramTypes = self.__splitTypeList(paramTypes)
             
-            if self.params is None:
-                self.params = {}
+            if self.__params is None:
+                self.__params = {}
 
-            params = self.params
+            params = self.__params
             fullName = match.group(1).strip()
             names = fullName.split('.')
 
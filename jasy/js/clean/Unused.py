@@ -141,7 +141,7 @@ def __recurser(node, unused):
                     
                     # If we have only one child, we replace the whole var statement with just the init block
                     elif len(node) == 1:
-                        semicolon = Node(init.tokenizer, "semicolon")
+                        semicolon = Node(None, "semicolon")
                         semicolon.append(init, "expression")
 
                         # Protect non-expressions with parens
@@ -159,7 +159,7 @@ def __recurser(node, unused):
                         
                         node.remove(decl)
                         nodePos = node.parent.index(node)
-                        semicolon = Node(init.tokenizer, "semicolon")
+                        semicolon = Node(None, "semicolon")
                         semicolon.append(init, "expression")
 
                         # Protect non-expressions with parens
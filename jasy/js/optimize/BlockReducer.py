@@ -100,7 +100,7 @@ def __optimize(node, compressor):
             pass
         elif len(node) == 0:
             debug("Replace empty block with semicolon at line: %s", node.line)
-            repl = Node(node.tokenizer, "semicolon")
+            repl = Node(None, "semicolon")
             node.parent.replace(node, repl)
             node = repl
         elif len(node) == 1:
@@ -373,7 +373,7 @@ def combineToCommaExpression(node):
     if counter == 1:
         return node
     
-    comma = Node(node.tokenizer, "comma")
+    comma = Node(None, "comma")
     
     for child in list(node):
         if child is None:
@@ -383,7 +383,7 @@ def combineToCommaExpression(node):
         if hasattr(child, "expression"):
             comma.append(child.expression)
             
-    semicolon = Node(node.tokenizer, "semicolon")
+    semicolon = Node(None, "semicolon")
     semicolon.append(comma, "expression")
     
     parent = node.parent
@@ -413,10 +413,10 @@ def compactIf(node, thenPart, condition):
     else:
         # Has expression => Translate IF using a AND or OR operator
         if condition.type == "not":
-            replacement = Node(thenPart.tokenizer, "or")
+            replacement = Node(None, "or")
             condition = condition[0]
         else:
-            replacement = Node(thenPart.tokenizer, "and")
+            replacement = Node(None, "and")
 
         replacement.append(condition)
         replacement.append(thenExpression)
@@ -501,7 +501,7 @@ def combineExpressions(condition, thenExpression, elseExpression):
     """ Combines then and else expression using a hook statement. """
     
     hook = createHook(condition, thenExpression, elseExpression)
-    semicolon = Node(condition.tokenizer, "semicolon")
+    semicolon = Node(None, "semicolon")
     semicolon.append(hook, "expression")
     
     fixParens(condition)
@@ -514,7 +514,7 @@ def combineExpressions(condition, thenExpression, elseExpression):
 def createReturn(value):
     """ Creates a return statement with the given value """
     
-    ret = Node(value.tokenizer, "return")
+    ret = Node(None, "return")
     ret.append(value, "value")
     return ret
 
@@ -522,7 +522,7 @@ def createReturn(value):
 def createHook(condition, thenPart, elsePart):
     """ Creates a hook expression with the given then/else parts """
     
-    hook = Node(condition.tokenizer, "hook")
+    hook = Node(None, "hook")
     hook.append(condition, "condition")
     hook.append(thenPart, "thenPart")
     hook.append(elsePart, "elsePart")
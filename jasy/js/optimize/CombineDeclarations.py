@@ -233,8 +233,8 @@ def __patchVarStatements(node, firstVarStatement):
             
 def __rebuildAsAssignment(node, firstVarStatement):
     """Rebuilds the items of a var statement into a assignment list and moves declarations to the given var statement"""
-    assignment = Node(node.tokenizer, "semicolon")
-    assignmentList = Node(node.tokenizer, "comma")
+    assignment = Node(None, "semicolon")
+    assignmentList = Node(None, "comma")
     assignment.append(assignmentList, "expression")
 
     # Casting to list() creates a copy during the process (keeps loop stable)
@@ -10,17 +10,34 @@
 #   - Sebastian Werner <info@sebastian-werner.net> (Refactoring Python) (2010)
 #
 
-from copy import deepcopy
 import json
 
+import jasy.js.parse.SourceStore as SourceStore
+
 class Node(list):
     
-    __slots__ = [
+    # Attributes which (nearly) every node has are stored in slots. All other attributes are
+    # specific to a few node types (or added by other modules) and are stored in the instance
+    # dict instead which Python only creates when the first of them is set. This way the majority
+    # of nodes (identifiers, dots, strings, numbers, ...) do not carry a slot for every attribute
+    # of every node type.
+    #
+    # Tradeoff: with an instance dict, assigning a misspelled or unknown attribute no longer
+    # raises an AttributeError. It is silently stored and then ignored by clone(), toXml() and the
+    # serializer. Every attribute used on nodes therefore needs to be listed in "attributes"
+    # (the tests check this for all parsed and optimized trees). Keeping rare attributes in
+    # slots or descriptors instead avoids this, but costs either the memory savings or
+    # about twice the time in the optimizers and the compressor.
+    __slots__ = ["line", "type", "sourceId", "start", "end", "rel", "parent", "value", "__dict__"]
+    
+    
+    # All attributes a node might have (the order is used by toXml())
+    attributes = (
         # core data
-        "line", "type", "tokenizer", "start", "end", "rel", "parent", 
+        "line", "type", "sourceId", "start", "end", "rel", "parent", 
         
         # dynamic added data by other modules
-        "comments", "scope", 
+        "comments", "scope", "target",
         
         # node type specific
         "value", "expression", "body", "functionForm", "parenthesized", "fileId", "params", 
@@ -28,12 +45,18 @@ class Node(list):
         "iterator", "thenPart", "exception", "elsePart", "setup", "postfix", "update", "tryBlock",
         "block", "defaultIndex", "discriminant", "label", "statements", "finallyBlock", 
         "statement", "variables", "names", "guard", "for", "tail", "expressionClosure"
-    ]
+    )
+    
+    
+    # Attributes which are copied by clone(), "parent" is restored through the copied structure
+    __copied = tuple(name for name in attributes if name != "parent")
     
     
     def __init__(self, tokenizer=None, type=None, args=[]):
         list.__init__(self)
         
+        # Nodes only keep the handle of their source (see SourceStore) instead of the tokenizer
+        self.sourceId = getattr(tokenizer, "sourceId", None)
         self.start = 0
         self.end = 0
         self.line = None
@@ -55,8 +78,6 @@ class Node(list):
                 self.line = tokenizer.line
                 self.start = None
                 self.end = None
-
-            self.tokenizer = tokenizer
             
         elif type:
             self.type = type
@@ -126,7 +147,7 @@ class Node(list):
             if not isinstance(kid, Node):
                 raise Exception("Invalid kid: %s" % kid)
             
-            if hasattr(kid, "tokenizer"):
+            if getattr(kid, "sourceId", None) is not None:
                 if hasattr(kid, "start"):
                     if not hasattr(self, "start") or self.start == None or kid.start < self.start:
                         self.start = kid.start
@@ -185,12 +206,13 @@ class Node(list):
         relatedChildren = []
         attrsCollection = []
         
-        for name in self.__slots__:
+        for name in self.attributes:
             # "type" is used as node name - no need to repeat it as an attribute
             # "parent" is a relation to the parent node - for serialization we ignore these at the moment
             # "rel" is used internally to keep the relation to the parent - used by nodes which need to keep track of specific children
             # "start" and "end" are for debugging only
-            if hasattr(self, name) and name not in ("type", "parent", "comments", "rel", "start", "end") and name[0] != "_":
+            # "sourceId" is the handle of the source code in the source store
+            if hasattr(self, name) and name not in ("type", "parent", "comments", "rel", "start", "end", "sourceId") and name[0] != "_":
                 value = getattr(self, name)
                 if isinstance(value, Node):
                     if hasattr(value, "rel"):
@@ -257,55 +279,76 @@ class Node(list):
         return result
         
         
-    def __deepcopy__(self, memo):
-        """Used by deepcopy function to clone Node instances"""
+    def clone(self):
+        """
+        Returns a copy of the node and all its children. The copy is created iteratively (no 
+        recursion limits) without the generic memo handling of deepcopy(). Comment and scope 
+        objects are never modified by the optimizers and are shared with the original. The 
+        scope is re-created by the scanner whenever the copied tree is modified.
+        """
         
-        # Create copy
-        if hasattr(self, "tokenizer"):
-            result = Node(tokenizer=self.tokenizer)
-        else:
-            result = Node(type=self.type)
+        result = Node.__new__(Node)
+        stack = [(self, result)]
+        
+        createNode = Node.__new__
+        append = list.append
+        names = self.__copied
+        
+        while stack:
+            node, copied = stack.pop()
+            
+            for name in names:
+                value = getattr(node, name, names)
+                if value is names:
+                    continue
+                
+                valueType = type(value)
+                if valueType in (list, set, dict):
+                    setattr(copied, name, valueType(value))
+                elif valueType is not Node:
+                    setattr(copied, name, value)
+            
+            # Copy children (related children are linked through their "rel" field)
+            for child in node:
+                if child is None:
+                    append(copied, None)
+                    continue
+                    
+                childCopy = createNode(Node)
+                childCopy.parent = copied
+                append(copied, childCopy)
+                
+                rel = getattr(child, "rel", None)
+                if rel is not None:
+                    setattr(copied, rel, childCopy)
+                    
+                stack.append((child, childCopy))
         
-        # Copy children
-        for child in self:
-            # Using simple list appends for better performance
-            childCopy = deepcopy(child, memo)
-            childCopy.parent = result
-            list.append(result, childCopy)
-        
-        # Sync attributes
-        # Note: "parent" attribute is handled by append() already
-        for name in self.__slots__:
-            if hasattr(self, name) and not name in ("parent", "tokenizer"):
-                value = getattr(self, name)
-                if value is None:
-                    pass
-                elif type(value) in (bool, int, float, str):
-                    setattr(result, name, value)
-                elif type(value) in (list, set, dict, Node):
-                    setattr(result, name, deepcopy(value, memo))
-                # Scope can be assigned (will be re-created when needed for the copied node)
-                elif name == "scope":
-                    result.scope = self.scope
-
         return result
         
         
+    def __deepcopy__(self, memo):
+        """Used by deepcopy function to clone Node instances"""
+        
+        return self.clone()
+        
+        
     def getSource(self):
-        """Returns the source code of the node"""
+        """Returns the source code of the node (resolved through the source store)"""
 
-        if not self.tokenizer:
-            raise Exception("Could not find source for node '%s'" % node.type)
+        source = SourceStore.getSource(getattr(self, "sourceId", None))
+        if source is None:
+            raise Exception("Could not find source for node '%s'" % self.type)
             
         if getattr(self, "start", None) is not None:
             if getattr(self, "end", None) is not None:
-                return self.tokenizer.source[self.start:self.end]
-            return self.tokenizer.source[self.start:]
+                return source[self.start:self.end]
+            return source[self.start:]
     
         if getattr(self, "end", None) is not None:
-            return self.tokenizer.source[:self.end]
+            return source[:self.end]
     
-        return self.tokenizer.source[:]
+        return source
 
 
     # Map Python built-ins
@@ -879,7 +879,7 @@ def Variables(tokenizer, staticContext, letBlock=None):
                 raise SyntaxError("Invalid variable initialization", tokenizer)
 
             # Parse the init as a normal assignment.
-            id = Node(childNode.tokenizer, "identifier")
+            id = Node(tokenizer, "identifier")
             assignmentNode = builder.ASSIGN_build(tokenizer)
             builder.ASSIGN_addOperand(assignmentNode, id)
             builder.ASSIGN_addOperand(assignmentNode, AssignExpression(tokenizer, staticContext))
@@ -0,0 +1,207 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import marshal, zlib
+
+from jasy.js.parse.Node import Node
+from jasy.js.parse.ScopeData import ScopeData
+from jasy.js.api.Comment import Comment
+
+__all__ = ["dump", "load", "SerializerError"]
+
+
+#
+# Format
+#
+
+# Every dump starts with these bytes. The last byte is the format version which needs
+# to be increased whenever the record layout or the node structure is changed.
+__magic = b"JSAST\x02"
+
+# Attributes stored in the fixed fields of every record. The source handle is never stored
+# as it is only valid in the current session.
+__core = ("type", "line", "start", "end", "rel", "parent", "sourceId", "comments", "scope")
+
+# Attributes which might be stored as generic (name, value) pairs
+__attributes = tuple(name for name in Node.attributes if name not in __core)
+
+# Types which are stored as generic attribute values
+__primitives = (bool, int, float, str, list, set, dict, tuple, type(None))
+
+
+class SerializerError(Exception):
+    """
+    Thrown when a tree could not be stored or restored e.g. because of
+    unsupported values or data written by another format version.
+    """
+
+    def __init__(self, message):
+        Exception.__init__(self, "Serializer error: %s" % message)
+
+
+
+#
+# Public API
+#
+
+def dump(tree):
+    """
+    Converts the given tree into a compact binary representation (bytes). Keeps
+    node types, attributes, relations, comments, scope data and source positions.
+    The records are compressed using a fast zlib level. The source handle is not 
+    stored - restored trees are not able to return their source.
+    """
+
+    records = []
+    stack = [tree]
+
+    # Iterative pre-order walk, nodes are stored in a flat list of records
+    # so that deeply nested trees do not hit any recursion limits.
+    while stack:
+        node = stack.pop()
+
+        if node is None:
+            records.append(None)
+            continue
+
+        attrs = []
+        for name in __attributes:
+            value = getattr(node, name, __attributes)
+            if value is __attributes:
+                continue
+
+            if isinstance(value, Node):
+                # Related children are restored through their "rel" field
+                if getattr(value, "rel", None) == name and getattr(value, "parent", None) is node:
+                    continue
+
+                raise SerializerError("Unsupported node reference in field %s of %s" % (name, node.type))
+
+            if not type(value) in __primitives:
+                raise SerializerError("Unsupported value in field %s of %s: %s" % (name, node.type, type(value)))
+
+            attrs.append(name)
+            attrs.append(value)
+
+        comments = getattr(node, "comments", None)
+        if comments:
+            comments = tuple(comment.__dict__ for comment in comments)
+
+        scope = getattr(node, "scope", None)
+        if scope is not None:
+            scope = tuple(getattr(scope, name) for name in ScopeData.__slots__)
+
+        records.append((
+            node.type,
+            getattr(node, "line", None),
+            getattr(node, "start", None),
+            getattr(node, "end", None),
+            getattr(node, "rel", None),
+            len(node),
+            tuple(attrs) if attrs else None,
+            comments,
+            scope
+        ))
+
+        stack.extend(reversed(node))
+
+    try:
+        return __magic + zlib.compress(marshal.dumps(records), 1)
+    except ValueError as ex:
+        raise SerializerError("Could not store tree: %s" % ex)
+
+
+
+def load(data):
+    """
+    Restores a tree from the data created by dump(). Restored nodes
+    have their source handle set to None.
+    """
+
+    if not data.startswith(__magic):
+        raise SerializerError("Unsupported data format!")
+
+    try:
+        records = marshal.loads(zlib.decompress(data[len(__magic):]))
+    except (ValueError, EOFError, TypeError, zlib.error) as ex:
+        raise SerializerError("Could not restore tree: %s" % ex)
+
+    root = None
+
+    # List of [node, number of outstanding children]
+    stack = []
+
+    append = list.append
+    createNode = Node.__new__
+    createComment = Comment.__new__
+    createScope = ScopeData.__new__
+    scopeFields = ScopeData.__slots__
+
+    for record in records:
+        if record is None:
+            node = None
+
+        else:
+            nodeType, line, start, end, rel, length, attrs, comments, scope = record
+
+            node = createNode(Node)
+            node.type = nodeType
+            node.line = line
+            node.start = start
+            node.end = end
+            node.sourceId = None
+
+            if attrs:
+                for pos in range(0, len(attrs), 2):
+                    setattr(node, attrs[pos], attrs[pos+1])
+
+            if comments:
+                restored = []
+                for values in comments:
+                    comment = createComment(Comment)
+                    comment.__dict__.update(values)
+                    restored.append(comment)
+
+                node.comments = restored
+
+            elif comments is not None:
+                node.comments = []
+
+            if scope is not None:
+                scopeData = createScope(ScopeData)
+                for pos, name in enumerate(scopeFields):
+                    setattr(scopeData, name, scope[pos])
+
+                node.scope = scopeData
+
+        if stack:
+            entry = stack[-1]
+            parent = entry[0]
+            append(parent, node)
+
+            if node is not None:
+                node.parent = parent
+                if rel is not None:
+                    node.rel = rel
+                    setattr(parent, rel, node)
+
+            entry[1] -= 1
+            if entry[1] == 0:
+                stack.pop()
+
+        elif root is None:
+            root = node
+
+        else:
+            raise SerializerError("Invalid data: Multiple root nodes!")
+
+        if node is not None and length > 0:
+            stack.append([node, length])
+
+    if root is None or stack:
+        raise SerializerError("Invalid data: Incomplete tree!")
+
+    return root
+
@@ -0,0 +1,69 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import itertools
+
+__all__ = ["store", "getSource", "getFileId", "clear"]
+
+
+#
+# Storage
+#
+
+# Maps handles to (fileId, source) tuples
+__entries = {}
+
+# Handles are never re-used (not even after clearing the store)
+__counter = itertools.count()
+
+# Maps (fileId, source) tuples to their handle so that equal sources are only stored once
+__handles = {}
+
+
+
+#
+# Public API
+#
+
+def store(source, fileId=None):
+    """
+    Stores the given source code and returns the handle (integer) to resolve it with
+    later on. Nodes only keep this handle instead of a reference to their tokenizer which
+    keeps trees small and picklable. Storing the same source of the same file again
+    returns the existing handle.
+    """
+
+    key = (fileId, source)
+    handle = __handles.get(key)
+    if handle is None:
+        handle = __handles[key] = next(__counter)
+        __entries[handle] = key
+
+    return handle
+
+
+def getSource(handle):
+    """Returns the source code stored under the given handle (None for unknown handles)"""
+
+    entry = __entries.get(handle)
+    return entry[1] if entry else None
+
+
+def getFileId(handle):
+    """Returns the file ID of the source stored under the given handle (None for unknown handles)"""
+
+    entry = __entries.get(handle)
+    return entry[0] if entry else None
+
+
+def clear():
+    """
+    Removes all stored sources e.g. when a session is closed. Handles of trees created
+    before are not resolved anymore.
+    """
+
+    __entries.clear()
+    __handles.clear()
+
@@ -0,0 +1,447 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+#
+# Character based reference lexer. The tokenizer used to skip white space and comments 
+# and to dispatch into specialized lexers character by character. It is not used for
+# parsing but kept to verify and benchmark the compiled expressions of Tokenizer
+# (see jasy/test/tokenizer.py and util/benchmark-tokenizer.py).
+#
+
+from jasy.js.tokenize.Lang import keywords
+from jasy.js.tokenize.Tokenizer import Tokenizer, Token, ParseError, operatorNames, assignOperators
+from jasy.js.api.Comment import Comment, CommentException
+from jasy.core.Logging import error
+
+__all__ = [ "CharTokenizer" ]
+
+
+class CharTokenizer(Tokenizer):
+    """
+    Reference implementation of the tokenizer which skips white space and comments and 
+    dispatches into specialized lexers character by character. Produces the same token stream
+    as Tokenizer and is used to verify and benchmark its compiled expressions.
+    """
+
+    def skip(self):
+        """Eats comments and whitespace character by character."""
+        input = self.source
+        startLine = self.line
+
+        # Whether this is the first called as happen on start parsing a file (eat leading comments/white space)
+        startOfFile = self.cursor == 0
+        
+        indent = ""
+        
+        while (True):
+            if len(input) > self.cursor:
+                ch = input[self.cursor]
+            else:
+                return
+                
+            self.cursor += 1
+            
+            if len(input) > self.cursor:
+                next = input[self.cursor]
+            else:
+                next = None
+
+            if ch == "\n" and not self.scanNewlines:
+                self.line += 1
+                indent = ""
+                
+            elif ch == "/" and next == "*":
+                self.cursor += 1
+                text = "/*"
+                inline = startLine == self.line and startLine > 1
+                commentStartLine = self.line
+                if startLine == self.line and not startOfFile:
+                    mode = "inline"
+                elif (self.line-1) > startLine:
+                    # distance before this comment means it is a comment block for a whole section (multiple lines of code)
+                    mode = "section"
+                else:
+                    # comment for maybe multiple following lines of code, but not that important (no visual white space divider)
+                    mode = "block"
+                    
+                while (True):
+                    try:
+                        ch = input[self.cursor]
+                        self.cursor += 1
+                    except IndexError:
+                        raise ParseError("Unterminated comment", self.fileId, self.line)
+                        
+                    if ch == "*":
+                        next = input[self.cursor]
+                        if next == "/":
+                            text += "*/"
+                            self.cursor += 1
+                            break
+                            
+                    elif ch == "\n":
+                        self.line += 1
+                        
+                    text += ch
+                    
+                
+                # Filter escaping on slash-star combinations in comment text
+                text = text.replace("*\/", "*/")
+                
+                try:
+                    self.comments.append(Comment(text, mode, commentStartLine, indent, self.fileId))
+                except CommentException as commentError:
+                    error("Ignoring comment in %s: %s", self.fileId, commentError)
+                    
+                    
+            elif ch == "/" and next == "/":
+                self.cursor += 1
+                text = "//"
+                if startLine == self.line and not startOfFile:
+                    mode = "inline"
+                elif (self.line-1) > startLine:
+                    # distance before this comment means it is a comment block for a whole section (multiple lines of code)
+                    mode = "section"
+                else:
+                    # comment for maybe multiple following lines of code, but not that important (no visual white space divider)
+                    mode = "block"
+                    
+                while (True):
+                    try:
+                        ch = input[self.cursor]
+                        self.cursor += 1
+                    except IndexError:
+                        # end of file etc.
+                        break
+
+                    if ch == "\n":
+                        self.line += 1
+                        break
+                    
+                    text += ch
+                    
+                try:
+                    self.comments.append(Comment(text, mode, self.line-1, "", self.fileId))
+                except CommentException:
+                    error("Ignoring comment in %s: %s", self.fileId, commentError)
+
+            # check for whitespace, also for special cases like 0xA0
+            elif ch in "\xA0 \t":
+                indent += ch
+
+            else:
+                self.cursor -= 1
+                return
+
+
+    def get(self, scanOperand=False):
+        """ 
+        It consumes input *only* if there is no lookahead.
+        Dispatches to the appropriate lexing function depending on the input.
+        """
+        while self.lookahead:
+            self.lookahead -= 1
+            self.tokenIndex = (self.tokenIndex + 1) & 3
+            token = self.tokens[self.tokenIndex]
+            if token.type != "newline" or self.scanNewlines:
+                return token.type
+
+        self.skip()
+
+        self.tokenIndex = (self.tokenIndex + 1) & 3
+        self.tokens[self.tokenIndex] = token = Token()
+
+        token.start = self.cursor
+        token.line = self.line
+
+        input = self.source
+        if self.cursor == len(input):
+            token.end = token.start
+            token.type = "end"
+            return token.type
+
+        ch = input[self.cursor]
+        self.cursor += 1
+        
+        if (ch >= "a" and ch <= "z") or (ch >= "A" and ch <= "Z") or ch == "$" or ch == "_":
+            self.lexIdent(ch)
+        
+        elif scanOperand and ch == "/":
+            self.lexRegExp(ch)
+        
+        elif ch == ".":
+            self.lexDot(ch)
+
+        elif self.scanNewlines and ch == "\n":
+            token.type = "newline"
+            self.line += 1
+
+        elif ch in operatorNames:
+            self.lexOp(ch)
+        
+        elif ch >= "1" and ch <= "9":
+            self.lexNumber(ch)
+        
+        elif ch == "0":
+            self.lexZeroNumber(ch)
+        
+        elif ch == '"' or ch == "'":
+            self.lexString(ch)
+        
+        else:
+            raise ParseError("Illegal token: %s (Code: %s)" % (ch, ord(ch)), self.fileId, self.line)
+
+        token.end = self.cursor
+        return token.type
+
+
+    # Lexes the exponential part of a number, if present. Returns True if an
+    # exponential part was found.
+    def lexExponent(self):
+        input = self.source
+        next = input[self.cursor]
+        if next == "e" or next == "E":
+            self.cursor += 1
+            ch = input[self.cursor]
+            self.cursor += 1
+            if ch == "+" or ch == "-":
+                ch = input[self.cursor]
+                self.cursor += 1
+
+            if ch < "0" or ch > "9":
+                raise ParseError("Missing exponent", self.fileId, self.line)
+
+            while(True):
+                ch = input[self.cursor]
+                self.cursor += 1
+                if not (ch >= "0" and ch <= "9"):
+                    break
+                
+            self.cursor -= 1
+            return True
+
+        return False
+
+
+    def lexZeroNumber(self, ch):
+        token = self.token
+        input = self.source
+        token.type = "number"
+
+        ch = input[self.cursor]
+        self.cursor += 1
+        if ch == ".":
+            while(True):
+                ch = input[self.cursor]
+                self.cursor += 1
+                if not (ch >= "0" and ch <= "9"):
+                    break
+                
+            self.cursor -= 1
+            self.lexExponent()
+            token.value = input[token.start:self.cursor]
+            
+        elif ch == "x" or ch == "X":
+            while(True):
+                ch = input[self.cursor]
+                self.cursor += 1
+                if not ((ch >= "0" and ch <= "9") or (ch >= "a" and ch <= "f") or (ch >= "A" and ch <= "F")):
+                    break
+                    
+            self.cursor -= 1
+            token.value = input[token.start:self.cursor]
+
+        elif ch >= "0" and ch <= "7":
+            while(True):
+                ch = input[self.cursor]
+                self.cursor += 1
+                if not (ch >= "0" and ch <= "7"):
+                    break
+                    
+            self.cursor -= 1
+            token.value = input[token.start:self.cursor]
+
+        else:
+            self.cursor -= 1
+            self.lexExponent()     # 0E1, &c.
+            token.value = 0
+    
+
+    def lexNumber(self, ch):
+        token = self.token
+        input = self.source
+        token.type = "number"
+
+        floating = False
+        while(True):
+            ch = input[self.cursor]
+            self.cursor += 1
+            
+            if ch == "." and not floating:
+                floating = True
+                ch = input[self.cursor]
+                self.cursor += 1
+                
+            if not (ch >= "0" and ch <= "9"):
+                break
+
+        self.cursor -= 1
+
+        exponent = self.lexExponent()
+        segment = input[token.start:self.cursor]
+        
+        # Protect float or exponent numbers
+        if floating or exponent:
+            token.value = segment
+        else:
+            token.value = int(segment)
+
+
+    def lexDot(self, ch):
+        token = self.token
+        input = self.source
+        next = input[self.cursor]
+        
+        if next >= "0" and next <= "9":
+            while (True):
+                ch = input[self.cursor]
+                self.cursor += 1
+                if not (ch >= "0" and ch <= "9"):
+                    break
+
+            self.cursor -= 1
+            self.lexExponent()
+
+            token.type = "number"
+            token.value = input[token.start:self.cursor]
+
+        else:
+            token.type = "dot"
+
+
+    def lexString(self, ch):
+        token = self.token
+        input = self.source
+        token.type = "string"
+
+        hasEscapes = False
+        delim = ch
+        ch = input[self.cursor]
+        self.cursor += 1
+        while ch != delim:
+            if ch == "\\":
+                hasEscapes = True
+                self.cursor += 1
+
+            ch = input[self.cursor]
+            self.cursor += 1
+
+        if hasEscapes:
+            token.value = eval(input[token.start:self.cursor])
+        else:
+            token.value = input[token.start+1:self.cursor-1]
+
+
+    def lexRegExp(self, ch):
+        token = self.token
+        input = self.source
+        token.type = "regexp"
+
+        while (True):
+            try:
+                ch = input[self.cursor]
+                self.cursor += 1
+            except IndexError:
+                raise ParseError("Unterminated regex", self.fileId, self.line)
+
+            if ch == "\\":
+                self.cursor += 1
+                
+            elif ch == "[":
+                while (True):
+                    if ch == "\\":
+                        self.cursor += 1
+
+                    try:
+                        ch = input[self.cursor]
+                        self.cursor += 1
+                    except IndexError:
+                        raise ParseError("Unterminated character class", self.fileId, self.line)
+                    
+                    if ch == "]":
+                        break
+                    
+            if ch == "/":
+                break
+
+        while(True):
+            ch = input[self.cursor]
+            self.cursor += 1
+            if not (ch >= "a" and ch <= "z"):
+                break
+
+        self.cursor -= 1
+        token.value = input[token.start:self.cursor]
+    
+
+    def lexOp(self, ch):
+        token = self.token
+        input = self.source
+
+        op = ch
+        while(True):
+            try:
+                next = input[self.cursor]
+            except IndexError:
+                break
+                
+            if (op + next) in operatorNames:
+                self.cursor += 1
+                op += next
+            else:
+                break
+        
+        try:
+            next = input[self.cursor]
+        except IndexError:
+            next = None
+
+        if next == "=" and op in assignOperators:
+            self.cursor += 1
+            token.type = "assign"
+            token.assignOp = operatorNames[op]
+            op += "="
+            
+        else:
+            token.type = operatorNames[op]
+            token.assignOp = None
+
+
+    # FIXME: Unicode escape sequences
+    # FIXME: Unicode identifiers
+    def lexIdent(self, ch):
+        token = self.token
+        input = self.source
+
+        try:
+            while True:
+                ch = input[self.cursor]
+                self.cursor += 1
+            
+                if not ((ch >= "a" and ch <= "z") or (ch >= "A" and ch <= "Z") or (ch >= "0" and ch <= "9") or ch == "$" or ch == "_"):
+                    break
+                    
+        except IndexError:
+            self.cursor += 1
+            pass
+        
+        # Put the non-word character back.
+        self.cursor -= 1
+
+        identifier = input[token.start:self.cursor]
+        if identifier in keywords:
+            token.type = identifier
+        else:
+            token.type = "identifier"
+            token.value = identifier
@@ -0,0 +1,180 @@
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+import re
+
+from jasy.js.tokenize.Lang import keywords
+from jasy.js.api.Comment import tagMatcher
+
+__all__ = ["scan", "DependencyData"]
+
+
+#
+# Lexer
+#
+
+# Matches all tokens which are relevant for detecting dependencies. Everything
+# not matched by one of the other groups is returned as single punctuator.
+__token = re.compile(r"""
+    (?P<space>\s+) |
+    (?P<doc>/\*\*(?!/)[\s\S]*?\*/) |
+    (?P<comment>/\*[\s\S]*?(?:\*/|\Z)|//[^\n]*) |
+    (?P<string>"(?:[^"\\\n]|\\[\s\S])*"?|'(?:[^'\\\n]|\\[\s\S])*'?) |
+    (?P<name>[A-Za-z_$][\w$]*(?:\s*\.\s*[A-Za-z_$][\w$]*)*) |
+    (?P<number>\.?\d[\w.]*) |
+    (?P<punct>[\s\S])
+""", re.VERBOSE)
+
+# Matches a regular expression literal starting at a slash
+__regexp = re.compile(r"/(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+
+# Splits dot chains (which might contain white space)
+__dot = re.compile(r"\s*\.\s*")
+
+# A slash after these tokens is a division, otherwise it starts a regular expression
+__divisionAfter = set([")", "]", "}", "name", "number", "string"])
+
+# Keywords which might be followed by regular expressions
+__keywords = set(keywords)
+
+
+
+class DependencyData():
+    """
+    Dependency relevant data of a class collected without parsing. Offers the fields
+    of MetaData (requires, optionals, breaks, assets, name) and the dependency
+    relevant fields of ScopeData (shared, packages).
+    """
+
+    __slots__ = ["name", "requires", "optionals", "breaks", "assets", "shared", "packages"]
+
+    def __init__(self):
+        self.name = None
+
+        self.requires = set()
+        self.optionals = set()
+        self.breaks = set()
+        self.assets = set()
+
+        self.shared = {}
+        self.packages = {}
+
+
+    def addTags(self, text):
+        """Adds the meta data tags of the given doc comment text (see jasy.js.MetaData)"""
+
+        for match in tagMatcher.finditer(text):
+            tag = match.group(1)
+            param = match.group(3)
+            if not param:
+                continue
+
+            if tag == "name":
+                if self.name is None:
+                    self.name = param
+            elif tag == "require":
+                self.requires.add(param)
+            elif tag == "load":
+                # load is a special combination shorthand for requires + breaks
+                self.requires.add(param)
+                self.breaks.add(param)
+            elif tag == "optional":
+                self.optionals.add(param)
+            elif tag == "break":
+                self.breaks.add(param)
+            elif tag == "asset":
+                self.assets.add(param)
+
+
+    def addName(self, name):
+        """Adds a usage of the given (possibly dotted) name"""
+
+        if "." in name:
+            self.packages[name] = self.packages.get(name, 0) + 1
+            name = name[:name.index(".")]
+
+        self.shared[name] = self.shared.get(name, 0) + 1
+
+
+
+#
+# Public API
+#
+
+def scan(text):
+    """
+    Scans the given JavaScript source for dependency relevant data without building a tree.
+
+    Collects the meta data tags of all doc comments and all identifiers and dot chains (e.g.
+    foo.bar.Baz) which are not properties of other expressions or keys in object literals. As
+    there is no scope analysis and no dead code removal the result is a super set of the data
+    collected from the parsed tree (MetaData and ScopeData) e.g. locally declared variables
+    are reported as well.
+    """
+
+    data = DependencyData()
+
+    # Type of the last significant token ("name", "string", "number" or the punctuator)
+    last = None
+
+    # Name waiting for the next significant token (to detect object keys)
+    pending = None
+    pendingAfter = None
+
+    match = __token.match
+    regexp = __regexp.match
+    pos = 0
+    length = len(text)
+
+    while pos < length:
+        token = match(text, pos)
+        kind = token.lastgroup
+
+        if kind == "space" or kind == "comment":
+            pos = token.end()
+            continue
+
+        elif kind == "doc":
+            data.addTags(token.group()[3:-2])
+            pos = token.end()
+            continue
+
+        if pending is not None:
+            # Keys in object literals are no variable accesses
+            if not (token.group() == ":" and pendingAfter in ("{", ",")):
+                data.addName(pending)
+            pending = None
+
+        if kind == "name":
+            value = token.group()
+            top = value.split(".", 1)[0].rstrip()
+
+            if top in __keywords:
+                # Chains starting with keywords like "this.foo" are not interesting
+                last = "/" if top in ("return", "typeof", "in", "instanceof", "new", "delete", "void", "case", "throw", "do", "else") else "name"
+
+            else:
+                # Ignore property names of other expressions e.g. foo().bar
+                if last != ".":
+                    pending = __dot.sub(".", value) if "." in value else value
+                    pendingAfter = last
+
+                last = "name"
+
+            pos = token.end()
+
+        elif kind == "punct" and token.group() == "/" and not last in __divisionAfter:
+            literal = regexp(text, pos)
+            pos = literal.end() if literal else token.end()
+            last = "string"
+
+        else:
+            last = kind if kind != "punct" else token.group()
+            pos = token.end()
+
+    if pending is not None:
+        data.addName(pending)
+
+    return data
@@ -16,6 +16,8 @@ from jasy.js.tokenize.Lang import keywords
 from jasy.js.api.Comment import Comment, CommentException
 from jasy.core.Logging import error
 
+import jasy.js.parse.SourceStore as SourceStore
+
 __all__ = [ "Tokenizer" ]
 
 
@@ -73,6 +75,33 @@ operatorNames = {
 # Assignment operators
 assignOperators = ["|", "^", "&", "<<", ">>", ">>>", "+", "-", "*", "/", "%"]
 
+# Keywords for fast lookup
+keywordNames = set(keywords)
+
+
+# Matches the next token in a single pass. Other than the character based reference
+# lexer (see CharTokenizer.py) this uses one compiled alternation for all kinds of
+# tokens. Matching longest operators first is equal to extending operators character
+# by character as all prefixes of operators are valid operators themselves. Assignments
+# (e.g. ">>=") are matched in front of these as their operators are no valid operators.
+tokenMatcher = re.compile(r"""
+    (?P<identifier>[A-Za-z$_][A-Za-z0-9$_]*) |
+    (?P<assign>(?:>>>|>>|<<|[|^&+*/%%-])=) |
+    (?P<operator>%s) |
+    (?P<string>"(?:[^"\\]|\\[\s\S])*"|'(?:[^'\\]|\\[\s\S])*') |
+    (?P<number>[1-9][0-9]*(?P<fraction>\.[0-9]*)?(?P<exponent>[eE][+-]?[0-9]*)?) |
+    (?P<zero>0(?:\.[0-9]*(?:[eE][+-]?[0-9]*)?|[xX][0-9a-fA-F]*|[0-7]+|(?P<zeroExponent>[eE][+-]?[0-9]*))?) |
+    (?P<dot>\.(?:[0-9]+(?:[eE][+-]?[0-9]*)?)?) |
+    (?P<newline>\n)
+""" % "|".join([re.escape(op) for op in sorted(operatorNames, key=len, reverse=True)]), re.VERBOSE)
+
+# Matches runs of white space with and without line breaks (when scanning for new lines)
+spaceMatcher = re.compile(r"[ \t\xA0\n]+")
+inlineSpaceMatcher = re.compile(r"[ \t\xA0]+")
+
+# Matches regular expression literals (only used when an operand is expected)
+regExpMatcher = re.compile(r"/(?:[^/\\\[]|\\[\s\S]|\[(?:[^\]\\]|\\[\s\S])*\])*/[a-z]*")
+
 
 
 
@@ -96,7 +125,8 @@ class Tokenizer(object):
         # line: Line number (for debugging proposes)
         self.cursor = 0
         self.source = str(source)
-        self.tokens = {}
+        self.sourceId = SourceStore.store(self.source, fileId)
+        self.tokens = [None, None, None, None]
         self.tokenIndex = 0
         self.lookahead = 0
         self.scanNewlines = False
@@ -105,7 +135,7 @@ class Tokenizer(object):
         self.comments = []
 
     input_ = property(lambda self: self.source[self.cursor:])
-    token = property(lambda self: self.tokens.get(self.tokenIndex))
+    token = property(lambda self: self.tokens[self.tokenIndex])
 
 
     def done(self):
@@ -127,7 +157,7 @@ class Tokenizer(object):
 
     def peek(self, scanOperand=False):
         if self.lookahead:
-            next = self.tokens.get((self.tokenIndex + self.lookahead) & 3)
+            next = self.tokens[(self.tokenIndex + self.lookahead) & 3]
             if self.scanNewlines and (getattr(next, "line", None) != getattr(self, "line", None)):
                 tokenType = "newline"
             else:
@@ -156,37 +186,37 @@ class Tokenizer(object):
 
 
     def skip(self):
-        """Eats comments and whitespace."""
+        """
+        Eats comments and whitespace. Runs of whitespace are matched with compiled patterns
+        and comment bodies are located using str.find() instead of walking the source 
+        character by character. Lines are counted using str.count().
+        """
         input = self.source
+        cursor = self.cursor
         startLine = self.line
 
         # Whether this is the first called as happen on start parsing a file (eat leading comments/white space)
-        startOfFile = self.cursor is 0
+        startOfFile = cursor == 0
         
         indent = ""
-        
-        while (True):
-            if len(input) > self.cursor:
-                ch = input[self.cursor]
-            else:
-                return
-                
-            self.cursor += 1
-            
-            if len(input) > self.cursor:
-                next = input[self.cursor]
-            else:
-                next = None
+        spaces = inlineSpaceMatcher.match if self.scanNewlines else spaceMatcher.match
+
+        while True:
+            match = spaces(input, cursor)
+            if match:
+                space = match.group()
+                cursor = match.end()
+
+                # Indentation is only the white space after the last line break
+                lineBreaks = space.count("\n")
+                if lineBreaks:
+                    self.line += lineBreaks
+                    indent = space[space.rindex("\n")+1:]
+                else:
+                    indent += space
 
-            if ch == "\n" and not self.scanNewlines:
-                self.line += 1
-                indent = ""
-                
-            elif ch == "/" and next == "*":
-                self.cursor += 1
-                text = "/*"
-                inline = startLine == self.line and startLine > 1
-                commentStartLine = self.line
+            next = input[cursor:cursor+2]
+            if next == "/*":
                 if startLine == self.line and not startOfFile:
                     mode = "inline"
                 elif (self.line-1) > startLine:
@@ -195,27 +225,16 @@ class Tokenizer(object):
                 else:
                     # comment for maybe multiple following lines of code, but not that important (no visual white space divider)
                     mode = "block"
-                    
-                while (True):
-                    try:
-                        ch = input[self.cursor]
-                        self.cursor += 1
-                    except IndexError:
-                        raise ParseError("Unterminated comment", self.fileId, self.line)
-                        
-                    if ch == "*":
-                        next = input[self.cursor]
-                        if next == "/":
-                            text += "*/"
-                            self.cursor += 1
-                            break
-                            
-                    elif ch == "\n":
-                        self.line += 1
-                        
-                    text += ch
-                    
-                
+
+                end = input.find("*/", cursor+2)
+                if end == -1:
+                    raise ParseError("Unterminated comment", self.fileId, self.line)
+
+                text = input[cursor:end+2]
+                commentStartLine = self.line
+                self.line += text.count("\n")
+                cursor = end + 2
+
                 # Filter escaping on slash-star combinations in comment text
                 text = text.replace("*\/", "*/")
                 
@@ -223,11 +242,8 @@ class Tokenizer(object):
                     self.comments.append(Comment(text, mode, commentStartLine, indent, self.fileId))
                 except CommentException as commentError:
                     error("Ignoring comment in %s: %s", self.fileId, commentError)
-                    
-                    
-            elif ch == "/" and next == "/":
-                self.cursor += 1
-                text = "//"
+
+            elif next == "//":
                 if startLine == self.line and not startOfFile:
                     mode = "inline"
                 elif (self.line-1) > startLine:
@@ -236,290 +252,32 @@ class Tokenizer(object):
                 else:
                     # comment for maybe multiple following lines of code, but not that important (no visual white space divider)
                     mode = "block"
-                    
-                while (True):
-                    try:
-                        ch = input[self.cursor]
-                        self.cursor += 1
-                    except IndexError:
-                        # end of file etc.
-                        break
-
-                    if ch == "\n":
-                        self.line += 1
-                        break
-                    
-                    text += ch
-                    
+
+                # The line break is part of the comment (even when scanning for new lines)
+                end = input.find("\n", cursor+2)
+                if end == -1:
+                    text = input[cursor:]
+                    cursor = len(input)
+                else:
+                    text = input[cursor:end]
+                    cursor = end + 1
+                    self.line += 1
+
                 try:
                     self.comments.append(Comment(text, mode, self.line-1, "", self.fileId))
-                except CommentException:
+                except CommentException as commentError:
                     error("Ignoring comment in %s: %s", self.fileId, commentError)
 
-            # check for whitespace, also for special cases like 0xA0
-            elif ch in "\xA0 \t":
-                indent += ch
-
             else:
-                self.cursor -= 1
+                self.cursor = cursor
                 return
 
 
-    # Lexes the exponential part of a number, if present. Returns True if an
-    # exponential part was found.
-    def lexExponent(self):
-        input = self.source
-        next = input[self.cursor]
-        if next == "e" or next == "E":
-            self.cursor += 1
-            ch = input[self.cursor]
-            self.cursor += 1
-            if ch == "+" or ch == "-":
-                ch = input[self.cursor]
-                self.cursor += 1
-
-            if ch < "0" or ch > "9":
-                raise ParseError("Missing exponent", self.fileId, self.line)
-
-            while(True):
-                ch = input[self.cursor]
-                self.cursor += 1
-                if not (ch >= "0" and ch <= "9"):
-                    break
-                
-            self.cursor -= 1
-            return True
-
-        return False
-
-
-    def lexZeroNumber(self, ch):
-        token = self.token
-        input = self.source
-        token.type = "number"
-
-        ch = input[self.cursor]
-        self.cursor += 1
-        if ch == ".":
-            while(True):
-                ch = input[self.cursor]
-                self.cursor += 1
-                if not (ch >= "0" and ch <= "9"):
-                    break
-                
-            self.cursor -= 1
-            self.lexExponent()
-            token.value = input[token.start:self.cursor]
-            
-        elif ch == "x" or ch == "X":
-            while(True):
-                ch = input[self.cursor]
-                self.cursor += 1
-                if not ((ch >= "0" and ch <= "9") or (ch >= "a" and ch <= "f") or (ch >= "A" and ch <= "F")):
-                    break
-                    
-            self.cursor -= 1
-            token.value = input[token.start:self.cursor]
-
-        elif ch >= "0" and ch <= "7":
-            while(True):
-                ch = input[self.cursor]
-                self.cursor += 1
-                if not (ch >= "0" and ch <= "7"):
-                    break
-                    
-            self.cursor -= 1
-            token.value = input[token.start:self.cursor]
-
-        else:
-            self.cursor -= 1
-            self.lexExponent()     # 0E1, &c.
-            token.value = 0
-    
-
-    def lexNumber(self, ch):
-        token = self.token
-        input = self.source
-        token.type = "number"
-
-        floating = False
-        while(True):
-            ch = input[self.cursor]
-            self.cursor += 1
-            
-            if ch == "." and not floating:
-                floating = True
-                ch = input[self.cursor]
-                self.cursor += 1
-                
-            if not (ch >= "0" and ch <= "9"):
-                break
-
-        self.cursor -= 1
-
-        exponent = self.lexExponent()
-        segment = input[token.start:self.cursor]
-        
-        # Protect float or exponent numbers
-        if floating or exponent:
-            token.value = segment
-        else:
-            token.value = int(segment)
-
-
-    def lexDot(self, ch):
-        token = self.token
-        input = self.source
-        next = input[self.cursor]
-        
-        if next >= "0" and next <= "9":
-            while (True):
-                ch = input[self.cursor]
-                self.cursor += 1
-                if not (ch >= "0" and ch <= "9"):
-                    break
-
-            self.cursor -= 1
-            self.lexExponent()
-
-            token.type = "number"
-            token.value = input[token.start:self.cursor]
-
-        else:
-            token.type = "dot"
-
-
-    def lexString(self, ch):
-        token = self.token
-        input = self.source
-        token.type = "string"
-
-        hasEscapes = False
-        delim = ch
-        ch = input[self.cursor]
-        self.cursor += 1
-        while ch != delim:
-            if ch == "\\":
-                hasEscapes = True
-                self.cursor += 1
-
-            ch = input[self.cursor]
-            self.cursor += 1
-
-        if hasEscapes:
-            token.value = eval(input[token.start:self.cursor])
-        else:
-            token.value = input[token.start+1:self.cursor-1]
-
-
-    def lexRegExp(self, ch):
-        token = self.token
-        input = self.source
-        token.type = "regexp"
-
-        while (True):
-            try:
-                ch = input[self.cursor]
-                self.cursor += 1
-            except IndexError:
-                raise ParseError("Unterminated regex", self.fileId, self.line)
-
-            if ch == "\\":
-                self.cursor += 1
-                
-            elif ch == "[":
-                while (True):
-                    if ch == "\\":
-                        self.cursor += 1
-
-                    try:
-                        ch = input[self.cursor]
-                        self.cursor += 1
-                    except IndexError:
-                        raise ParseError("Unterminated character class", self.fileId, self.line)
-                    
-                    if ch == "]":
-                        break
-                    
-            if ch == "/":
-                break
-
-        while(True):
-            ch = input[self.cursor]
-            self.cursor += 1
-            if not (ch >= "a" and ch <= "z"):
-                break
-
-        self.cursor -= 1
-        token.value = input[token.start:self.cursor]
-    
-
-    def lexOp(self, ch):
-        token = self.token
-        input = self.source
-
-        op = ch
-        while(True):
-            try:
-                next = input[self.cursor]
-            except IndexError:
-                break
-                
-            if (op + next) in operatorNames:
-                self.cursor += 1
-                op += next
-            else:
-                break
-        
-        try:
-            next = input[self.cursor]
-        except IndexError:
-            next = None
-
-        if next == "=" and op in assignOperators:
-            self.cursor += 1
-            token.type = "assign"
-            token.assignOp = operatorNames[op]
-            op += "="
-            
-        else:
-            token.type = operatorNames[op]
-            token.assignOp = None
-
-
-    # FIXME: Unicode escape sequences
-    # FIXME: Unicode identifiers
-    def lexIdent(self, ch):
-        token = self.token
-        input = self.source
-
-        try:
-            while True:
-                ch = input[self.cursor]
-                self.cursor += 1
-            
-                if not ((ch >= "a" and ch <= "z") or (ch >= "A" and ch <= "Z") or (ch >= "0" and ch <= "9") or ch == "$" or ch == "_"):
-                    break
-                    
-        except IndexError:
-            self.cursor += 1
-            pass
-        
-        # Put the non-word character back.
-        self.cursor -= 1
-
-        identifier = input[token.start:self.cursor]
-        if identifier in keywords:
-            token.type = identifier
-        else:
-            token.type = "identifier"
-            token.value = identifier
-
-
     def get(self, scanOperand=False):
         """ 
         It consumes input *only* if there is no lookahead.
-        Dispatches to the appropriate lexing function depending on the input.
+        Lexes the next token using the compiled token expression otherwise. Regular 
+        expression literals are only detected when an operand is expected (scanOperand).
         """
         while self.lookahead:
             self.lookahead -= 1
@@ -533,47 +291,83 @@ class Tokenizer(object):
         self.tokenIndex = (self.tokenIndex + 1) & 3
         self.tokens[self.tokenIndex] = token = Token()
 
-        token.start = self.cursor
+        input = self.source
+        cursor = self.cursor
+
+        token.start = cursor
         token.line = self.line
 
-        input = self.source
-        if self.cursor == len(input):
-            token.end = token.start
+        if cursor == len(input):
+            token.end = cursor
             token.type = "end"
-            return token.type
+            return "end"
 
-        ch = input[self.cursor]
-        self.cursor += 1
-        
-        if (ch >= "a" and ch <= "z") or (ch >= "A" and ch <= "Z") or ch == "$" or ch == "_":
-            self.lexIdent(ch)
-        
-        elif scanOperand and ch == "/":
-            self.lexRegExp(ch)
-        
-        elif ch == ".":
-            self.lexDot(ch)
+        if scanOperand and input[cursor] == "/":
+            match = regExpMatcher.match(input, cursor)
+            if match is None:
+                raise ParseError("Unterminated regex", self.fileId, self.line)
+
+            token.type = "regexp"
+            token.value = match.group()
+            token.end = self.cursor = match.end()
+            return "regexp"
+
+        match = tokenMatcher.match(input, cursor)
+        if match is None:
+            ch = input[cursor]
+            if ch == '"' or ch == "'":
+                raise ParseError("Unterminated string", self.fileId, self.line)
 
-        elif self.scanNewlines and ch == "\n":
+            raise ParseError("Illegal token: %s (Code: %s)" % (ch, ord(ch)), self.fileId, self.line)
+
+        kind = match.lastgroup
+        segment = match.group()
+        token.end = self.cursor = match.end()
+
+        if kind == "identifier":
+            if segment in keywordNames:
+                token.type = segment
+            else:
+                token.type = "identifier"
+                token.value = segment
+
+        elif kind == "operator":
+            token.type = operatorNames[segment]
+            token.assignOp = None
+
+        elif kind == "assign":
+            token.type = "assign"
+            token.assignOp = operatorNames[segment[:-1]]
+
+        elif kind == "string":
+            token.type = "string"
+            if "\\" in segment:
+                token.value = eval(segment)
+            else:
+                token.value = segment[1:-1]
+
+        elif kind == "newline":
             token.type = "newline"
             self.line += 1
 
-        elif ch in operatorNames:
-            self.lexOp(ch)
-        
-        elif ch >= "1" and ch <= "9":
-            self.lexNumber(ch)
-        
-        elif ch == "0":
-            self.lexZeroNumber(ch)
-        
-        elif ch == '"' or ch == "'":
-            self.lexString(ch)
-        
+        elif kind == "dot" and len(segment) == 1:
+            token.type = "dot"
+
         else:
-            raise ParseError("Illegal token: %s (Code: %s)" % (ch, ord(ch)), self.fileId, self.line)
+            # Numbers ending with parts of an exponent (except hex numbers like 0xE)
+            if segment[-1] in "eE+-" and not segment[:2] in ("0x", "0X"):
+                raise ParseError("Missing exponent", self.fileId, self.line)
+
+            token.type = "number"
+
+            # Protect float or exponent numbers, 0 is also used for "0e1" etc.
+            if kind == "number":
+                token.value = segment if match.group("fraction") is not None or match.group("exponent") is not None else int(segment)
+            elif kind == "zero" and (len(segment) == 1 or match.group("zeroExponent") is not None):
+                token.value = 0
+            else:
+                token.value = segment
 
-        token.end = self.cursor
         return token.type
         
 
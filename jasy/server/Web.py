@@ -3,7 +3,7 @@
 # Copyright 2010-2012 Zynga Inc.
 #
 
-import sys, os, jasy, logging, base64, json, requests
+import sys, os, re, jasy, logging, base64, json, requests, tempfile
 from urllib.parse import urlparse
 from collections import namedtuple
 
@@ -218,6 +218,72 @@ class Static(object):
             raise cherrypy.NotFound(path)
         
 
+class Blobs(object):
+    """
+    Reference server of the remote build cache (see jasy.core.CacheRemote). Stores the 
+    blobs in the given folder and supports GET, HEAD and PUT requests of blob addresses.
+    Configured via a route with a "blobs" folder e.g. {"cache" : {"blobs" : "remotecache"}}.
+    """
+    
+    __address = re.compile(r"^[a-f0-9]{40}$")
+    
+    def __init__(self, id, config):
+        self.id = id
+        self.config = config
+        self.root = getKey(config, "blobs")
+        self.enableDebug = getKey(config, "debug", False)
+        
+        if not os.path.isdir(self.root):
+            os.makedirs(self.root)
+
+        info('Blobs "%s" => "%s" [debug:%s]', self.id, self.root, self.enableDebug)
+        
+    @cherrypy.expose
+    def default(self, *args, **query):
+        """
+        Returns the blob with the given address or stores the request body as blob (PUT).
+        Blobs are written to a temporary file first so that readers never see partial data.
+        """
+        
+        cherrypy.response.headers["X-Jasy-Version"] = jasy.__version__
+        
+        if len(args) != 1 or not self.__address.match(args[0]):
+            raise cherrypy.NotFound("/".join(args))
+        
+        address = args[0]
+        folder = os.path.join(self.root, address[:2])
+        path = os.path.join(folder, address)
+        method = cherrypy.request.method
+        
+        if method in ("GET", "HEAD"):
+            if not os.path.isfile(path):
+                if self.enableDebug:
+                    info("Blob not found: %s", address)
+                    
+                raise cherrypy.NotFound(address)
+                
+            return serveFile(os.path.abspath(path), "application/octet-stream")
+            
+        elif method == "PUT":
+            if not os.path.isdir(folder):
+                os.makedirs(folder, exist_ok=True)
+            
+            handle, temp = tempfile.mkstemp(dir=folder)
+            with os.fdopen(handle, "wb") as output:
+                output.write(cherrypy.request.body.read())
+                
+            os.replace(temp, path)
+            
+            if self.enableDebug:
+                info("Stored blob: %s", address)
+            
+            cherrypy.response.status = 201
+            return b""
+            
+        else:
+            raise cherrypy.HTTPError(405)
+        
+
 #
 # START
 #
@@ -268,6 +334,8 @@ def serve(routes=None, port=8080, host="127.0.0.1"):
             entry = routes[key]
             if "host" in entry:
                 node = Proxy(key, entry)
+            elif "blobs" in entry:
+                node = Blobs(key, entry)
             else:
                 node = Static(key, entry)
             
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, tempfile, hashlib, warnings, gc, sqlite3, pickle
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.core.Cache
+import jasy.core.CacheMemory
+from jasy.core.Cache import Cache
+from jasy.core.CacheMemory import MemoryCache, getApproximateSize
+from jasy.core.Item import Item
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def open(self, storage="sqlite", **args):
+        cache = Cache(self.directory.name, storage=storage, **args)
+        self.addCleanup(cache.close)
+        return cache
+
+
+    def test_store_read(self):
+        for storage in ("sqlite", "shelve"):
+            cache = self.open(storage, filename="test-%s" % storage)
+            cache.store("tree[foo]", {"hello" : "world"}, 10)
+            self.assertEqual(cache.read("tree[foo]", 10), {"hello" : "world"})
+            self.assertEqual(cache.read("tree[bar]"), None)
+
+    def test_persistent(self):
+        cache = self.open()
+        cache.store("meta[foo]", [1, 2, 3], 10)
+        cache.store("meta[bar]", [4, 5], 10, transient=True)
+        cache.close()
+
+        cache = self.open()
+        self.assertEqual(cache.read("meta[foo]", 10), [1, 2, 3])
+        self.assertEqual(cache.read("meta[bar]", 10), None)
+
+    def test_timestamp(self):
+        cache = self.open()
+        cache.store("meta[foo]", "value", 10)
+        cache.close()
+
+        cache = self.open()
+        self.assertEqual(cache.read("meta[foo]", 20), None)
+
+        cache = self.open()
+        self.assertEqual(cache.read("meta[foo]", 5), "value")
+
+    def test_fingerprint(self):
+        cache = self.open()
+        cache.store("meta[foo]", "value", "a94a8fe5ccb19ba61c4c0873d391e987982fbbd3")
+        cache.close()
+
+        cache = self.open()
+        self.assertEqual(cache.read("meta[foo]", "da39a3ee5e6b4b0d3255bfef95601890afd80709"), None)
+
+        cache = self.open()
+        self.assertEqual(cache.read("meta[foo]", 20), None)
+
+        cache = self.open()
+        self.assertEqual(cache.read("meta[foo]", "a94a8fe5ccb19ba61c4c0873d391e987982fbbd3"), "value")
+
+    def test_item_fingerprint(self):
+        class FakeProject:
+            def __init__(self, cache):
+                self.cache = cache
+
+            def getCache(self):
+                return self.cache
+
+        fileNames = []
+        for name in ("a.js", "b.js"):
+            fileName = os.path.join(self.directory.name, name)
+            with open(fileName, "w") as handle:
+                handle.write("var %s;" % name[0])
+            fileNames.append(fileName)
+
+        project = FakeProject(self.open())
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            single = Item(project, "a").attach(fileNames[0]).getFingerprint()
+            combined = Item(project, "ab").attach(fileNames).getFingerprint()
+            gc.collect()
+
+        self.assertEqual([warning for warning in caught if issubclass(warning.category, ResourceWarning)], [])
+        self.assertEqual(single, hashlib.sha1(b"var a;").hexdigest())
+        self.assertEqual(combined, hashlib.sha1(b"var a;var b;").hexdigest())
+
+        # Memoized by inode, size and modification time
+        self.assertEqual(project.cache.read("fingerprint[%s]" % fileNames[0])[1], single)
+
+    def test_schema(self):
+        cache = self.open()
+        cache.store("tree[foo]", "tree", 10)
+        cache.store("meta[foo]", "meta", 10)
+        cache.close()
+
+        jasy.core.Cache.schemaVersions["tree"] += 1
+        try:
+            cache = self.open()
+            self.assertEqual(cache.read("tree[foo]", 10), None)
+            self.assertEqual(cache.read("meta[foo]", 10), "meta")
+        finally:
+            jasy.core.Cache.schemaVersions["tree"] -= 1
+
+    def test_bundle(self):
+        fingerprint = "a94a8fe5ccb19ba61c4c0873d391e987982fbbd3"
+        fileName = os.path.join(self.directory.name, "test.jasybundle")
+
+        cache = self.open(filename="source")
+        cache.store("compressed[foo]-a", "foo();", fingerprint)
+        cache.store("compressed[foo]-b", "foo();", fingerprint)
+        cache.store("compressed[bar]", "bar();", 10)
+        self.assertEqual(cache.export(fileName), 2)
+
+        mounted = self.open(filename="mounted")
+        mounted.mount(fileName)
+        self.assertEqual(mounted.read("compressed[foo]-b", fingerprint), "foo();")
+        self.assertEqual(mounted.read("compressed[foo]-a", "other"), None)
+        self.assertEqual(mounted.read("compressed[bar]"), None)
+
+        imported = self.open(filename="imported")
+        self.assertEqual(imported.load(fileName), 2)
+        imported.close()
+
+        imported = self.open(filename="imported")
+        self.assertEqual(imported.read("compressed[foo]-a", fingerprint), "foo();")
+
+    def test_bundle_text(self):
+        fingerprint = "a94a8fe5ccb19ba61c4c0873d391e987982fbbd3"
+        fileName = os.path.join(self.directory.name, "test.jasybundle")
+
+        cache = self.open(filename="source")
+        cache.store("compressed[foo]", "foo();", fingerprint)
+        cache.store("meta[foo]", {"requires" : ["bar"]}, fingerprint)
+        self.assertEqual(cache.export(fileName), 1)
+
+        # Data of bundles is decoded as text and never unpickled
+        data = pickle.dumps(["foo"], 0)
+        connection = sqlite3.connect(fileName)
+        with connection:
+            connection.execute("UPDATE blobs SET data=?", (data,))
+        connection.close()
+
+        mounted = self.open(filename="mounted")
+        mounted.mount(fileName)
+        self.assertEqual(mounted.read("meta[foo]", fingerprint), None)
+        self.assertEqual(mounted.read("compressed[foo]", fingerprint), data.decode("utf-8"))
+
+        imported = self.open(filename="imported")
+        self.assertEqual(imported.load(fileName), 1)
+        self.assertEqual(imported.read("compressed[foo]", fingerprint), data.decode("utf-8"))
+
+        # Bundles of other formats are refused
+        connection = sqlite3.connect(fileName)
+        connection.execute("PRAGMA user_version = 0")
+        connection.close()
+
+        self.assertRaises(IOError, self.open(filename="other").mount, fileName)
+        self.assertRaises(IOError, self.open(filename="other").load, fileName)
+
+    def test_statistics(self):
+        cache = self.open()
+        cache.store("tree[foo]", "tree", 10)
+        cache.store("meta[foo]", "meta", 10)
+        cache.close()
+
+        cache = self.open()
+        cache.read("tree[foo]", 10)
+        cache.read("tree[foo]", 10)
+        cache.read("meta[foo]", 20)
+        cache.read("meta[bar]")
+
+        statistics = cache.getStatistics()
+        self.assertEqual(statistics["tree"]["hits"], 2)
+        self.assertEqual(statistics["tree"]["memory"], 1)
+        self.assertTrue(statistics["tree"]["loaded"] > 0)
+        self.assertEqual(statistics["meta"]["stale"], 1)
+        self.assertEqual(statistics["meta"]["misses"], 2)
+
+    def test_memory_eviction(self):
+        memory = MemoryCache(100)
+        memory.set("a", "x", size=40)
+        memory.set("b", "y", size=40)
+        memory["a"]
+        memory.set("c", "z", size=40)
+
+        self.assertTrue("a" in memory)
+        self.assertFalse("b" in memory)
+        self.assertTrue("c" in memory)
+        self.assertEqual(memory.getSize(), 80)
+        self.assertEqual(memory.getEvictions(), 1)
+
+    def test_memory_pin(self):
+        memory = MemoryCache(100)
+        memory.set("tree", "x", size=90, pin=True)
+        memory.set("a", "y", size=20)
+        memory.set("b", "z", size=5)
+
+        self.assertTrue("tree" in memory)
+        self.assertFalse("a" in memory)
+        self.assertTrue("b" in memory)
+
+    def test_memory_size(self):
+        small = getApproximateSize(["a" * 10])
+        large = getApproximateSize(["a" * 1000, {"key" : "b" * 1000}])
+        self.assertTrue(large > small + 2000)
+
+    def test_memory_shared(self):
+        shared = {"text" : "a" * 1000}
+        value = [shared, shared, "b" * 1000]
+        self.assertEqual(getApproximateSize(value), sys.getsizeof(value) + getApproximateSize(shared) + sys.getsizeof(value[2]))
+
+        interned = ["c", "c", 1, 1]
+        self.assertEqual(getApproximateSize(interned), sys.getsizeof(interned) + sys.getsizeof("c") + sys.getsizeof(1))
+
+    def test_memory_serialized_size(self):
+        walked = []
+        original = jasy.core.CacheMemory.getApproximateSize
+        def counting(value):
+            walked.append(value)
+            return original(value)
+
+        jasy.core.CacheMemory.getApproximateSize = counting
+        self.addCleanup(setattr, jasy.core.CacheMemory, "getApproximateSize", original)
+
+        cache = self.open(memory=100000)
+        cache.store("tree[foo]", [list(range(100))] * 10, 10)
+        cache.close()
+
+        cache = self.open(memory=100000)
+        self.assertEqual(len(cache.read("tree[foo]", 10)), 10)
+        self.assertEqual(walked, [])
+
+        cache.store("tree[bar]", [1, 2], transient=True)
+        self.assertEqual(walked, [[1, 2]])
+
+    def test_memory_budget(self):
+        cache = self.open(memory=10000)
+        for pos in range(100):
+            cache.store("compressed[%s]" % pos, "x" * 1000, 10)
+
+        # Evicted values are still available from the storage
+        self.assertEqual(cache.read("compressed[0]", 10), "x" * 1000)
+
+    def test_batch(self):
+        cache = self.open()
+        for pos in range(1000):
+            cache.store("size[%s]" % pos, pos, 10)
+        cache.close()
+
+        cache = self.open()
+        self.assertEqual(cache.read("size[0]"), 0)
+        self.assertEqual(cache.read("size[999]"), 999)
+
+    def test_concurrent_readers(self):
+        first = self.open()
+        first.store("api[foo]", "doc", 10)
+        first.sync()
+
+        second = self.open()
+        self.assertEqual(second.read("api[foo]", 10), "doc")
+
+    def test_clear(self):
+        cache = self.open()
+        cache.store("api[foo]", "doc", 10)
+        cache.clear()
+        self.assertEqual(cache.read("api[foo]"), None)
+
+    def test_compact(self):
+        for storage in ("sqlite", "shelve"):
+            cache = self.open(storage, filename="test-%s" % storage)
+            cache.store("tree[foo]", "foo", 10)
+            cache.store("tree[bar]", "bar", 10)
+            cache.store("meta[foo]", "meta", 20)
+
+            removed = cache.compact(lambda key, timestamp: not "bar" in key and timestamp >= 20)
+            self.assertEqual(removed, 2)
+            self.assertEqual(cache.read("tree[bar]"), None)
+            self.assertEqual(cache.read("tree[foo]"), None)
+            self.assertEqual(cache.read("meta[foo]"), "meta")
+            cache.close()
+
+            cache = self.open(storage, filename="test-%s" % storage)
+            self.assertEqual(cache.read("meta[foo]", 20), "meta")
+
+    def test_compact_schema(self):
+        cache = self.open()
+        cache.store("tree[foo]", "tree", 10)
+        cache.store("meta[foo]", "meta", 10)
+
+        jasy.core.Cache.schemaVersions["tree"] += 1
+        try:
+            self.assertEqual(cache.compact(), 1)
+        finally:
+            jasy.core.Cache.schemaVersions["tree"] -= 1
+
+    def test_compact_entries(self):
+        cache = self.open()
+        for name in ("a", "b", "c"):
+            cache.store("dependencies-%s" % name, [name], 10)
+        cache.store("tree[foo]", "foo", 10)
+        cache.close()
+
+        cache = self.open()
+        cache.read("dependencies-b")
+
+        self.assertEqual(cache.compact(maxEntries={"dependencies" : 1}), 2)
+        self.assertEqual(cache.read("dependencies-a"), None)
+        self.assertEqual(cache.read("dependencies-b"), ["b"])
+        self.assertEqual(cache.read("dependencies-c"), None)
+        self.assertEqual(cache.read("tree[foo]"), "foo")
+
+    def test_compact_size(self):
+        cache = self.open()
+        for pos in range(10):
+            cache.store("compressed[%s]" % pos, "x" * 1000, 10)
+        cache.close()
+
+        # Use some of the entries to keep them
+        cache = self.open()
+        cache.read("compressed[2]")
+        cache.read("compressed[7]")
+
+        size = cache.getSize()
+        self.assertEqual(cache.compact(maxSize=size // 4), 8)
+        self.assertTrue(cache.getSize() <= size // 4)
+        cache.close()
+
+        cache = self.open()
+        self.assertEqual(cache.read("compressed[0]"), None)
+        self.assertEqual(cache.read("compressed[2]"), "x" * 1000)
+        self.assertEqual(cache.read("compressed[7]"), "x" * 1000)
+
+    def test_compression(self):
+        value = "function foo() { return 42; }\n" * 200
+
+        cache = self.open(compression={"highlighted" : ("lzma", 1), "size" : None})
+        cache.store("compressed[foo]", value, 10)
+        cache.store("highlighted[foo]", value, 10)
+        cache.store("size[foo]", value, 10)
+        cache.store("meta[foo]", "small", 10)
+        cache.close()
+
+        statistics = cache.getStatistics()
+        self.assertTrue(statistics["compressed"]["stored"] < statistics["compressed"]["raw"] / 10)
+        self.assertTrue(statistics["highlighted"]["stored"] < statistics["highlighted"]["raw"] / 10)
+        self.assertEqual(statistics["size"]["stored"], statistics["size"]["raw"])
+        self.assertEqual(statistics["meta"]["stored"], statistics["meta"]["raw"])
+
+        cache = self.open()
+        for key in ("compressed[foo]", "highlighted[foo]", "size[foo]"):
+            self.assertEqual(cache.read(key, 10), value)
+
+    def test_compression_data(self):
+        data = b"x" * 1000
+        for method in ("zlib", "lzma"):
+            compressed = jasy.core.Cache.compressData(data, method, 1)
+            self.assertTrue(len(compressed) < 200)
+            self.assertEqual(jasy.core.Cache.decompressData(compressed), data)
+
+        self.assertEqual(jasy.core.Cache.decompressData(data), data)
+
+    def test_hashkeys(self):
+        cache = self.open(hashkeys=True)
+        cache.store("http://example.com/", "content")
+        cache.close()
+
+        cache = self.open(hashkeys=True)
+        self.assertEqual(cache.read("http://example.com/"), "content")
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -1418,6 +1418,56 @@ class Tests(unittest.TestCase):
 
 
 
+    #
+    # LAZY PROCESSING
+    #
+
+    def test_lazy_tags(self):
+
+        parsed = self.process('''
+
+        /**
+         * {Boolean} Returns whether #require(foo.Bar) and #asset(foo/*)
+         * were @found {Integer} among {foo.Bar#baz}.
+         */
+        lazyCmd();
+
+        ''')
+
+        comment = parsed[0].comments[0]
+        self.assertEqual(comment.getTags(), {"require" : set(["foo.Bar"]), "asset" : set(["foo/*"])})
+        self.assertTrue(comment.hasTag("require"))
+        self.assertFalse("_Comment__text" in comment.__dict__)
+        self.assertFalse("_Comment__params" in comment.__dict__)
+
+        self.assertEqual(comment.returns, [{"name" : "Boolean", "builtin" : True}])
+        self.assertEqual(comment.params["found"]["type"], [{"name" : "Integer"}])
+        self.assertFalse("#require" in comment.text)
+        self.assertEqual(comment.tags, {"require" : set(["foo.Bar"]), "asset" : set(["foo/*"])})
+
+
+    def test_lazy_serialized(self):
+
+        import jasy.js.parse.Serializer as Serializer
+
+        parsed = self.process('''
+
+        /**
+         * Hello #break(foo.Baz) {Number} @param {String}
+         */
+        serializedCmd();
+
+        ''')
+
+        restored = Serializer.load(Serializer.dump(parsed))
+        comment = restored[0].comments[0]
+        self.assertEqual(comment.getTags(), {"break" : set(["foo.Baz"])})
+        self.assertEqual(comment.text, parsed[0].comments[0].text)
+        self.assertEqual(comment.params, parsed[0].comments[0].params)
+
+
+
+
 if __name__ == '__main__':
     logging.getLogger().setLevel(logging.ERROR)
     suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
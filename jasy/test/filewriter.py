@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, tempfile, gzip, json
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.env.State
+import jasy.env.File as File
+from jasy.core.Error import JasyError
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "script", "app.js")
+
+    def read(self, path):
+        return open(path, encoding="utf-8").read()
+
+    def test_write(self):
+        writer = File.FileWriter(self.path)
+        writer.write("var a=1;")
+        writer.write("var b='ä';")
+        self.assertFalse(os.path.exists(self.path))
+
+        writer.close()
+        self.assertEqual(self.read(self.path), "var a=1;var b='ä';")
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["app.js"])
+
+    def test_gzip(self):
+        with File.FileWriter(self.path, ["gz"]) as writer:
+            for pos in range(1000):
+                writer.write("var a%s=%s;" % (pos, pos))
+
+        content = self.read(self.path)
+        self.assertEqual(gzip.open(self.path + ".gz").read().decode("utf-8"), content)
+        self.assertTrue(os.path.getsize(self.path + ".gz") < len(content) / 2)
+
+    def test_brotli(self):
+        with File.FileWriter(self.path, ["br"]) as writer:
+            writer.write("var a=1;")
+
+        self.assertEqual(os.path.exists(self.path + ".br"), File.brotli is not None)
+        if File.brotli is not None:
+            self.assertEqual(File.brotli.decompress(open(self.path + ".br", "rb").read()), b"var a=1;")
+
+    def test_abort(self):
+        try:
+            with File.FileWriter(self.path, ["gz"]) as writer:
+                writer.write("var a=1;")
+                raise ValueError("Failed")
+        except ValueError:
+            pass
+
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), [])
+
+    def test_hashed(self):
+        with File.FileWriter(self.path, ["gz"], hashed=True) as writer:
+            writer.write("abc")
+
+        hashedPath = os.path.join(os.path.dirname(self.path), "app-a9993e36.js")
+        self.assertEqual(writer.getFileName(), hashedPath)
+        self.assertEqual(sorted(os.listdir(os.path.dirname(self.path))), ["app-a9993e36.js", "app-a9993e36.js.gz"])
+        self.assertEqual(self.read(hashedPath), "abc")
+        self.assertEqual(File.getHashedName(self.path), hashedPath)
+        self.assertEqual(File.getManifest()[self.path], hashedPath)
+        self.assertEqual(writer.getWrittenPaths(), [hashedPath, hashedPath + ".gz"])
+
+    def test_manifest(self):
+        with File.FileWriter(self.path, hashed=True) as writer:
+            writer.write("var a=1;")
+
+        manifest = os.path.join(self.directory.name, "manifest.json")
+        File.writeManifest(manifest)
+        self.assertEqual(json.loads(self.read(manifest))[self.path], writer.getFileName())
+        self.assertEqual(File.getHashedName("unknown.js"), "unknown.js")
+
+    def test_unsupported(self):
+        self.assertRaises(JasyError, File.FileWriter, self.path, ["zip"])
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), [])
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
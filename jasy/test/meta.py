@@ -3,7 +3,7 @@
 import sys, os, unittest, logging, pkg_resources
 
 # Extend PYTHONPATH with local 'lib' folder
-jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir))
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
 sys.path.insert(0, jasyroot)
 
 import jasy.js.parse.Parser as Parser
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, tempfile, json
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.env.State
+import jasy.env.JavaScript as JavaScript
+
+from jasy.core.Project import Project
+from jasy.env.File import FileWriter, getManifest
+
+from jasy.js.Sorter import Sorter
+
+
+class Meta:
+    breaks = set()
+
+
+class FakeClass:
+    def __init__(self, id, deps):
+        self.id = id
+        self.deps = deps
+
+    def getId(self):
+        return self.id
+
+    def getDependencies(self, permutation=None, classes=None, warnings=True, fast=False):
+        return set(classes[name] for name in self.deps if name in classes)
+
+    def getMetaData(self, permutation=None):
+        return Meta()
+
+    def __repr__(self):
+        return self.id
+
+
+# Dependencies of the classes used by the fake resolver
+graph = {
+    "core.Base" : [],
+    "app.Util" : ["core.Base"],
+    "app.Header" : ["app.Util"],
+    "app.Home" : ["app.Header", "app.Util"],
+    "app.Cart" : ["core.Base"],
+    "app.Shop" : ["app.Cart", "app.Util"]
+}
+
+classes = dict((name, FakeClass(name, graph[name])) for name in graph)
+
+
+class FakeResolver:
+    def __init__(self, permutation=None, fast=False):
+        self.required = []
+        self.excluded = []
+
+    def addClassName(self, className):
+        self.required.append(classes[className])
+        return self
+
+    def excludeClasses(self, classObjects):
+        self.excluded.extend(classObjects)
+        return self
+
+    def getPermutation(self):
+        return None
+
+    def isFast(self):
+        return False
+
+    def getClassRegistry(self):
+        return classes
+
+    def getRequiredClasses(self):
+        return self.required
+
+    def getIncludedClasses(self):
+        included = set()
+        stack = list(self.required)
+        while stack:
+            classObj = stack.pop()
+            if not classObj in included:
+                included.add(classObj)
+                stack.extend(classes[name] for name in classObj.deps)
+
+        return included - set(self.excluded)
+
+    def getDependencies(self, classObj):
+        return classObj.getDependencies(classes=classes), classObj.getMetaData().breaks
+
+    def getSortedClasses(self):
+        return Sorter(self).getSortedClasses()
+
+
+class FakeSession:
+    def __init__(self, project):
+        self.project = project
+
+    def getMain(self):
+        return self.project
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def patch(self, name, value):
+        self.addCleanup(setattr, JavaScript, name, getattr(JavaScript, name))
+        setattr(JavaScript, name, value)
+
+    def createProject(self):
+        path = os.path.join(self.directory.name, "project")
+        os.makedirs(os.path.join(path, "class", "foo"))
+        for name in ("Main", "Util"):
+            with open(os.path.join(path, "class", "foo", "%s.js" % name), "w") as handle:
+                handle.write('core.Class("foo.%s", { members : { run : function() { var result = 1 + 2; return result; } } });' % name)
+
+        project = Project(path)
+        project.scan()
+        self.addCleanup(project.getCache().close)
+
+        self.patch("session", FakeSession(project))
+        return project
+
+    def bundles(self, entries, exclude=None):
+        self.stored = {}
+        def storeCompressed(classes, fileName, bootCode="", workers=None, permutation=None, compress=None, hashed=False):
+            self.stored[os.path.basename(fileName)] = [classObj.getId() for classObj in classes]
+            return fileName
+
+        self.patch("Resolver", FakeResolver)
+        self.patch("storeCompressed", storeCompressed)
+
+        fileName = os.path.join(self.directory.name, "%s.js")
+        manifestName = os.path.join(self.directory.name, "manifest.json")
+        manifest = JavaScript.storeBundles(entries, fileName, manifestName, exclude=exclude)
+
+        with open(manifestName) as handle:
+            self.assertEqual(json.load(handle), manifest)
+
+        return dict((entryName, [os.path.basename(name) for name in manifest[entryName]]) for entryName in manifest)
+
+    def assertSorted(self, classIds):
+        for pos, classId in enumerate(classIds):
+            for dep in graph[classId]:
+                if dep in classIds:
+                    self.assertTrue(classIds.index(dep) < pos, "%s should be before %s in %s" % (dep, classId, classIds))
+
+    def test_shared(self):
+        manifest = self.bundles({"home" : ["app.Home"], "shop" : "app.Shop"})
+
+        self.assertEqual(sorted(self.stored), ["home.js", "shared-home-shop.js", "shop.js"])
+        self.assertEqual(self.stored["shared-home-shop.js"], ["core.Base", "app.Util"])
+        self.assertEqual(self.stored["home.js"], ["app.Header", "app.Home"])
+        self.assertEqual(self.stored["shop.js"], ["app.Cart", "app.Shop"])
+
+        self.assertEqual(manifest, {
+            "home" : ["shared-home-shop.js", "home.js"],
+            "shop" : ["shared-home-shop.js", "shop.js"]
+        })
+
+    def test_order(self):
+        manifest = self.bundles({"home" : ["app.Home"], "shop" : ["app.Shop"], "cart" : ["app.Cart"]})
+
+        self.assertEqual(sorted(self.stored), ["home.js", "shared-cart-home-shop.js", "shared-cart-shop.js", "shared-home-shop.js", "shop.js"])
+        self.assertEqual(self.stored["shared-cart-home-shop.js"], ["core.Base"])
+        self.assertEqual(self.stored["shared-cart-shop.js"], ["app.Cart"])
+
+        for classIds in self.stored.values():
+            self.assertSorted(classIds)
+
+        # Bundles used by more entry points are loaded first
+        self.assertEqual(manifest["shop"], ["shared-cart-home-shop.js", "shared-cart-shop.js", "shared-home-shop.js", "shop.js"])
+        self.assertEqual(manifest["home"], ["shared-cart-home-shop.js", "shared-home-shop.js", "home.js"])
+        self.assertEqual(manifest["cart"], ["shared-cart-home-shop.js", "shared-cart-shop.js"])
+
+    def test_exclude(self):
+        manifest = self.bundles({"home" : ["app.Home"], "shop" : ["app.Shop"]}, exclude=[classes["core.Base"]])
+
+        self.assertEqual(self.stored["shared-home-shop.js"], ["app.Util"])
+        self.assertFalse("core.Base" in [classId for classIds in self.stored.values() for classId in classIds])
+
+    def test_loader_hashed(self):
+        appName = os.path.join(self.directory.name, "app.js")
+        with FileWriter(appName, hashed=True) as writer:
+            writer.write("app();")
+
+        hashedName = getManifest()[appName]
+        self.assertNotEqual(hashedName, appName)
+
+        loaderName = os.path.join(self.directory.name, "loader.js")
+        written = JavaScript.storeLoader([], loaderName, 'core.io.Queue.load(["%s"]);' % appName, hashed=True)
+        self.assertEqual(getManifest()[loaderName], written)
+        self.assertNotEqual(written, loaderName)
+
+        with open(written) as handle:
+            loader = handle.read()
+
+        self.assertTrue('"%s"' % hashedName in loader)
+        self.assertFalse('"%s"' % appName in loader)
+
+    def test_boot_urls(self):
+        self.addCleanup(setattr, JavaScript, "getManifest", JavaScript.getManifest)
+        JavaScript.getManifest = lambda: {"script/app.js" : "script/app-0beec7b5.js"}
+
+        code = 'load(["script/app.js", "./script/app.js", "/script/app.js", "//cdn.example.com/script/app.js", "myscript/app.js", "app.js", "script/app.js?v=1"]);'
+        self.assertEqual(JavaScript.packBootCode(code),
+            'load(["script/app-0beec7b5.js","./script/app-0beec7b5.js","/script/app-0beec7b5.js","//cdn.example.com/script/app-0beec7b5.js","myscript/app.js","app.js","script/app.js?v=1"]);')
+
+    def build(self, project, fileName):
+        """Stores the classes of the given project and returns whether any class was compressed"""
+
+        compressed = []
+        for classObj in project.classes.values():
+            def getCompressed(*args, classObj=classObj, original=classObj.getCompressed, **kwargs):
+                compressed.append(classObj.getId())
+                return original(*args, **kwargs)
+
+            classObj.getCompressed = getCompressed
+
+        JavaScript.storeCompressed([project.classes["foo.Util"], project.classes["foo.Main"]], fileName)
+        return len(compressed) > 0
+
+    def test_unchanged(self):
+        project = self.createProject()
+        fileName = os.path.join(self.directory.name, "app.js")
+        self.assertTrue(self.build(project, fileName))
+
+        with open(fileName) as handle:
+            content = handle.read()
+
+        os.utime(fileName, (1000, 1000))
+        self.assertFalse(self.build(project, fileName))
+        self.assertEqual(os.stat(fileName).st_mtime, 1000)
+
+        # Outputs are not related to any item of the project and are kept by compact()
+        project.compact()
+        self.assertFalse(self.build(project, fileName))
+        self.assertEqual(os.stat(fileName).st_mtime, 1000)
+
+        with open(fileName) as handle:
+            self.assertEqual(handle.read(), content)
+
+    def test_changed(self):
+        project = self.createProject()
+        fileName = os.path.join(self.directory.name, "app.js")
+        self.build(project, fileName)
+        os.utime(fileName, (1000, 1000))
+
+        os.remove(fileName)
+        self.assertTrue(self.build(project, fileName))
+        self.assertTrue(os.path.exists(fileName))
+
+        otherName = os.path.join(self.directory.name, "other.js")
+        self.assertTrue(self.build(project, otherName))
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
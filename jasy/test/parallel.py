@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, concurrent.futures, tempfile
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.env.State
+import jasy.env.JavaScript as JavaScript
+import jasy.js.parse.Parser as Parser
+import jasy.js.parse.ScopeScanner as ScopeScanner
+import jasy.js.parse.Serializer as Serializer
+
+from jasy.core.Permutation import Permutation
+from jasy.core.Project import Project
+from jasy.js.Class import compressClass
+from jasy.js.output.Optimization import Optimization
+
+
+code = '''
+core.Class("foo.Main", {
+  members : {
+    __secret : 1,
+    add : function(first, second) {
+      if (core.Env.isSet("debug")) {
+        console.log("Adding", first, second);
+      }
+      var result = first + second + this.__secret;
+      return result;
+    }
+  }
+});
+'''
+
+sources = {
+    "foo.Main" : code,
+    "foo.Util" : 'core.Module("foo.Util", { add : function(first, second) { var result = first + second; return result; } });',
+    "foo.Label" : 'core.Class("foo.Label", { construct : function(text) { this.__text = text || "none"; } });',
+    "foo.List" : 'core.Class("foo.List", { members : { size : function() { var length = this.length; return length; } } });'
+}
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def createProject(self, name):
+        path = os.path.join(self.directory.name, name)
+        os.makedirs(os.path.join(path, "class", "foo"))
+        for classId in sources:
+            with open(os.path.join(path, "class", "foo", "%s.js" % classId.split(".")[-1]), "w") as handle:
+                handle.write(sources[classId])
+
+        project = Project(path)
+        project.scan()
+        self.addCleanup(project.getCache().close)
+        return project
+
+    def getCompressed(self, classObj, permutation=None, compute=False):
+        return classObj.getCompressed(permutation, None, jasy.env.State.jsOptimization, jasy.env.State.jsFormatting, compute=compute)
+
+    def test_text(self):
+        self.assertEqual(compressClass("foo.Main", code), 'core.Class("foo.Main",{members:{__secret:1,add:function(first,second){if(core.Env.isSet("debug")){console.log("Adding",first,second)}var result=first+second+this.__secret;return result}}});')
+
+    def test_permutation(self):
+        compressed = compressClass("foo.Main", code, permutation=Permutation({"debug" : False}), optimization=Optimization("blocks"))
+        self.assertEqual(compressed, 'core.Class("foo.Main",{members:{__secret:1,add:function(first,second){var result=first+second+this.__secret;return result}}});')
+
+    def test_serialized(self):
+        tree = Parser.parse(code, "foo.Main")
+        ScopeScanner.scan(tree)
+        data = Serializer.dump(tree)
+
+        optimization = Optimization("declarations", "blocks", "privates")
+        self.assertEqual(compressClass("foo.Main", data=data, optimization=optimization), compressClass("foo.Main", code, optimization=optimization))
+
+    def test_processes(self):
+        sources = ["var x%s = %s + 1;" % (pos, pos) for pos in range(20)]
+        with concurrent.futures.ProcessPoolExecutor(2) as executor:
+            futures = [executor.submit(compressClass, "foo.Class%s" % pos, source, optimization=Optimization("blocks")) for pos, source in enumerate(sources)]
+            results = [future.result() for future in futures]
+
+        self.assertEqual(results, ["var x%s=%s;" % (pos, pos + 1) for pos in range(20)])
+
+    def test_store_parallel(self):
+        order = ["foo.Util", "foo.List", "foo.Main", "foo.Label"]
+
+        serial = self.createProject("serial")
+        serialFile = os.path.join(serial.getPath(), "out.js")
+        JavaScript.storeCompressed([serial.classes[classId] for classId in order], serialFile)
+
+        parallel = self.createProject("parallel")
+        classes = [parallel.classes[classId] for classId in order]
+        JavaScript.compressParallel(classes, optimization=jasy.env.State.jsOptimization, formatting=jasy.env.State.jsFormatting, workers=2)
+
+        # Results of the workers are stored in the project cache
+        compressed = [self.getCompressed(classObj) for classObj in classes]
+        self.assertFalse(None in compressed)
+
+        parallelFile = os.path.join(parallel.getPath(), "out.js")
+        JavaScript.storeCompressed(classes, parallelFile, workers=2)
+        with open(serialFile, "rb") as serialHandle, open(parallelFile, "rb") as parallelHandle:
+            output = parallelHandle.read()
+            self.assertEqual(output, serialHandle.read())
+
+        # Output follows the given order of classes
+        self.assertEqual(output.decode("utf-8"), "".join(compressed))
+
+    def test_parallel_fields(self):
+        project = self.createProject("fields")
+        cache = project.getCache()
+        main = project.classes["foo.Main"]
+        util = project.classes["foo.Util"]
+        permutation = Permutation({"debug" : False})
+
+        # Fields are not known yet: the permutation is filtered by the workers and the
+        # classes are not parsed in this process
+        JavaScript.compressParallel([main, util], permutation, None, jasy.env.State.jsOptimization, jasy.env.State.jsFormatting, workers=2)
+        self.assertEqual(cache.read("ast[foo.Main]"), None)
+        self.assertEqual(main.getFields(compute=False), {"debug"})
+        self.assertEqual(util.getFields(compute=False), set())
+
+        optimization = jasy.env.State.jsOptimization
+        self.assertEqual(self.getCompressed(main, permutation), compressClass("foo.Main", code, permutation=permutation, optimization=optimization))
+        self.assertEqual(self.getCompressed(util), compressClass("foo.Util", sources["foo.Util"], optimization=optimization))
+
+    def test_jobs(self):
+        submitted = []
+        original = concurrent.futures.ProcessPoolExecutor
+        class CountingExecutor(original):
+            def submit(self, func, *args, **kwargs):
+                submitted.append((args[0], len(args[3])))
+                return original.submit(self, func, *args, **kwargs)
+
+        concurrent.futures.ProcessPoolExecutor = CountingExecutor
+        self.addCleanup(setattr, concurrent.futures, "ProcessPoolExecutor", original)
+
+        project = self.createProject("jobs")
+        cache = project.getCache()
+        main = project.classes["foo.Main"]
+        util = project.classes["foo.Util"]
+        permutations = [Permutation({"debug" : True}), Permutation({"debug" : False})]
+        jobs = [(classObj, permutation) for permutation in permutations for classObj in (main, util)]
+
+        # Fields are not known yet: every class is sent to one worker with all of its 
+        # permutations and is neither parsed nor filtered in this process
+        JavaScript.compressJobs(jobs, None, jasy.env.State.jsOptimization, jasy.env.State.jsFormatting, workers=2)
+        self.assertEqual(sorted(submitted), [("foo.Main", 2), ("foo.Util", 2)])
+        self.assertEqual(cache.read("ast[foo.Main]"), None)
+        self.assertEqual(cache.read("ast[foo.Util]"), None)
+        self.assertEqual(main.getFields(compute=False), {"debug"})
+        self.assertEqual(util.getFields(compute=False), set())
+
+        for permutation in permutations:
+            self.assertNotEqual(self.getCompressed(util, permutation), None)
+            self.assertNotEqual(self.getCompressed(main, permutation), None)
+
+        self.assertEqual(self.getCompressed(util, permutations[0]), self.getCompressed(util, permutations[1]))
+        self.assertNotEqual(self.getCompressed(main, permutations[0]), self.getCompressed(main, permutations[1]))
+        self.assertFalse("console" in self.getCompressed(main, permutations[1]))
+
+        # With known fields, foo.Util filters both permutations to the same key and is sent only once
+        del submitted[:]
+        optimization = Optimization("blocks")
+        JavaScript.compressJobs(jobs, None, optimization, jasy.env.State.jsFormatting, workers=2)
+        self.assertEqual(sorted(submitted), [("foo.Main", 2), ("foo.Util", 1)])
+
+        for permutation in permutations:
+            self.assertEqual(util.getCompressed(permutation, None, optimization, jasy.env.State.jsFormatting, compute=False),
+                compressClass("foo.Util", sources["foo.Util"], optimization=optimization))
+            self.assertEqual(main.getCompressed(permutation, None, optimization, jasy.env.State.jsFormatting, compute=False),
+                compressClass("foo.Main", sources["foo.Main"], permutation=permutation, optimization=optimization))
+
+        # Nothing left to compress
+        del submitted[:]
+        JavaScript.compressJobs(jobs, None, optimization, jasy.env.State.jsFormatting, workers=2)
+        self.assertEqual(submitted, [])
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
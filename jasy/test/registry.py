@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+from jasy.js.ClassRegistry import ClassRegistry
+
+
+class FakeClass:
+    kind = "class"
+
+    def __init__(self, id):
+        self.id = id
+
+    def getId(self):
+        return self.id
+
+
+class FakeProject:
+    def __init__(self, *names):
+        self.classes = dict((name, FakeClass(name)) for name in names)
+
+    def getClasses(self):
+        return self.classes
+
+
+class Tests(unittest.TestCase):
+
+    def test_lookup(self):
+        project = FakeProject("foo.Bar", "foo.Bar.Baz", "core.Main")
+        registry = ClassRegistry([project])
+
+        self.assertEqual(len(registry), 3)
+        self.assertTrue("foo.Bar" in registry)
+        self.assertFalse("foo" in registry)
+        self.assertTrue(registry["core.Main"] is project.classes["core.Main"])
+        self.assertEqual(registry.get("foo"), None)
+
+    def test_prefix(self):
+        registry = ClassRegistry([FakeProject("foo.Bar", "foo.Bar.Baz", "Global")])
+
+        self.assertEqual(registry.findClass("foo.Bar").getId(), "foo.Bar")
+        self.assertEqual(registry.findClass("foo.Bar.create").getId(), "foo.Bar")
+        self.assertEqual(registry.findClass("foo.Bar.Baz.x.y").getId(), "foo.Bar.Baz")
+        self.assertEqual(registry.findClass("Global.x").getId(), "Global")
+        self.assertEqual(registry.findClass("foo.Qux.x"), None)
+        self.assertEqual(registry.findClass("foo"), None)
+        self.assertEqual(registry.findClass("foo.Ba"), None)
+
+    def test_override(self):
+        first = FakeProject("foo.Bar", "foo.Baz")
+        second = FakeProject("foo.Bar")
+        registry = ClassRegistry([first, second])
+
+        self.assertTrue(registry["foo.Bar"] is second.classes["foo.Bar"])
+        self.assertTrue(registry.findClass("foo.Bar.x") is second.classes["foo.Bar"])
+        self.assertTrue(registry.findClass("foo.Baz.x") is first.classes["foo.Baz"])
+
+    def test_checksum(self):
+        self.assertEqual(ClassRegistry([FakeProject("a.B", "c.D")]).getChecksum(), ClassRegistry([FakeProject("c.D"), FakeProject("a.B")]).getChecksum())
+        self.assertNotEqual(ClassRegistry([FakeProject("a.B", "c.D")]).getChecksum(), ClassRegistry([FakeProject("a.B")]).getChecksum())
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
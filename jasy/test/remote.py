@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, tempfile, socket
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import cherrypy
+
+import jasy.env.State
+from jasy.core.Cache import Cache
+from jasy.core.CacheRemote import RemoteCache, getAddress
+from jasy.server.Web import Blobs
+
+
+def findPort():
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return port
+
+
+class Tests(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        cls.port = findPort()
+
+        cherrypy.config.update({
+            "environment" : "embedded",
+            "log.screen" : False,
+            "server.socket_port" : cls.port,
+            "server.socket_host" : "127.0.0.1"
+        })
+
+        cherrypy.tree.mount(Blobs("cache", {"blobs" : os.path.join(cls.directory.name, "blobs")}), "/cache")
+        cherrypy.engine.start()
+        cherrypy.server.wait()
+
+    @classmethod
+    def tearDownClass(cls):
+        cherrypy.engine.exit()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.url = "http://127.0.0.1:%s/cache/" % self.port
+
+    def open(self, filename, url=None):
+        cache = Cache(self.directory.name, filename=filename, remote=url or self.url)
+        self.addCleanup(cache.close)
+        return cache
+
+
+    def test_put_get(self):
+        remote = RemoteCache(self.url)
+        self.assertTrue(remote.put("compressed[foo]-abc", b"foo();"))
+        self.assertEqual(remote.get("compressed[foo]-abc"), b"foo();")
+        self.assertEqual(remote.get("compressed[foo]-def"), None)
+        self.assertTrue(remote.isEnabled())
+
+    def test_address(self):
+        self.assertEqual(getAddress("foo"), "0beec7b5ea3f0fdbc95d0dd47f3c5bc275da8a33")
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, "blobs")))
+
+    def test_shared(self):
+        first = self.open("first")
+        self.assertTrue(first.hasRemote())
+        first.storeRemote("compressed[bar]-abc", "bar();")
+
+        second = self.open("second")
+        self.assertEqual(second.readRemote("compressed[bar]-abc"), "bar();")
+        self.assertEqual(second.readRemote("compressed[bar]-def"), None)
+
+        statistics = second.getStatistics()
+        self.assertEqual(statistics["remote"]["hits"], 1)
+        self.assertEqual(statistics["remote"]["misses"], 1)
+
+    def test_unreachable(self):
+        cache = self.open("unreachable", "http://127.0.0.1:%s/cache/" % findPort())
+        self.assertTrue(cache.hasRemote())
+        self.assertEqual(cache.readRemote("compressed[foo]-abc"), None)
+        self.assertFalse(cache.hasRemote())
+
+    def test_disabled(self):
+        cache = Cache(self.directory.name, filename="disabled")
+        self.addCleanup(cache.close)
+        self.assertFalse(cache.hasRemote())
+        self.assertEqual(cache.readRemote("compressed[foo]-abc"), None)
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
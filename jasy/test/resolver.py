@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, tempfile
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.env.State
+import jasy.core.Cache
+import jasy.js.Resolver
+
+from jasy.core.Cache import Cache, getFamily
+from jasy.js.ClassRegistry import ClassRegistry
+from jasy.js.Resolver import Resolver
+
+
+class Meta:
+    def __init__(self, breaks):
+        self.breaks = set(breaks)
+
+
+class FakeClass:
+    kind = "class"
+
+    def __init__(self, id, deps, stamp=1, breaks=()):
+        self.id = id
+        self.deps = deps
+        self.breaks = breaks
+        self.stamp = stamp
+        self.resolved = 0
+
+    def getId(self):
+        return self.id
+
+    def getStamp(self):
+        return self.stamp
+
+    def getDependencies(self, permutation=None, classes=None, warnings=True, fast=False):
+        self.resolved += 1
+        return set(classes[name] for name in self.deps if name in classes)
+
+    def getMetaData(self, permutation=None):
+        self.resolved += 1
+        return Meta(self.breaks)
+
+    def __repr__(self):
+        return self.id
+
+
+class FakeProject:
+    def __init__(self, graph, cache):
+        self.classes = dict((name, FakeClass(name, graph[name])) for name in graph)
+        self.cache = cache
+
+    def getClasses(self):
+        return self.classes
+
+    def getCache(self):
+        return self.cache
+
+
+class FakeSession:
+    def __init__(self, project):
+        self.project = project
+
+    def getMain(self):
+        return self.project
+
+    def getClassRegistry(self):
+        return ClassRegistry([self.project])
+
+
+graph = {"a" : ["b", "c"], "b" : ["d"], "c" : ["d"], "d" : []}
+
+
+class Tests(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+        original = jasy.js.Resolver.session
+        self.addCleanup(setattr, jasy.js.Resolver, "session", original)
+
+    def open(self, graph):
+        cache = Cache(self.directory.name)
+        self.addCleanup(cache.close)
+
+        project = FakeProject(graph, cache)
+        jasy.js.Resolver.session = FakeSession(project)
+        return project
+
+    def resolve(self, project):
+        included = Resolver().addClassName("a").getIncludedClasses()
+        project.cache.close()
+
+        return sorted([classObj.getId() for classObj in included])
+
+    def sort(self, project):
+        sorted = Resolver().addClassName("a").getSortedClasses()
+        project.cache.close()
+
+        return [classObj.getId() for classObj in sorted]
+
+    def resolved(self, project):
+        return sorted([name for name in project.classes if project.classes[name].resolved])
+
+    def test_roundtrip(self):
+        project = self.open(graph)
+        self.assertEqual(self.resolve(project), ["a", "b", "c", "d"])
+        self.assertEqual(self.resolved(project), ["a", "b", "c", "d"])
+
+        project = self.open(graph)
+        self.assertEqual(self.resolve(project), ["a", "b", "c", "d"])
+        self.assertEqual(self.resolved(project), [])
+
+    def test_stamp(self):
+        self.resolve(self.open(graph))
+
+        project = self.open(graph)
+        project.classes["c"].stamp = 2
+        project.classes["c"].deps = []
+        self.assertEqual(self.resolve(project), ["a", "b", "c", "d"])
+        self.assertEqual(self.resolved(project), ["c"])
+
+        project = self.open(graph)
+        project.classes["b"].stamp = 2
+        project.classes["b"].deps = []
+        project.classes["c"].stamp = 2
+        project.classes["c"].deps = []
+        self.assertEqual(self.resolve(project), ["a", "b", "c"])
+        self.assertEqual(self.resolved(project), ["b"])
+
+    def test_sorted(self):
+        # The break resolves the circular dependency between "b" and "d"
+        project = self.open(graph)
+        project.classes["d"].breaks = ("b",)
+        project.classes["d"].deps = ["b"]
+        self.assertEqual(self.sort(project), ["d", "b", "c", "a"])
+
+        # Sorting uses the persisted graph (including breaks) instead of querying the classes again
+        project = self.open(graph)
+        self.assertEqual(self.sort(project), ["d", "b", "c", "a"])
+        self.assertEqual(self.resolved(project), [])
+
+        project = self.open(graph)
+        project.classes["c"].stamp = 2
+        project.classes["c"].deps = []
+        self.assertEqual(self.sort(project), ["c", "d", "b", "a"])
+        self.assertEqual(self.resolved(project), ["c"])
+
+    def test_checksum(self):
+        self.resolve(self.open(graph))
+
+        extended = dict(graph)
+        extended["e"] = []
+        project = self.open(extended)
+        self.assertEqual(self.resolve(project), ["a", "b", "c", "d"])
+        self.assertEqual(self.resolved(project), ["a", "b", "c", "d"])
+
+    def test_schema(self):
+        self.assertEqual(getFamily("dependencies-fast"), "dependencies")
+        self.assertEqual(getFamily("dependencies-none"), "dependencies")
+        self.resolve(self.open(graph))
+
+        jasy.core.Cache.schemaVersions["dependencies"] += 1
+        try:
+            project = self.open(graph)
+            self.resolve(project)
+            self.assertEqual(self.resolved(project), ["a", "b", "c", "d"])
+        finally:
+            jasy.core.Cache.schemaVersions["dependencies"] -= 1
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.js.parse.Parser as Parser
+import jasy.js.parse.ScopeScanner as ScopeScanner
+import jasy.js.tokenize.DependencyScanner as DependencyScanner
+
+from jasy.js.MetaData import MetaData
+
+
+class Tests(unittest.TestCase):
+
+    def process(self, code):
+        return DependencyScanner.scan(code)
+
+    def test_tags(self):
+        data = self.process('''
+        /**
+         * #require(foo.Bar)
+         * #optional(foo.Optional) #asset(foo/*)
+         * #load(foo.Later)
+         * #break(foo.Circular)
+         */
+        /* #require(foo.Ignored) */
+        // #require(foo.Ignored2)
+        ''')
+        self.assertEqual(data.requires, {"foo.Bar", "foo.Later"})
+        self.assertEqual(data.optionals, {"foo.Optional"})
+        self.assertEqual(data.breaks, {"foo.Later", "foo.Circular"})
+        self.assertEqual(data.assets, {"foo/*"})
+
+    def test_packages(self):
+        data = self.process('core.Class("foo.Main", { construct : function() { foo.Bar.create(this.x, foo . Baz); } });')
+        self.assertEqual(set(data.packages), {"core.Class", "foo.Bar.create", "foo.Baz"})
+        self.assertEqual(set(data.shared), {"core", "foo"})
+
+    def test_properties(self):
+        data = self.process('var x = foo().bar.baz; x[0].qux.Foo(); this.foo.Bar();')
+        self.assertEqual(set(data.packages), set())
+        self.assertEqual(set(data.shared), {"x", "foo"})
+
+    def test_object_keys(self):
+        data = self.process('var x = { foo : 1, bar : baz ? qux : 2 }; switch(x) { case Bar: break; }')
+        self.assertEqual(set(data.shared), {"x", "baz", "qux", "Bar"})
+
+    def test_literals(self):
+        data = self.process('''
+        var a = "foo.Bar", b = 'x.Y \\' z.W', c = /foo.Bar\\/[a-z/]+/g.test(d);
+        var e = f / g / h;
+        return /a.B/.exec(i);
+        ''')
+        self.assertEqual(set(data.packages), set())
+        self.assertEqual(set(data.shared), {"a", "b", "c", "d", "e", "f", "g", "h", "i"})
+
+    def test_superset(self):
+        code = '''
+        /** #require(foo.Bar) #asset(foo/*) */
+        core.Class("foo.Main", {
+          members : {
+            add : function(a, b) {
+              if (core.Env.isSet("debug")) { foo.Debug.log(a); }
+              return foo.Util.add(a, b, bar.Obj.value);
+            }
+          }
+        });
+        '''
+
+        tree = Parser.parse(code)
+        ScopeScanner.scan(tree)
+        meta = MetaData(tree)
+
+        data = self.process(code)
+        self.assertEqual(data.requires, meta.requires)
+        self.assertEqual(data.assets, meta.assets)
+        self.assertTrue(set(tree.scope.shared).issubset(set(data.shared)))
+        self.assertTrue(set(tree.scope.packages).issubset(set(data.packages)))
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
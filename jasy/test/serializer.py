@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources, pickle
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+import jasy.js.parse.Parser as Parser
+import jasy.js.parse.ScopeScanner as ScopeScanner
+import jasy.js.parse.Serializer as Serializer
+import jasy.js.parse.SourceStore as SourceStore
+from jasy.js.parse.Node import Node
+import jasy.js.output.Compressor as Compressor
+import jasy.js.optimize.BlockReducer as BlockReducer
+import jasy.js.optimize.CombineDeclarations as CombineDeclarations
+import jasy.js.optimize.LocalVariables as LocalVariables
+import jasy.js.clean.Unused as Unused
+
+from jasy.js.MetaData import MetaData
+
+
+code = '''
+/**
+ * Some class
+ *
+ * #require(foo.Bar)
+ * #asset(foo/*)
+ */
+core.Class("foo.Main", {
+  members : {
+    /** {Number} Adds @a {Number} and @b {Number} */
+    add : function(a, b) {
+      var unused = 3;
+      var result = a + b;
+      if (result > 10) { return 10; } else { return result; }
+    },
+
+    // Single line comment
+    list : [1, , 2],
+    pattern : /[a-z]+/gi,
+    flag : !true
+  }
+});
+'''
+
+
+class Tests(unittest.TestCase):
+
+    def roundtrip(self, code):
+        tree = Parser.parse(code, "foo.Main")
+        ScopeScanner.scan(tree)
+        return tree, Serializer.load(Serializer.dump(tree))
+
+    def test_compressed(self):
+        tree, restored = self.roundtrip(code)
+        self.assertEqual(Compressor.Compressor().compress(restored), Compressor.Compressor().compress(tree))
+
+    def test_structure(self):
+        tree, restored = self.roundtrip(code)
+        self.assertEqual(restored.fileId, "foo.Main")
+        self.assertEqual(restored.sourceId, None)
+
+        call = restored[0].expression
+        self.assertEqual(call.type, "call")
+        self.assertTrue(call.parent is restored[0])
+        self.assertEqual(call.rel, "expression")
+        self.assertEqual(call.line, tree[0].expression.line)
+        self.assertEqual(call.start, tree[0].expression.start)
+        self.assertEqual(call.end, tree[0].expression.end)
+
+    def test_scope(self):
+        tree, restored = self.roundtrip(code)
+        self.assertEqual(restored.scope.export(), tree.scope.export())
+        self.assertEqual(restored.scope.shared, {"core" : 1})
+
+    def test_comments(self):
+        tree, restored = self.roundtrip(code)
+        comment = restored[0].comments[0]
+        self.assertEqual(comment.variant, "doc")
+        self.assertEqual(comment.text, tree[0].comments[0].text)
+
+        self.assertEqual(MetaData(restored).requires, MetaData(tree).requires)
+        self.assertEqual(MetaData(restored).assets, {"foo/*"})
+
+    def test_optimize(self):
+        tree, restored = self.roundtrip(code)
+        for node in (tree, restored):
+            Unused.cleanup(node)
+            CombineDeclarations.optimize(node)
+            BlockReducer.optimize(node)
+            ScopeScanner.scan(node)
+            LocalVariables.optimize(node)
+
+        self.assertEqual(Compressor.Compressor().compress(restored), Compressor.Compressor().compress(tree))
+
+    def test_nested(self):
+        tree = current = Node(type="script")
+        for pos in range(5000):
+            child = Node(type="array_init")
+            current.append(child)
+            current = child
+
+        current = Serializer.load(Serializer.dump(tree))
+        depth = 0
+        while len(current) > 0:
+            current = current[0]
+            depth += 1
+
+        self.assertEqual(depth, 5000)
+
+    def test_clone(self):
+        tree = Parser.parse(code, "foo.Main")
+        ScopeScanner.scan(tree)
+        original = Compressor.Compressor().compress(tree)
+
+        copied = tree.clone()
+        call = copied[0].expression
+        self.assertTrue(call.parent is copied[0])
+        self.assertTrue(copied[0].expression is call)
+        self.assertFalse(call is tree[0].expression)
+        self.assertEqual(copied[0].comments[0].text, tree[0].comments[0].text)
+
+        Unused.cleanup(copied)
+        BlockReducer.optimize(copied)
+        self.assertNotEqual(Compressor.Compressor().compress(copied), original)
+        self.assertEqual(Compressor.Compressor().compress(tree), original)
+
+    def test_clone_nested(self):
+        tree = current = Node(type="script")
+        for pos in range(5000):
+            child = Node(type="array_init")
+            current.append(child)
+            current = child
+
+        self.assertEqual(len(tree.clone()), 1)
+
+    def test_source(self):
+        tree = Parser.parse(code, "foo.Main")
+        call = tree[0].expression
+        self.assertEqual(call[0].getSource(), "core.Class")
+        self.assertEqual(SourceStore.getFileId(call.sourceId), "foo.Main")
+        self.assertEqual(tree.clone()[0].expression[0].getSource(), "core.Class")
+        self.assertEqual(Parser.parse(code, "foo.Main").sourceId, tree.sourceId)
+        self.assertNotEqual(Parser.parse(code, "foo.Other").sourceId, tree.sourceId)
+
+    def test_pickle(self):
+        tree = Parser.parse(code, "foo.Main")
+        data = pickle.dumps(tree)
+        self.assertFalse(b"Tokenizer" in data)
+
+        restored = pickle.loads(data)
+        self.assertEqual(restored[0].expression[0].getSource(), "core.Class")
+        self.assertEqual(Compressor.Compressor().compress(restored), Compressor.Compressor().compress(tree))
+
+    def test_attributes(self):
+        tree = Parser.parse(code, "foo.Main")
+        self.assertEqual(Serializer.load(Serializer.dump(tree)).toXml(), tree.toXml())
+        self.assertEqual(tree.clone().toXml(), tree.toXml())
+
+        ifNode = [node for node in self.walk(tree) if node.type == "if"][0]
+        self.assertEqual(ifNode.condition.rel, "condition")
+
+        replacement = Node(type="block")
+        ifNode.replace(ifNode.thenPart, replacement)
+        self.assertTrue(ifNode.thenPart is replacement)
+        self.assertEqual(replacement.rel, "thenPart")
+
+        ifNode.remove(ifNode.elsePart)
+        self.assertFalse(hasattr(ifNode, "elsePart"))
+        self.assertFalse(hasattr(ifNode, "body"))
+
+    def test_known_attributes(self):
+        statements = '''
+        (function(obj, list, x, i) {
+          outer: for (var key in obj) {
+            for each (var value in list) { if (!value) continue outer; else break; }
+          }
+          do { i--; } while (i > 0);
+          switch (x) { case 1: y = x++; break; default: y = -x; }
+          try { foo(); } catch (ex if ex instanceof Error) { bar(); } catch (ex) { baz(); } finally { done(); }
+          var getter = { get size() { return 1; }, set size(value) {} };
+          var square = function(x) x * x;
+          const limit = (1 + 2) * 3;
+          with (obj) { test(); }
+        })();
+        '''
+
+        for source in (code, statements):
+            tree = Parser.parse(source, "foo.Main")
+            ScopeScanner.scan(tree)
+            Unused.cleanup(tree)
+            CombineDeclarations.optimize(tree)
+            BlockReducer.optimize(tree)
+            ScopeScanner.scan(tree)
+            LocalVariables.optimize(tree)
+
+            # Rare attributes are stored in the instance dict which would accept any name
+            for node in self.walk(tree):
+                self.assertEqual(set(vars(node)) - set(Node.attributes), set())
+
+    def walk(self, tree):
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend([child for child in node if child is not None])
+
+    def test_invalid(self):
+        data = Serializer.dump(Parser.parse("x = 1;"))
+        self.assertRaises(Serializer.SerializerError, Serializer.load, b"JSAST\x00" + data[6:])
+        self.assertRaises(Serializer.SerializerError, Serializer.load, data[:-4])
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+from jasy.js.Sorter import Sorter, CircularDependency
+
+
+class Meta:
+    def __init__(self, breaks):
+        self.breaks = set(breaks)
+
+
+class FakeClass:
+    def __init__(self, id, deps, breaks=()):
+        self.id = id
+        self.deps = deps
+        self.meta = Meta(breaks)
+
+    def getId(self):
+        return self.id
+
+    def getDependencies(self, permutation=None, classes=None, warnings=True, fast=False):
+        return set(classes[name] for name in self.deps if name in classes)
+
+    def getMetaData(self, permutation=None):
+        return self.meta
+
+    def __repr__(self):
+        return self.id
+
+
+class FakeResolver:
+    def __init__(self, classes, required):
+        self.classes = classes
+        self.required = [classes[name] for name in required]
+
+    def getIncludedClasses(self):
+        return set(self.classes.values())
+
+    def getRequiredClasses(self):
+        return self.required
+
+    def getDependencies(self, classObj):
+        return classObj.getDependencies(classes=self.classes), classObj.getMetaData().breaks
+
+
+def createResolver(graph, required, breaks={}):
+    classes = {}
+    for name in graph:
+        classes[name] = FakeClass(name, graph[name], breaks.get(name, ()))
+
+    return FakeResolver(classes, required)
+
+
+def sort(graph, required, breaks={}):
+    return [classObj.getId() for classObj in Sorter(createResolver(graph, required, breaks)).getSortedClasses()]
+
+
+class Tests(unittest.TestCase):
+
+    def assertBefore(self, result, first, second):
+        self.assertTrue(result.index(first) < result.index(second), "%s should be before %s in %s" % (first, second, result))
+
+    def test_simple(self):
+        self.assertEqual(sort({"a" : ["b"], "b" : ["c"], "c" : []}, ["a"]), ["c", "b", "a"])
+
+    def test_diamond(self):
+        result = sort({"a" : ["b", "c"], "b" : ["d"], "c" : ["d"], "d" : []}, ["a"])
+        self.assertEqual(result, ["d", "b", "c", "a"])
+
+    def test_simple_first(self):
+        result = sort({"a" : ["b", "c"], "b" : ["x", "y"], "x" : ["y"], "y" : [], "c" : []}, ["a"])
+        self.assertEqual(result, ["c", "y", "x", "b", "a"])
+
+    def test_break(self):
+        graph = {"a" : ["b"], "b" : ["a"]}
+        result = sort(graph, ["a"], {"b" : ["a"]})
+        self.assertEqual(result, ["b", "a"])
+
+        result = sort(graph, ["b"], {"b" : ["a"]})
+        self.assertEqual(result, ["b", "a"])
+
+    def test_break_asap(self):
+        graph = {"main" : ["a", "z"], "a" : ["b"], "b" : [], "z" : [], "c" : ["a"]}
+        result = sort(graph, ["main"], {"a" : ["c"]})
+        self.assertEqual(result, ["z", "b", "a", "c", "main"])
+
+    def test_circular(self):
+        graph = {"a" : ["b"], "b" : ["c"], "c" : ["a"], "x" : ["y"], "y" : ["x"], "z" : ["z"]}
+        try:
+            sort(graph, ["a", "x", "z"])
+        except CircularDependency as ex:
+            message = str(ex)
+        else:
+            self.fail("Expected circular dependency error")
+
+        self.assertTrue("a >> b >> c >> a" in message)
+        self.assertTrue("x >> y >> x" in message)
+        self.assertFalse("z >>" in message)
+
+    def test_deep(self):
+        graph = dict(("c%s" % pos, ["c%s" % (pos + 1)]) for pos in range(5000))
+        graph["c5000"] = []
+        result = sort(graph, ["c0"])
+        self.assertEqual(len(result), 5001)
+        self.assertEqual(result[0], "c5000")
+        self.assertEqual(result[-1], "c0")
+
+    def test_order(self):
+        graph = {}
+        for pos in range(50):
+            graph["c%s" % pos] = ["c%s" % dep for dep in range(pos) if (pos * dep) % 7 == 1]
+
+        result = sort(graph, ["c%s" % pos for pos in range(50)])
+        self.assertEqual(len(result), 50)
+        for name in graph:
+            for dep in graph[name]:
+                self.assertBefore(result, dep, name)
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
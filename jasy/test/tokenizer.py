@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import sys, os, unittest, logging, pkg_resources
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+from jasy.js.tokenize.Tokenizer import Tokenizer, ParseError
+from jasy.js.tokenize.CharTokenizer import CharTokenizer
+
+
+# A slash after these tokens is a division, otherwise it starts a regular expression
+divisionAfter = set(["identifier", "number", "string", "regexp", "right_paren", "right_bracket", "right_curly", "this"])
+
+
+def tokenize(tokenizerClass, code):
+    tokenizer = tokenizerClass(code, "test")
+    result = []
+    last = None
+
+    while last != "end":
+        last = tokenizer.get(not last in divisionAfter)
+        token = tokenizer.token
+        comments = [(comment.text, comment.variant, comment.context) for comment in tokenizer.getComments() or []]
+        result.append((last, token.start, token.end, token.line, getattr(token, "value", None), getattr(token, "assignOp", None), comments))
+
+    return result
+
+
+class Tests(unittest.TestCase):
+
+    def process(self, code):
+        result = tokenize(Tokenizer, code)
+        self.assertEqual(result, tokenize(CharTokenizer, code))
+        return result
+
+    def values(self, code):
+        return [(token[0], token[4]) for token in self.process(code)[:-1]]
+
+    def test_identifiers(self):
+        self.assertEqual(self.values("var foo$ = _bar1;\n"), [("var", None), ("identifier", "foo$"), ("assign", None), ("identifier", "_bar1"), ("semicolon", None)])
+
+    def test_numbers(self):
+        self.assertEqual(self.values("12 1.5 1. .5 2e3 1.5E-2 0 0.25 0x1F 017 0e1 08\n"), [
+            ("number", 12), ("number", "1.5"), ("number", "1."), ("number", ".5"), ("number", "2e3"), ("number", "1.5E-2"), ("number", 0),
+            ("number", "0.25"), ("number", "0x1F"), ("number", "017"), ("number", 0), ("number", 0), ("number", 8)
+        ])
+
+    def test_operators(self):
+        tokens = self.process("a >>>= b >> c === d !== e <= f && g; h &= i; j <<= k++ - --l / m;\n")
+        self.assertEqual([token[0] for token in tokens], ["identifier", "assign", "identifier", "rsh", "identifier", "strict_eq", "identifier", "strict_ne", "identifier", "le",
+            "identifier", "and", "identifier", "semicolon", "identifier", "assign", "identifier", "semicolon", "identifier", "assign", "identifier",
+            "increment", "minus", "decrement", "identifier", "div", "identifier", "semicolon", "end"])
+        self.assertEqual([token[5] for token in tokens if token[0] == "assign"], ["ursh", "bitwise_and", "lsh"])
+
+    def test_strings(self):
+        self.assertEqual(self.values("'a' + \"b\\\"c\" + 'd\\n';\n"), [("string", "a"), ("plus", None), ("string", 'b"c'), ("plus", None), ("string", "d\n"), ("semicolon", None)])
+
+    def test_regexp(self):
+        self.assertEqual(self.values("x = /[/\\]]+\\//gi.test(y) / 2;\n"), [("identifier", "x"), ("assign", None), ("regexp", "/[/\\]]+\\//gi"), ("dot", None),
+            ("identifier", "test"), ("left_paren", None), ("identifier", "y"), ("right_paren", None), ("div", None), ("number", 2), ("semicolon", None)])
+
+    def test_comments(self):
+        tokens = self.process("/** Doc */\nvar a; // Inline\n\n\n/* Section */\nb;\n")
+        self.assertEqual([comment for token in tokens for comment in token[6]], [("Doc", "doc", "block"), ("Inline", "single", "inline"), ("Section", "multi", "section")])
+        self.assertEqual([token[3] for token in tokens], [2, 2, 2, 6, 6, 7])
+
+    def test_comment_indent(self):
+        tokens = self.process("if (a) {\n    /**\n     * First\n     *\n     *   Indented\n     */\n  \t  b(); /* Multi\n       line */ // End\n}")
+        self.assertEqual([comment for token in tokens for comment in token[6]], [
+            ("First\n\n  Indented", "doc", "block"), ("   Multi\n      line", "multi", "inline"), ("End", "single", "block")
+        ])
+
+    def test_license(self):
+        code = "/*\n * License\n *\n * Text\n */\n\n\n\n\n/** Doc */\nfoo.Bar = 1;"
+        tokens = self.process(code)
+        self.assertEqual([token[6] for token in tokens][0], [("License\n\nText", "multi", "block"), ("Doc", "doc", "section")])
+        self.assertEqual(tokens[0][3], 11)
+
+    def test_newlines(self):
+        code = "a  // Comment\n b\n\n\t/* Multi\nline */ c"
+        results = []
+        for tokenizerClass in (CharTokenizer, Tokenizer):
+            tokenizer = tokenizerClass(code, "test")
+            tokenizer.scanNewlines = True
+            result = []
+            while not result or result[-1][0] != "end":
+                tokenType = tokenizer.get()
+                result.append((tokenType, tokenizer.token.line, len(tokenizer.getComments() or [])))
+
+            results.append(result)
+
+        self.assertEqual(results[0], results[1])
+        self.assertEqual(results[1], [("identifier", 1, 0), ("identifier", 2, 1), ("newline", 2, 0), ("newline", 3, 0), ("identifier", 5, 1), ("end", 5, 0)])
+
+    def test_unterminated_comment(self):
+        self.assertRaises(ParseError, tokenize, Tokenizer, "a; /* Comment")
+        self.assertRaises(ParseError, tokenize, Tokenizer, "a; /* Comment *")
+
+    def test_errors(self):
+        for code in ("x = 1e;", "x = #;", "x = /abc", "x = 'abc"):
+            self.assertRaises(ParseError, tokenize, Tokenizer, code)
+
+
+
+if __name__ == '__main__':
+    logging.getLogger().setLevel(logging.ERROR)
+    suite = unittest.TestLoader().loadTestsFromTestCase(Tests)
+    unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+#
+# Compares the memory used by syntax trees in the compact node layout (Node, rare
+# attributes in the instance dict) with a layout which has a slot for every known
+# attribute on every node (like Node did before).
+#
+# Usage: benchmark-memory.py [file.js ...]
+#
+# Without files a generated class source is used.
+#
+
+import sys, os, gc, tracemalloc
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+from jasy.js.parse.Node import Node
+from jasy.js.parse.Parser import parse
+import jasy.js.parse.ScopeScanner as ScopeScanner
+
+
+class FixedNode(Node):
+    """Node with a slot for every known attribute"""
+
+    __slots__ = [name for name in Node.attributes if not name in Node.__slots__]
+
+
+sample = '''
+/**
+ * Manages a list of entries and offers formatting helpers.
+ *
+ * #require(core.Main)
+ */
+core.Class("foo.data.EntryList%(id)s", {
+  include : [foo.data.MEvents],
+
+  /**
+   * @param entries {Array} Initial list of entries
+   */
+  construct : function(entries, options) {
+    this.__entries = entries || [];
+    this.__options = options || { limit : 100, separator : ", ", ratio : 0.75 };
+  },
+
+  members : {
+    /**
+     * Returns the formatted entries
+     */
+    format : function(prefix) {
+      var result = [];
+      for (var i = 0, l = this.__entries.length; i < l && i < this.__options.limit; i++) {
+        var entry = this.__entries[i];
+        if (typeof entry === "string" && /^\\s*[a-z]+$/i.test(entry)) {
+          result.push(prefix + entry.replace(/\\s+/g, ""));
+        } else if (entry != null) {
+          try {
+            result.push(String(entry * 2.5 >>> 0));
+          } catch (ex) {
+            return null;
+          }
+        }
+      }
+
+      return result.join(this.__options.separator);
+    }
+  }
+});
+'''
+
+
+def copyTree(tree, nodeClass):
+    """Copies the given tree using the given node class. Attribute values are shared with the original."""
+
+    result = nodeClass.__new__(nodeClass)
+    stack = [(tree, result)]
+    names = Node.attributes
+
+    while stack:
+        node, copied = stack.pop()
+
+        for name in names:
+            value = getattr(node, name, names)
+            if value is not names and not isinstance(value, Node):
+                setattr(copied, name, value)
+
+        for child in node:
+            if child is None:
+                list.append(copied, None)
+                continue
+
+            childCopy = nodeClass.__new__(nodeClass)
+            childCopy.parent = copied
+            list.append(copied, childCopy)
+
+            rel = getattr(child, "rel", None)
+            if rel is not None:
+                setattr(copied, rel, childCopy)
+
+            stack.append((child, childCopy))
+
+    return result
+
+
+def countNodes(tree):
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend([child for child in node if child is not None])
+
+    return count
+
+
+def measure(trees, nodeClass):
+    """Returns the number of bytes allocated for copies of the given trees using the given node class"""
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copies = [copyTree(tree, nodeClass) for tree in trees]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    return size
+
+
+if len(sys.argv) > 1:
+    texts = [(fileName, open(fileName, encoding="utf-8").read()) for fileName in sys.argv[1:]]
+else:
+    texts = [("<generated>", "".join([sample % {"id" : pos} for pos in range(200)]))]
+
+trees = []
+for name, text in texts:
+    tree = parse(text, name)
+    ScopeScanner.scan(tree)
+    trees.append(tree)
+
+nodes = sum([countNodes(tree) for tree in trees])
+print("%s files, %s nodes" % (len(trees), nodes))
+
+results = {}
+for nodeClass in (FixedNode, Node):
+    results[nodeClass] = measure(trees, nodeClass)
+    print("  %-10s %10.1fKB %8.1f bytes/node" % (nodeClass.__name__, results[nodeClass] / 1024, results[nodeClass] / nodes))
+
+print("  Saved: %.1f%%" % (100 - 100.0 * results[Node] / results[FixedNode]))
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+#
+# Jasy - Web Tooling Framework
+# Copyright 2010-2012 Zynga Inc.
+#
+
+#
+# Compares the tokens per second of the compiled token expression (Tokenizer)
+# with the character based reference lexer (see jasy/js/tokenize/CharTokenizer.py).
+#
+# Usage: benchmark-tokenizer.py [file.js ...]
+#
+# Without files a generated class source is used.
+#
+
+import sys, os, time, gc
+
+# Extend PYTHONPATH with local 'lib' folder
+jasyroot = os.path.normpath(os.path.join(os.path.abspath(sys.argv[0]), os.pardir, os.pardir))
+sys.path.insert(0, jasyroot)
+
+from jasy.js.tokenize.Tokenizer import Tokenizer
+from jasy.js.tokenize.CharTokenizer import CharTokenizer
+
+
+sample = '''
+/*
+==================================================================================================
+  Example Project
+  Copyright 2012 Example Inc.
+
+  Licensed under the Apache License, Version 2.0 (the "License"); you may not use this file except
+  in compliance with the License. You may obtain a copy of the License at
+
+    http://www.apache.org/licenses/LICENSE-2.0
+
+  Unless required by applicable law or agreed to in writing, software distributed under the 
+  License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either 
+  express or implied. See the License for the specific language governing permissions and 
+  limitations under the License.
+==================================================================================================
+*/
+
+/**
+ * Manages a list of entries and offers formatting helpers.
+ *
+ * #require(core.Main)
+ * #asset(foo/icons/*)
+ */
+core.Class("foo.data.EntryList%(id)s", {
+  include : [foo.data.MEvents],
+
+  /**
+   * @param entries {Array} Initial list of entries
+   */
+  construct : function(entries, options) {
+    this.__entries = entries || [];
+    this.__options = options || { limit : 100, separator : ", ", ratio : 0.75, mask : 0xFF };
+  },
+
+  members : {
+    // Cached lookup table
+    __lookup : null,
+
+    /**
+     * Returns the formatted entries
+     */
+    format : function(prefix) {
+      var result = [];
+      for (var i = 0, l = this.__entries.length; i < l && i < this.__options.limit; i++) {
+        var entry = this.__entries[i];
+        if (typeof entry === "string" && /^\\s*[a-z][\\w\\-]*$/i.test(entry)) {
+          result.push(prefix + entry.replace(/\\s+/g, "") + '\\'');
+        } else if (entry != null) {
+          result.push(String(entry * 2.5e3 >>> 0));
+        }
+      }
+
+      return result.join(this.__options.separator);
+    }
+  }
+});
+'''
+
+# A slash after these tokens is a division, otherwise it starts a regular expression
+divisionAfter = set(["identifier", "number", "string", "regexp", "right_paren", "right_bracket", "right_curly", "this", "true", "false", "null"])
+
+
+def tokenize(tokenizerClass, text):
+    """Returns a list of all tokens of the given text"""
+
+    tokenizer = tokenizerClass(text, "benchmark")
+    result = []
+    last = None
+
+    while last != "end":
+        last = tokenizer.get(not last in divisionAfter)
+        token = tokenizer.token
+        result.append((last, token.start, token.end, token.line, getattr(token, "value", None), getattr(token, "assignOp", None)))
+        tokenizer.getComments()
+
+    return result
+
+
+def measure(tokenizerClasses, text, rounds):
+    """Returns the best time of each tokenizer class. Rounds of all classes are interleaved to reduce noise."""
+
+    best = {}
+    for pos in range(rounds):
+        for tokenizerClass in tokenizerClasses:
+            gc.collect()
+            start = time.perf_counter()
+
+            tokenizer = tokenizerClass(text, "benchmark")
+            last = None
+            while last != "end":
+                last = tokenizer.get(not last in divisionAfter)
+                tokenizer.getComments()
+
+            duration = time.perf_counter() - start
+            if not tokenizerClass in best or duration < best[tokenizerClass]:
+                best[tokenizerClass] = duration
+
+    return best
+
+
+if len(sys.argv) > 1:
+    texts = [(fileName, open(fileName, encoding="utf-8").read()) for fileName in sys.argv[1:]]
+else:
+    texts = [("<generated>", "".join([sample % {"id" : pos} for pos in range(200)]))]
+
+for name, text in texts:
+    tokens = tokenize(Tokenizer, text)
+    if tokens != tokenize(CharTokenizer, text):
+        print("%s: Token streams differ!" % name)
+        sys.exit(1)
+
+    print("%s: %s tokens" % (name, len(tokens)))
+
+    results = measure((CharTokenizer, Tokenizer), text, 20)
+    for tokenizerClass in (CharTokenizer, Tokenizer):
+        duration = results[tokenizerClass]
+        print("  %-14s %8.1fms %10.0f tokens/sec" % (tokenizerClass.__name__, duration * 1000, len(tokens) / duration))
+
+    print("  Speedup: %.2fx" % (results[CharTokenizer] / results[Tokenizer]))